@@ -0,0 +1,66 @@
+"""Bulk scoring of arrays of throws (`Combination.score` and `Combination.resolve_rounds`).
+
+Checks the scores of the 216 throws and the resolution of the 216 x 216 pairs of throws against `Combination` and its
+comparisons, then compares the throughput of both on random throws.
+
+Usage: `python -m benchmarks.bench_bulk_scoring [n_throws]`
+"""
+
+import itertools as it
+import sys
+import time
+
+import numpy as np
+
+from src.Dice421.Combination import Combination, resolve_rounds, score
+
+THROWS = np.array(list(it.product(range(1, 7), repeat=3)))
+
+
+def check():
+    scores = score(THROWS)
+    combinations = [Combination(list(throw)) for throw in THROWS]
+    for i, combination in enumerate(combinations):
+        assert tuple(scores["values"][i]) == combination.get_values()
+        assert (scores["value"][i], scores["points"][i], scores["rank"][i]) == (
+            combination.get_value(),
+            combination.get_points(),
+            combination.get_rank(),
+        )
+    # Every ordered pair of throws
+    first, second = np.repeat(np.arange(len(THROWS)), len(THROWS)), np.tile(np.arange(len(THROWS)), len(THROWS))
+    winner, points = resolve_rounds(THROWS[first], THROWS[second])
+    for k, (i, j) in enumerate(zip(first, second)):
+        a, b = combinations[i], combinations[j]
+        expected = (0, a.get_points()) if a > b else (1, b.get_points()) if b > a else (-1, 0)
+        assert (winner[k], points[k]) == expected, (THROWS[i], THROWS[j])
+        assert (a == b) == (winner[k] == -1) and (a < b) == (winner[k] == 1)
+    print(f"Scores of {len(THROWS)} throws and {len(first)} rounds identical to Combination")
+
+
+def run(n_throws=1_000_000):
+    gen = np.random.default_rng(0)
+    dice1, dice2 = gen.integers(1, 7, size=(2, n_throws, 3))
+    start = time.perf_counter()
+    scores = score(dice1)
+    winner, points = resolve_rounds(dice1, dice2)
+    bulk = time.perf_counter() - start
+
+    n_objects = min(n_throws, 100_000)
+    throws1, throws2 = dice1[:n_objects].tolist(), dice2[:n_objects].tolist()
+    start = time.perf_counter()
+    for throw1, throw2 in zip(throws1, throws2):
+        a, b = Combination(throw1), Combination(throw2)
+        _ = a.get_points(), a.get_rank(), 0 if a > b else 1 if b > a else -1
+    objects = (time.perf_counter() - start) * n_throws / n_objects
+
+    print(
+        f"{n_throws} throws: bulk scoring and rounds {1e3 * bulk:.0f} ms, Combination objects {1e3 * objects:.0f} ms "
+        f"(x{objects / bulk:.0f}); mean points {scores['points'].mean():.3f}, ties {np.mean(winner == -1):.4f}, "
+        f"mean points of a round {points.mean():.3f}"
+    )
+
+
+if __name__ == "__main__":
+    check()
+    run(*(int(arg) for arg in sys.argv[1:]))
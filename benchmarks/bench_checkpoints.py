@@ -0,0 +1,93 @@
+"""Exact resume and overhead of the checkpoints of `CheckpointTrainer`.
+
+Trains agents (with the default sparse table, with a dense encoding and learning by batches) without interruption and
+in two runs resumed from a checkpoint by new objects, and checks that the Q-values, epsilon, metrics and random
+generators end identical. Then compares the episodes per second with and without checkpoints.
+
+Usage: `python -m benchmarks.bench_checkpoints [n_episodes]`
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from src.Agents.CheckpointTrainer import CheckpointTrainer, list_checkpoints
+from src.Agents.NNAgent import NNPlayer
+from src.Agents.RandomAgent import RandomPlayer
+from src.Dice421.Game import Dice421Env
+from src.Dice421.encoding import ObservationEncoder, ROUND_RADICES
+
+CONFIGS = {
+    "sparse": {},
+    "dense": {"encoder": ObservationEncoder(ROUND_RADICES)},
+    "dense, batches": {"encoder": ObservationEncoder(ROUND_RADICES), "batch_size": 64},
+}
+
+
+def make_trainer(directory, n_episodes, checkpoint_every, keep=3, **kwargs):
+    np.random.seed(0)
+    env = Dice421Env(seed=0)
+    agent = NNPlayer(
+        env,
+        learning_rate=0.01,
+        initial_epsilon=1.0,
+        epsilon_decay=1.0 / (n_episodes / 2),
+        final_epsilon=0.1,
+        **kwargs,
+    )
+    return CheckpointTrainer(agent, RandomPlayer(env), directory, checkpoint_every=checkpoint_every, keep=keep)
+
+
+def state(trainer):
+    agent = trainer.agent
+    agent.flush()
+    q_values = dict((code, values.copy()) for code, values in agent.q_values.items())
+    return q_values, agent.epsilon, agent.metrics.summary(), np.random.random(), trainer.env.stream.face()
+
+
+def check(directory, n_episodes=1_000, checkpoint_every=200):
+    for name, kwargs in CONFIGS.items():
+        reference = make_trainer(os.path.join(directory, name, "reference"), n_episodes, checkpoint_every, **kwargs)
+        reference.train(n_episodes)
+        expected = state(reference)
+
+        path = os.path.join(directory, name, "resumed")
+        interrupted = make_trainer(path, n_episodes, checkpoint_every, keep=2, **kwargs)
+        # Stopped between two periodic checkpoints (`train` writes a last checkpoint when it ends)
+        interrupted.train(n_episodes // 2 + checkpoint_every // 2)
+        assert len(list_checkpoints(path)) == 2
+        resumed = make_trainer(path, n_episodes, checkpoint_every, **kwargs)
+        # Other generators, to be overwritten by the checkpoint
+        np.random.seed(1)
+        assert resumed.resume() == n_episodes // 2 + checkpoint_every // 2
+        resumed.train(n_episodes)
+        q_values, epsilon, summary, random, face = state(resumed)
+        assert q_values.keys() == expected[0].keys()
+        assert all(np.array_equal(values, expected[0][code]) for code, values in q_values.items())
+        assert (epsilon, random, face) == (expected[1], expected[3], expected[4])
+        assert np.array_equal(list(summary.values()), list(expected[2].values()), equal_nan=True)
+        print(f"{name}: resumed run identical to the uninterrupted run ({len(q_values)} states)")
+
+
+def run(directory, n_episodes=2_000, checkpoint_every=200):
+    for name, kwargs in CONFIGS.items():
+        rates = {}
+        for label, every in [("without", n_episodes), ("with", checkpoint_every)]:
+            trainer = make_trainer(os.path.join(directory, "run", name, label), n_episodes, every, **kwargs)
+            start = time.perf_counter()
+            stats = trainer.train(n_episodes)
+            rates[label] = n_episodes / (time.perf_counter() - start)
+        print(
+            f"{name}: {rates['without']:.0f} episodes/s without checkpoints, {rates['with']:.0f} with "
+            f"{stats['checkpoints']} checkpoints ({1e3 * stats['snapshot_time'] / stats['checkpoints']:.2f} ms per "
+            f"snapshot in the training loop)"
+        )
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        check(directory)
+        run(directory, *(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,77 @@
+"""Micro-benchmark of the construction and comparison of combinations.
+
+Compares the rank-table `Combination` with the previous implementation (string concatenation and chained
+comparisons), kept below for reference.
+
+Usage: `python -m benchmarks.bench_combination`
+"""
+
+import itertools as it
+import timeit
+
+from src.Dice421.Combination import Combination, list_points
+from src.Dice421.utils import list_to_number
+
+
+class LegacyCombination:
+    """Previous implementation of `Combination`."""
+
+    def __init__(self, values_dice):
+        self.values = values_dice.copy()
+        self.value = list_to_number(self.values)
+        self.points, self.order = list_points.get(self.value, (1, -1))
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __lt__(self, other):
+        if self == other:
+            return False
+        if self.points != other.points:
+            return self.points < other.points
+        if self.points == 1:
+            return self.value < other.value
+        else:
+            return self.order > other.order
+
+    def __gt__(self, other):
+        return not (self < other or self == other)
+
+    def __ge__(self, other):
+        return self > other or self == other
+
+    def __le__(self, other):
+        return self < other or self == other
+
+
+THROWS = [list(t) for t in it.combinations_with_replacement(range(6, 0, -1), 3)]
+
+
+def construct(cls):
+    for throw in THROWS:
+        cls(throw)
+
+
+def compare(combinations):
+    # Same comparisons as `Dice421Env.get_reward` does at each step
+    for a, b in zip(combinations, combinations[1:] + combinations[:1]):
+        _ = (a > b, a == b, a > b, a < b or a < b, a > b, a > b)
+
+
+def run(number=2_000):
+    results = {}
+    for name, cls in [("legacy", LegacyCombination), ("rank table", Combination)]:
+        combinations = [cls(throw) for throw in THROWS]
+        results[name] = (
+            timeit.timeit(lambda: construct(cls), number=number) / (number * len(THROWS)),
+            timeit.timeit(lambda: compare(combinations), number=number) / (number * len(THROWS)),
+        )
+    for name, (t_construct, t_compare) in results.items():
+        print(f"{name:>12}: construction {1e9 * t_construct:7.1f} ns, reward comparisons {1e9 * t_compare:7.1f} ns")
+    speedups = [old / new for old, new in zip(results["legacy"], results["rank table"])]
+    print(f"{'speedup':>12}: construction x{speedups[0]:.1f}, reward comparisons x{speedups[1]:.1f}")
+    return results
+
+
+if __name__ == "__main__":
+    run()
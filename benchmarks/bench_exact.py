@@ -0,0 +1,116 @@
+"""Exact evaluation of matchups (`Dice421.exact`) against simulated games.
+
+Checks that the batched `action_probabilities` of the players give the actions of `get_next_action` on the
+observations of real games, then compares the exact win, draw and round statistics of several matchups with the
+statistics of simulated games (the differences must stay within the sampling error) and the time of both (the round
+distributions of each policy are computed on its first matchup and reused by the next ones).
+
+Usage: `python -m benchmarks.bench_exact [n_games]`
+"""
+
+import sys
+import time
+from functools import partial
+
+import numpy as np
+
+from src.Agents.NNAgent import NNPlayer
+from src.Agents.OptimalAgent import OptimalPlayer
+from src.Agents.RandomAgent import RandomPlayer
+from src.Dice421.Game import Dice421Env, PASS, THROW_ALL
+from src.Dice421.Player import Player
+from src.Dice421.Tournament import Tournament, summarize
+from src.Dice421.exact import evaluate_exact
+from src.Dice421.features import abstract_encoder
+from src.Dice421.transitions import ACTIONS, THROW_ALL_IDX
+
+
+class ParityPlayer(Player):
+    """Throws all the dice when `state_round` is 0 and passes otherwise (`state_round` flips once per round, ties
+    included, so that both players see both values in both positions)."""
+
+    def get_next_action(self, state):
+        return THROW_ALL if state["state_round"] == 0 else PASS
+
+    def action_probabilities(self, observations):
+        return np.eye(len(ACTIONS))[np.where(np.asarray(observations["state_round"]) == 0, THROW_ALL_IDX, 0)]
+
+
+def trained_policy(n_episodes=2_000):
+    np.random.seed(0)
+    env = Dice421Env(seed=0)
+    agent = NNPlayer(
+        env,
+        learning_rate=0.01,
+        initial_epsilon=1.0,
+        epsilon_decay=1.0 / (n_episodes / 2),
+        final_epsilon=0.1,
+        encoder=abstract_encoder(),
+    )
+    opponent = RandomPlayer(env)
+    for _ in range(n_episodes):
+        env.run(agent, opponent)
+        agent.decay_epsilon()
+    return agent.compile_policy()
+
+
+def check(players, n_games=50):
+    env = Dice421Env(seed=0)
+    states = []
+    recorder = RandomPlayer(env)
+    recorder.learn = lambda state, *_: states.append(state)
+    for _ in range(n_games):
+        env.run(recorder, RandomPlayer(env))
+    batch = {field: np.array([state[field] for state in states]) for field in states[0]}
+    for name, player in players.items():
+        actions = np.array([ACTIONS.index(tuple(int(x) for x in player.get_next_action(state))) for state in states])
+        assert np.array_equal(player.action_probabilities(batch).argmax(axis=1), actions), name
+    print(f"Batched actions identical to get_next_action on {len(states)} observations")
+
+
+def run(n_games=4_000):
+    env = Dice421Env(seed=0)
+    policy = trained_policy()
+    factories = {
+        "Random": RandomPlayer,
+        "Optimal (game)": OptimalPlayer,
+        "Optimal (round)": partial(OptimalPlayer, objective="round"),
+        "Q-learning": policy,
+        "Parity": ParityPlayer,
+    }
+    policies = {name: factory(env) for name, factory in factories.items()}
+    check({name: policies[name] for name in ["Optimal (game)", "Optimal (round)", "Q-learning", "Parity"]})
+    # Round distributions of each policy, computed on its first matchup
+    cache = {}
+    matchups = [
+        ("Random", "Random"),
+        ("Optimal (game)", "Random"),
+        ("Optimal (round)", "Optimal (game)"),
+        ("Q-learning", "Random"),
+        ("Q-learning", "Optimal (game)"),
+        ("Parity", "Optimal (game)"),
+        ("Parity", "Random"),
+    ]
+    for name1, name2 in matchups:
+        start = time.perf_counter()
+        exact = evaluate_exact(policies[name1], policies[name2], cache=cache)
+        exact_time = time.perf_counter() - start
+        start = time.perf_counter()
+        results = Tournament([(factories[name1], factories[name2], n_games)], seed=0).run(max_workers=0)[0]
+        simulation_time = time.perf_counter() - start
+        simulated = summarize(results)
+        for key in ["win_1", "win_2", "draw"]:
+            error = np.sqrt(exact[key] * (1 - exact[key]) / n_games)
+            assert abs(simulated[key] - exact[key]) <= 4 * error + 1e-12, (name1, name2, key)
+        rounds = results["rounds"]
+        assert abs(rounds.mean() - exact["expected_rounds"]) <= 4 * rounds.std() / np.sqrt(n_games), (name1, name2)
+        print(
+            f"{name1:>15} vs {name2:<15} exact: win {exact['win_1']:.4f} / {exact['win_2']:.4f}, "
+            f"{exact['expected_rounds']:.2f} rounds in {1e3 * exact_time:.0f} ms; "
+            f"simulated: win {simulated['win_1']:.4f} / {simulated['win_2']:.4f}, "
+            f"{results['rounds'].mean():.2f} rounds in {simulation_time:.1f} s"
+        )
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,79 @@
+"""Size of the Q-tables and learning speed of `NNPlayer` with several state encodings.
+
+For each encoding, reports the number of possible states and the storage of the table, then trains an agent against
+a random player and reports the number of visited states, the memory of the table and the win rate against a random
+player after training.
+
+Usage: `python -m benchmarks.bench_features [n_episodes]`
+"""
+
+import sys
+
+import numpy as np
+
+from src.Agents.NNAgent import NNPlayer, FrozenQValues
+from src.Agents.QTable import describe_encoder
+from src.Agents.RandomAgent import RandomPlayer
+from src.Dice421.Game import Dice421Env
+from src.Dice421.Tournament import Tournament, summarize
+from src.Dice421.encoding import ObservationEncoder, ROUND_RADICES
+from src.Dice421.features import abstract_encoder
+
+ENCODERS = {
+    "raw observations": ObservationEncoder(),
+    "current round only": ObservationEncoder(ROUND_RADICES),
+    "score difference": abstract_encoder(),
+    "score difference, opponent buckets": abstract_encoder(opponent_buckets=8),
+    "coarse": abstract_encoder(clip=6, opponent_buckets=4),
+}
+
+
+def check(n_games=20):
+    """Checks that the batch encoding matches the encoding of each observation."""
+    env = Dice421Env(seed=0)
+    observations = []
+    player = RandomPlayer(env)
+    player.learn = lambda state, *_: observations.append(state)
+    for _ in range(n_games):
+        env.run(player, RandomPlayer(env))
+    batch = {field: np.array([observation[field] for observation in observations]) for field in observations[0]}
+    for encoder in ENCODERS.values():
+        codes = [encoder.encode(observation) for observation in observations]
+        assert np.array_equal(encoder.encode_batch(batch), codes)
+        assert max(codes) < encoder.n_states
+
+
+def train(encoder, n_episodes, seed=0):
+    np.random.seed(seed)
+    env = Dice421Env(seed=seed)
+    agent = NNPlayer(
+        env,
+        learning_rate=0.01,
+        initial_epsilon=1.0,
+        epsilon_decay=1.0 / (n_episodes / 2),
+        final_epsilon=0.1,
+        encoder=encoder,
+    )
+    opponent = RandomPlayer(env)
+    for _ in range(n_episodes):
+        env.run(agent, opponent)
+        agent.decay_epsilon()
+    return agent.q_values
+
+
+def run(n_episodes=2_000, n_games=2_000):
+    print(f"{'encoding':>36} {'states':>15} {'storage':>8} {'visited':>8} {'memory':>10} {'win rate':>9}")
+    for name, encoder in ENCODERS.items():
+        q_values = train(encoder, n_episodes)
+        description = describe_encoder(encoder, n_visited=len(q_values))
+        tournament = Tournament([(FrozenQValues(q_values), RandomPlayer, n_games)], seed=421)
+        win_rate = summarize(tournament.run(max_workers=0)[0])["win_1"]
+        print(
+            f"{name:>36} {description['n_states']:15,d} {description['storage']:>8} {len(q_values):8d} "
+            f"{description['nbytes'] / 2**20:8.2f}MB {win_rate:9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    check()
+    run(*(int(arg) for arg in sys.argv[1:]))
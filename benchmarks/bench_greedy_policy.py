@@ -0,0 +1,105 @@
+"""Decisions of a trained `NNPlayer` in evaluation against its compiled `GreedyPolicyPlayer`.
+
+Trains agents (with the default sparse table and with a dense encoding), checks that the compiled policies take the
+same actions as the agents with `epsilon = 0` on the states met in games and after a save/load round trip, then
+compares the time per decision, the evaluation games per second, the size of the files and their loading time.
+
+Usage: `python -m benchmarks.bench_greedy_policy [n_episodes]`
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from src.Agents.GreedyAgent import GreedyPolicy, GreedyPolicyPlayer
+from src.Agents.NNAgent import NNPlayer
+from src.Agents.RandomAgent import RandomPlayer
+from src.Dice421.Game import Dice421Env
+from src.Dice421.encoding import ObservationEncoder, ROUND_RADICES
+
+ENCODERS = {"sparse": None, "dense": ObservationEncoder(ROUND_RADICES)}
+
+
+def train(env, encoder, n_episodes):
+    np.random.seed(0)
+    agent = NNPlayer(
+        env,
+        learning_rate=0.01,
+        initial_epsilon=1.0,
+        epsilon_decay=1.0 / (n_episodes / 2),
+        final_epsilon=0.1,
+        encoder=encoder,
+    )
+    opponent = RandomPlayer(env)
+    for _ in range(n_episodes):
+        env.run(agent, opponent)
+        agent.decay_epsilon()
+    agent.epsilon = 0.0
+    return agent
+
+
+def observations(env, n_games=200):
+    states = []
+    player = RandomPlayer(env)
+    player.learn = lambda state, *_: states.append(state)
+    for _ in range(n_games):
+        env.run(player, RandomPlayer(env))
+    return states
+
+
+def time_per_call(function, states, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for state in states:
+            function(state)
+        best = min(best, (time.perf_counter() - start) / len(states))
+    return best
+
+
+def run(directory, n_episodes=2_000, n_games=1_000):
+    env = Dice421Env(seed=0)
+    states = observations(env)
+    for storage, encoder in ENCODERS.items():
+        agent = train(env, encoder, n_episodes)
+        player = GreedyPolicyPlayer.from_player(agent)
+        prefix = os.path.join(directory, storage)
+        agent.save_model(prefix)
+        player.save_model(prefix)
+        loaded = GreedyPolicyPlayer(env)
+        loaded.load_model(prefix)
+        codes = [agent.q_values.encode(state) for state in states]
+        for state in states:
+            expected = tuple(int(x) for x in agent.get_next_action(state))
+            assert player.get_next_action(state) == expected == loaded.get_next_action(state)
+        assert np.array_equal(player.policy.action_indices(codes), [player.policy.action_index(c) for c in codes])
+
+        nn_time = time_per_call(agent.get_next_action, states)
+        policy_time = time_per_call(player.get_next_action, states)
+        games = {}
+        for name, evaluated in [("NNPlayer", agent), ("GreedyPolicyPlayer", player)]:
+            opponent = RandomPlayer(env)
+            start = time.perf_counter()
+            for _ in range(n_games):
+                env.run(evaluated, opponent, player1_learn=False, player2_learn=False)
+            games[name] = n_games / (time.perf_counter() - start)
+        start = time.perf_counter()
+        GreedyPolicy.load(prefix + ".policy")
+        load_time = time.perf_counter() - start
+        print(
+            f"{storage} table of {len(agent.q_values)} states:\n"
+            f"  decision: NNPlayer {1e6 * nn_time:.2f} us, GreedyPolicyPlayer {1e6 * policy_time:.2f} us "
+            f"({nn_time / policy_time:.1f}x)\n"
+            f"  evaluation: NNPlayer {games['NNPlayer']:.0f} games/s, "
+            f"GreedyPolicyPlayer {games['GreedyPolicyPlayer']:.0f} games/s\n"
+            f"  files: Q-table {os.path.getsize(prefix + '.qtable') / 1024:.0f} KiB, "
+            f"policy {os.path.getsize(prefix + '.policy') / 1024:.0f} KiB (loaded in {1e3 * load_time:.2f} ms)"
+        )
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        run(directory, *(int(arg) for arg in sys.argv[1:]))
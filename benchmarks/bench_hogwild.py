@@ -0,0 +1,66 @@
+"""Throughput and learning quality of the Hogwild trainer compared with the serial training loop.
+
+Trains `NNPlayer` against a random player for the same number of episodes, serially and with `HogwildTrainer`, then
+evaluates both greedy agents against a random player.
+
+Usage: `python -m benchmarks.bench_hogwild [n_workers] [n_episodes]`
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+from src.Agents.HogwildTrainer import HogwildTrainer
+from src.Agents.NNAgent import NNPlayer, FrozenQValues
+from src.Agents.QTable import QTable
+from src.Agents.RandomAgent import RandomPlayer
+from src.Dice421.Game import Dice421Env
+from src.Dice421.Tournament import Tournament, summarize
+from src.Dice421.encoding import ObservationEncoder, ROUND_RADICES
+
+
+def hyperparameters(n_episodes):
+    return {
+        "learning_rate": 0.01,
+        "initial_epsilon": 1.0,
+        "epsilon_decay": 1.0 / (n_episodes / 2),
+        "final_epsilon": 0.1,
+        "discount_factor": 0.95,
+    }
+
+
+def train_serial(n_episodes, seed=0):
+    np.random.seed(seed)
+    env = Dice421Env(seed=seed)
+    agent = NNPlayer(env, **hyperparameters(n_episodes))
+    agent.set_qvalues(QTable(ObservationEncoder(ROUND_RADICES)))
+    opponent = RandomPlayer(env)
+    start = time.perf_counter()
+    for _ in range(n_episodes):
+        env.run(agent, opponent)
+        agent.decay_epsilon()
+    return agent.q_values, n_episodes / (time.perf_counter() - start)
+
+
+def evaluate(q_values, n_games=4_000):
+    tournament = Tournament([(FrozenQValues(q_values), RandomPlayer, n_games)], seed=421)
+    return summarize(tournament.run()[0])["win_1"]
+
+
+def run(n_workers=None, n_episodes=4_000):
+    n_workers = n_workers or os.cpu_count()
+    q_values, speed = train_serial(n_episodes)
+    print(f"  serial: {speed:8.1f} episodes/s, win rate vs random {evaluate(q_values):.3f}")
+    trainer = HogwildTrainer(n_workers, seed=0, **hyperparameters(n_episodes))
+    q_values, stats = trainer.train(n_episodes)
+    per_worker = ", ".join(f"{speed:.1f}" for speed in stats["episodes_per_second"])
+    print(
+        f" hogwild: {stats['total_episodes_per_second']:8.1f} episodes/s ({n_workers} workers: {per_worker}), "
+        f"win rate vs random {evaluate(q_values):.3f}"
+    )
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,81 @@
+"""Throughput of the Q-learning updates of `NNPlayer`, one transition at a time and by batches.
+
+Checks that `learn_batch` gives the same Q-values as `learn` on transitions which do not interact, then reports the
+number of updates per second on random transitions and the number of training games per second against a random
+player.
+
+Usage: `python -m benchmarks.bench_learn_batch`
+"""
+
+import time
+
+import numpy as np
+
+from src.Agents.NNAgent import NNPlayer
+from src.Agents.RandomAgent import RandomPlayer
+from src.Dice421.Game import Dice421Env
+from src.Dice421.encoding import ObservationEncoder
+from src.Dice421.transitions import ACTIONS
+
+
+def make_agent(env, batch_size=None):
+    return NNPlayer(
+        env, learning_rate=0.01, initial_epsilon=0.1, epsilon_decay=0.0, final_epsilon=0.1, batch_size=batch_size
+    )
+
+
+def random_transitions(n, n_states, seed=0):
+    gen = np.random.default_rng(seed)
+    codes = gen.integers(0, ObservationEncoder().n_states, size=n_states)
+    return (
+        codes[gen.integers(0, n_states, size=n)],
+        gen.integers(0, len(ACTIONS), size=n),
+        codes[gen.integers(0, n_states, size=n)],
+        gen.normal(size=n),
+        gen.random(n) < 0.05,
+    )
+
+
+def check(n=1_000):
+    env = Dice421Env(seed=0)
+    # Distinct states and terminal transitions: the updates do not interact
+    states, actions, next_states, rewards, _ = random_transitions(n, 100 * n)
+    states = np.unique(states)
+    n = len(states)
+    dones = np.ones(n, dtype=bool)
+    sequential, batched = make_agent(env), make_agent(env)
+    for i in range(n):
+        sequential.learn(int(states[i]), ACTIONS[actions[i]], int(next_states[i]), rewards[i], dones[i], {})
+    batched.learn_batch(states, actions[:n], next_states[:n], rewards[:n], dones)
+    for code, values in sequential.q_values.items():
+        assert np.array_equal(values, batched.q_values.get(code))
+    print(f"learn_batch matches learn on {n} transitions")
+
+
+def run(n=200_000, n_games=300):
+    env = Dice421Env(seed=0)
+    transitions = random_transitions(n, n // 10)
+    agent = make_agent(env)
+    start = time.perf_counter()
+    for state, action, next_state, reward, done in zip(*(array[: n // 10].tolist() for array in transitions)):
+        agent.learn(state, ACTIONS[action], next_state, reward, done, {})
+    print(f"         learn: {n // 10 / (time.perf_counter() - start):12,.0f} updates/s")
+    agent = make_agent(env)
+    start = time.perf_counter()
+    agent.learn_batch(*transitions)
+    print(f"   learn_batch: {n / (time.perf_counter() - start):12,.0f} updates/s")
+
+    for batch_size in [None, 4096]:
+        env = Dice421Env(seed=0, observation_mode="code")
+        agent, opponent = make_agent(env, batch_size), RandomPlayer(env)
+        start = time.perf_counter()
+        for _ in range(n_games):
+            env.run(agent, opponent)
+        agent.flush()
+        elapsed = time.perf_counter() - start
+        print(f"batch size {str(batch_size):>4}: {n_games / elapsed:8.1f} training games/s")
+
+
+if __name__ == "__main__":
+    check()
+    run()
@@ -0,0 +1,72 @@
+"""Games per second of `Dice421Env.run` in silent mode, with event sinks and with the messages formatted as before the
+silent mode.
+
+The baseline ("always formatted") reproduces the former logging: every message of the game was formatted and passed to
+the logger, even when its level discarded it. The "log file" case writes the formatted messages to a file, as with
+logging enabled (without the console).
+
+Usage: `python -m benchmarks.bench_logging`
+"""
+
+import logging
+import os
+import tempfile
+import time
+
+from src.Agents.RandomAgent import RandomPlayer
+from src.Dice421.Game import Dice421Env, EVENTS
+from src.Dice421.logger import RingBufferSink, BatchedWriterSink, formatter, log
+
+
+class LoggerSink:
+    """Event sink formatting the message of each event (see `EVENTS`) and passing it to a logger."""
+
+    def __init__(self, logger):
+        self.logger = logger
+
+    def record(self, event, fields):
+        level, message = EVENTS[event]
+        self.logger.log(level, message.format(**fields))
+
+
+def file_logger(path):
+    """Logger writing every message to `path`, with the format of the game log."""
+    logger = logging.getLogger("Dice421.bench")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    handler = logging.FileHandler(path)
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    return logger, handler
+
+
+def games_per_second(env, n_games):
+    player1, player2 = RandomPlayer(env, name="North"), RandomPlayer(env, name="South")
+    start = time.perf_counter()
+    for _ in range(n_games):
+        env.run(player1, player2, render=False)
+    return n_games / (time.perf_counter() - start)
+
+
+def run(n_games=300):
+    with tempfile.TemporaryDirectory() as directory:
+        writer = BatchedWriterSink(os.path.join(directory, "events.jsonl"))
+        logger, handler = file_logger(os.path.join(directory, "game.log"))
+        sinks = [
+            ("silent", None),
+            # The logger of the game discards the messages when not rendering
+            ("always formatted", LoggerSink(log)),
+            ("ring buffer", RingBufferSink()),
+            ("batched writer", writer),
+            ("log file", LoggerSink(logger)),
+        ]
+        for name, sink in sinks:
+            env = Dice421Env(seed=0, event_sink=sink)
+            print(f"{name:>16}: {games_per_second(env, n_games):8.1f} games/s")
+        writer.close()
+        logger.removeHandler(handler)
+        handler.close()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,54 @@
+"""Cost of the observations of `Dice421Env` as dictionaries and as packed integers.
+
+Reports the time per game of a learning `NNPlayer` against a random player, and the memory allocated per
+observation (measured with tracemalloc on observations kept by the player).
+
+Usage: `python -m benchmarks.bench_observation`
+"""
+
+import time
+import tracemalloc
+
+from src.Agents.NNAgent import NNPlayer
+from src.Agents.RandomAgent import RandomPlayer
+from src.Dice421.Game import Dice421Env
+
+
+class KeepingPlayer(RandomPlayer):
+    """Random player keeping every observation it receives."""
+
+    def __init__(self, env, name="Keeping"):
+        super().__init__(env, name)
+        self.observations = []
+
+    def get_next_action(self, state):
+        self.observations.append(state)
+        return super().get_next_action(state)
+
+    def learn(self, state, action, state_next, reward, done, info):
+        self.observations.append(state_next)
+
+
+def run(n_games=200):
+    for mode in ["dict", "code"]:
+        env = Dice421Env(seed=0, observation_mode=mode)
+        agent = NNPlayer(env, learning_rate=0.01, initial_epsilon=0.1, epsilon_decay=0.0, final_epsilon=0.1)
+        opponent = RandomPlayer(env)
+        start = time.perf_counter()
+        for _ in range(n_games):
+            env.run(agent, opponent)
+        elapsed = (time.perf_counter() - start) / n_games
+
+        env = Dice421Env(seed=0, observation_mode=mode)
+        player1, player2 = KeepingPlayer(env), KeepingPlayer(env)
+        tracemalloc.start()
+        for _ in range(10):
+            env.run(player1, player2)
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        n_observations = len(player1.observations) + len(player2.observations)
+        print(f"{mode:>5}: {1e3 * elapsed:6.2f} ms/game (learning), {memory / n_observations:6.1f} bytes/observation")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,101 @@
+"""Round trip and loading time of the Q-tables saved by `NNPlayer.save_model`.
+
+Saves trained agents (with the default sparse table and with a small dense encoding), checks that the loaded agents
+have the same Q-values, hyperparameters and actions, and compares the time to load a large table with the time to
+unpickle it.
+
+Usage: `python -m benchmarks.bench_persistence [n_states]`
+"""
+
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from src.Agents.NNAgent import NNPlayer
+from src.Agents.QTable import QTable
+from src.Agents.RandomAgent import RandomPlayer
+from src.Dice421.Game import Dice421Env
+from src.Dice421.encoding import ObservationEncoder, OBSERVATION_RADICES
+
+
+def make_agent(env, name="NN"):
+    return NNPlayer(env, learning_rate=0.05, initial_epsilon=0.5, epsilon_decay=1e-3, final_epsilon=0.1, name=name)
+
+
+def round_trip(agent, prefix):
+    agent.save_model(prefix)
+    for mmap_mode in [None, "r", "c"]:
+        loaded = make_agent(agent.env, name="Loaded")
+        loaded.load_model(prefix, mmap_mode=mmap_mode)
+        assert loaded.q_values.dense == agent.q_values.dense
+        assert loaded.epsilon == agent.epsilon and loaded.lr == agent.lr
+        assert len(loaded.q_values) == len(agent.q_values)
+        for code, values in agent.q_values.items():
+            assert np.array_equal(loaded.q_values.get(code), values)
+    print(f"Round trip of a {'dense' if agent.q_values.dense else 'sparse'} table of {len(agent.q_values)} states")
+    return loaded
+
+
+def check(directory, n_games=100):
+    prefix = os.path.join(directory, "agent")
+    env = Dice421Env(seed=0)
+    # Encoding small enough to be stored densely, filled with random Q-values
+    agent = make_agent(env)
+    agent.set_qvalues(QTable(ObservationEncoder(dict(OBSERVATION_RADICES, round_nb=1, player_score=1, opp_score=1))))
+    codes = np.random.default_rng(0).integers(0, agent.q_values.encoder.n_states, size=1000)
+    agent.q_values.values[agent.q_values.insert_rows(codes)] = np.random.default_rng(1).random((len(codes), 8))
+    round_trip(agent, prefix)
+
+    agent, opponent = make_agent(env), RandomPlayer(env)
+    for _ in range(n_games):
+        env.run(agent, opponent, player2_learn=False)
+        agent.decay_epsilon()
+    loaded = round_trip(agent, prefix)
+
+    # Learning continues after a copy-on-write load without modifying the file
+    size = os.path.getsize(prefix + ".qtable")
+    with open(prefix + ".qtable", "rb") as file:
+        content = file.read()
+    loaded.load_model(prefix, mmap_mode="c")
+    env.run(loaded, opponent)
+    with open(prefix + ".qtable", "rb") as file:
+        assert file.read() == content and os.path.getsize(prefix + ".qtable") == size
+
+    with open(prefix + ".qtable", "r+b") as file:
+        file.seek(4)
+        file.write(np.array([99], dtype="<u4").tobytes())
+    try:
+        loaded.load_model(prefix)
+        raise AssertionError("Unknown version loaded")
+    except ValueError as exception:
+        print(f"Other versions are rejected: {exception}")
+
+
+def run(directory, n_states=1_000_000):
+    encoder = ObservationEncoder()
+    table = QTable(encoder)
+    codes = np.unique(np.random.default_rng(0).integers(0, encoder.n_states, size=n_states))
+    rows = table.insert_rows(codes)
+    table.values[rows] = np.random.default_rng(1).random((len(codes), 8))
+    path = os.path.join(directory, "large.qtable")
+    table.save(path)
+    with open(os.path.join(directory, "large.pkl"), "wb") as file:
+        pickle.dump(table, file)
+    for mmap_mode in ["r", None]:
+        start = time.perf_counter()
+        QTable.load(path, mmap_mode=mmap_mode)
+        print(f"load (mmap_mode={mmap_mode}): {1e3 * (time.perf_counter() - start):8.1f} ms for {len(codes)} states")
+    start = time.perf_counter()
+    with open(os.path.join(directory, "large.pkl"), "rb") as file:
+        pickle.load(file)
+    print(f"            unpickle: {1e3 * (time.perf_counter() - start):8.1f} ms")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        check(directory)
+        run(directory, *(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,104 @@
+"""Memory and lookup time of the Q-table storages.
+
+Compares the previous storage of `NNPlayer` (a defaultdict of `(2, 2, 2)` arrays keyed by the tuples of the
+observations) with `QTable` on a large number of random distinct states: memory, greedy lookup (`np.argmax` of the
+Q-values of a state) and greedy action of `NNPlayer.get_next_action` (with the previous implementation for the
+defaultdict). The states are given as by the environment (dictionaries carrying their code), as dictionaries built
+elsewhere (encoded by the Q-table) and as codes (`observation_mode="code"`).
+
+Usage: `python -m benchmarks.bench_qtable [n_states]`
+"""
+
+import sys
+import timeit
+import tracemalloc
+from collections import defaultdict
+
+import numpy as np
+
+from src.Agents.NNAgent import NNPlayer
+from src.Agents.QTable import QTable
+from src.Dice421.Game import Dice421Env
+from src.Dice421.encoding import Observation, ObservationEncoder
+
+
+def random_states(n_states, seed=0):
+    encoder = ObservationEncoder()
+    codes = np.unique(np.random.default_rng(seed).integers(0, encoder.n_states, size=int(1.1 * n_states)))[:n_states]
+    return [encoder.decode(int(code)) for code in np.random.default_rng(seed).permutation(codes)]
+
+
+def as_observation(state, encoder):
+    """Observation as given by the environment (see `Dice421Env.get_observation_space`)."""
+    observation = Observation(state)
+    observation.code = encoder.encode(state)
+    return observation
+
+
+def fill_dict(states):
+    q_values = defaultdict(lambda: np.zeros((2, 2, 2)))
+    for state in states:
+        q_values[tuple(state.values())][1, 0, 1] += 1.0
+    return q_values
+
+
+def fill_table(states):
+    q_values = QTable()
+    for state in states:
+        q_values[state][1, 0, 1] += 1.0
+    return q_values
+
+
+def read_dict(q_values, states):
+    for state in states:
+        np.argmax(q_values[tuple(state.values())])
+
+
+def read_table(q_values, states):
+    for state in states:
+        np.argmax(q_values.get(state))
+
+
+def act_dict(q_values, states):
+    # Greedy action of the previous `NNPlayer.get_next_action`
+    for state in states:
+        np.unravel_index(np.argmax(q_values[tuple(state.values())]), (2, 2, 2))
+
+
+def act_table(q_values, states):
+    agent = NNPlayer(Dice421Env(), learning_rate=0.0, initial_epsilon=0.0, epsilon_decay=0.0, final_epsilon=0.0)
+    agent.set_qvalues(q_values)
+    for state in states:
+        agent.get_next_action(state)
+
+
+def timed(function, q_values, keys, repeat=3):
+    return min(timeit.repeat(lambda: function(q_values, keys), number=1, repeat=repeat)) / len(keys)
+
+
+def run(n_states=1_000_000):
+    states = random_states(n_states)
+    print(f"{len(states):,} states")
+    encoder = ObservationEncoder()
+    observations = [as_observation(state, encoder) for state in states]
+    codes = [observation.code for observation in observations]
+    for name, fill, read, act, keys in [
+        ("defaultdict", fill_dict, read_dict, act_dict, observations),
+        ("QTable", fill_table, read_table, act_table, observations),
+        ("QTable dicts", fill_table, read_table, act_table, states),
+        ("QTable codes", fill_table, read_table, act_table, codes),
+    ]:
+        tracemalloc.start()
+        q_values = fill(keys)
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        lookup, action = timed(read, q_values, keys), timed(act, q_values, keys)
+        print(
+            f"{name:>12}: {memory / len(states):6.1f} bytes/state, greedy lookup {1e9 * lookup:6.0f} ns/state, "
+            f"greedy action {1e9 * action:6.0f} ns/state"
+        )
+        del q_values
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,67 @@
+"""Memory of the results of games kept as dictionaries (as returned by `Dice421Env.run`) and in a `ResultStore`.
+
+Also checks that a store saved to disk and memory-mapped back, and stores merged from tournament workers, give the
+same results.
+
+Usage: `python -m benchmarks.bench_result_store`
+"""
+
+import functools
+import os
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+from src.Agents.RandomAgent import RandomPlayer
+from src.Dice421.Game import Dice421Env
+from src.Dice421.ResultStore import ResultStore
+from src.Dice421.Tournament import Tournament, play_games
+
+
+def measure(keep):
+    env = Dice421Env(seed=0)
+    player1, player2 = RandomPlayer(env), RandomPlayer(env)
+    tracemalloc.start()
+    kept = keep(env, player1, player2)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return kept, memory
+
+
+def run(n_games=1_000):
+    results, dict_memory = measure(lambda env, p1, p2: [env.run(p1, p2) for _ in range(n_games)])
+
+    def fill(env, p1, p2):
+        store = ResultStore(keep_history=True)
+        for _ in range(n_games):
+            store.append(env.run(p1, p2))
+        return store.compact()
+
+    store, store_memory = measure(fill)
+    for i in range(n_games):
+        assert store["winner"][i] == results[i]["winner"]
+        assert np.array_equal(store.history(i), results[i]["scores_history"])
+    print(f"dictionaries: {dict_memory / n_games:8.0f} bytes/game")
+    print(f" ResultStore: {store_memory / n_games:8.0f} bytes/game (with the histories of scores)")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "results")
+        store.save(path)
+        loaded = ResultStore.load(path)
+        assert isinstance(loaded["history_scores"], np.memmap)
+        assert all(np.array_equal(loaded[name], store[name]) for name in ["winner", "scores", "history_offsets"])
+        assert np.array_equal(loaded.history(n_games - 1), store.history(n_games - 1))
+    print("Saved store is memory-mapped back")
+
+    factories = (functools.partial(RandomPlayer, name="North"), functools.partial(RandomPlayer, name="South"))
+    tournament = Tournament([factories + (200,)], seed=421, chunk_size=50, keep_history=True)
+    merged = tournament.run(max_workers=2)[0]
+    serial = play_games(*factories, 50, tournament.get_tasks()[1][5], keep_history=True)
+    assert np.array_equal(merged.history(50), serial.history(0))
+    assert merged["history_offsets"][-1] == len(merged["history_scores"])
+    print("Stores of the workers are merged in order")
+
+
+if __name__ == "__main__":
+    run()
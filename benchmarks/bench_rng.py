@@ -0,0 +1,88 @@
+"""Reproducibility and cost of the throws of `Dice`.
+
+Checks that two environments with the same seed play the same games (full transcripts of observations, rewards and
+scores), whatever the block size of the stream of faces, and that different seeds give different games. Then compares
+the time per throw with dice drawing each face from the generator (previous implementation).
+
+Usage: `python -m benchmarks.bench_rng`
+"""
+
+import time
+
+import numpy as np
+
+from src.Agents.RandomAgent import RandomPlayer
+from src.Dice421.Combination import Combination
+from src.Dice421.Dice import Dice
+from src.Dice421.Game import Dice421Env
+from src.Dice421.rng import DiceStream
+
+
+class LegacyDice:
+    """Previous implementation: one call to the generator per face and sorting with numpy."""
+
+    def __init__(self, seed=None):
+        self.gen = np.random.default_rng(seed=seed)
+        self.values = np.zeros(3, dtype=np.int64)
+
+    def throw_dice(self, dices_to_throw):
+        values = self.values.copy()
+        for i in range(3):
+            if dices_to_throw[i]:
+                values[i] = self.gen.integers(low=1, high=7)
+        self.values = values[np.flip(np.argsort(values))]
+        return Combination(self.values.tolist())
+
+
+class TranscriptPlayer(RandomPlayer):
+    """Random player recording everything it sees."""
+
+    def __init__(self, env, transcript, name="Transcript"):
+        super().__init__(env, name)
+        self.transcript = transcript
+
+    def get_next_action(self, state):
+        action = super().get_next_action(state)
+        self.transcript.append((self.name, tuple(np.asarray(v).tolist() for v in state.values()), action))
+        return action
+
+    def learn(self, state, action, state_next, reward, done, info):
+        self.transcript.append((self.name, reward, done))
+
+
+def transcript(seed, n_games, block_size=None):
+    env = Dice421Env(seed=seed)
+    if block_size is not None:
+        # Same seed, other block size
+        env.stream.block_size = block_size
+    lines = []
+    player1, player2 = TranscriptPlayer(env, lines, name="North"), TranscriptPlayer(env, lines, name="South")
+    for _ in range(n_games):
+        result = env.run(player1, player2)
+        lines.append((result["winner"], tuple(result["final_scores"]), result["number_rounds"]))
+    return lines
+
+
+def check(seed=421, n_games=20):
+    reference = transcript(seed, n_games)
+    assert transcript(seed, n_games) == reference, "Same seed, different games"
+    assert transcript(seed, n_games, block_size=7) == reference, "Games depend on the block size"
+    assert transcript(seed + 1, n_games) != reference, "Different seeds, same games"
+    streams = DiceStream(seed).spawn(2)
+    assert [streams[0].face() for _ in range(20)] != [streams[1].face() for _ in range(20)], "Spawned streams are equal"
+    print(f"Transcripts of {n_games} games ({len(reference)} lines) are reproducible")
+
+
+def run(n_throws=200_000):
+    masks = [tuple(int(x) for x in mask) for mask in np.random.default_rng(0).integers(0, 2, size=(1000, 3))]
+    for name, dice in [("legacy", LegacyDice(seed=0)), ("stream", Dice(seed=0))]:
+        start = time.perf_counter()
+        for i in range(n_throws):
+            dice.throw_dice(masks[i % 1000])
+        elapsed = time.perf_counter() - start
+        print(f"{name:>7}: {1e6 * elapsed / n_throws:6.3f} us/throw")
+
+
+if __name__ == "__main__":
+    check()
+    run()
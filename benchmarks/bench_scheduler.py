@@ -0,0 +1,129 @@
+"""Batched decisions of many games at once (`GameScheduler`) against games played one by one.
+
+Checks that the batched `get_next_actions` of the players give the actions of `get_next_action` (with observations
+as dictionaries and as codes) and that the scheduler plays the same games as `Dice421Env.run` for deterministic
+players, then compares the games per second of both for several numbers of concurrent games. The players with table
+lookups are about as fast one by one; batching pays off for players with an expensive call, such as `NetworkPlayer`.
+
+Usage: `python -m benchmarks.bench_scheduler [n_games]`
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from src.Agents.GreedyAgent import GreedyPolicyPlayer
+from src.Agents.NNAgent import NNPlayer
+from src.Agents.OptimalAgent import OptimalPlayer
+from src.Agents.RandomAgent import RandomPlayer
+from src.Dice421.Game import Dice421Env
+from src.Dice421.Player import Player
+from src.Dice421.ResultStore import ResultStore
+from src.Dice421.Scheduler import GameScheduler
+from src.Dice421.encoding import OBSERVATION_RADICES, combination_codes, stack_observations
+from src.Dice421.transitions import ACTIONS
+
+
+class NetworkPlayer(Player):
+    """Policy network with random weights (two dense layers on the normalized fields of the observations), standing
+    for an agent whose decisions cost a few array operations per call whatever the number of observations."""
+
+    def __init__(self, env, hidden=64, seed=0, name="NetworkPlayer"):
+        super().__init__(env, name)
+        gen = np.random.default_rng(seed)
+        self.radices = np.array(list(OBSERVATION_RADICES.values()), dtype=np.float64)
+        self.hidden_weights = gen.normal(size=(len(OBSERVATION_RADICES), hidden))
+        self.output_weights = gen.normal(size=(hidden, len(ACTIONS)))
+
+    def get_next_action(self, state):
+        return self.get_next_actions([state])[0]
+
+    def get_next_actions(self, states_batch):
+        observations = stack_observations(states_batch)
+        inputs = np.stack(
+            [
+                combination_codes(observations[field]) if field.endswith("_comb") else observations[field]
+                for field in OBSERVATION_RADICES
+            ],
+            axis=1,
+        )
+        hidden = np.maximum((inputs / self.radices) @ self.hidden_weights, 0.0)
+        return [ACTIONS[i] for i in (hidden @ self.output_weights).argmax(axis=1)]
+
+
+def trained_agent(env, n_episodes=2_000):
+    np.random.seed(0)
+    agent = NNPlayer(
+        env, learning_rate=0.01, initial_epsilon=1.0, epsilon_decay=1.0 / (n_episodes / 2), final_epsilon=0.1
+    )
+    opponent = RandomPlayer(env)
+    for _ in range(n_episodes):
+        env.run(agent, opponent)
+        agent.decay_epsilon()
+    return agent
+
+
+def check_actions(agent, n_games=50):
+    for mode in ["dict", "code"]:
+        env = Dice421Env(seed=0, observation_mode=mode)
+        states = []
+        recorder = RandomPlayer(env)
+        recorder.learn = lambda state, *_: states.append(state)
+        for _ in range(n_games):
+            env.run(recorder, RandomPlayer(env))
+        greedy = NNPlayer(env, learning_rate=0.0, initial_epsilon=0.0, epsilon_decay=0.0, final_epsilon=0.0)
+        greedy.set_qvalues(agent.q_values)
+        for player in [greedy, GreedyPolicyPlayer.from_player(agent, env), OptimalPlayer(env)]:
+            expected = [tuple(int(x) for x in player.get_next_action(state)) for state in states]
+            assert [tuple(int(x) for x in action) for action in player.get_next_actions(states)] == expected
+        print(f"Batched actions identical to get_next_action on {len(states)} observations ({mode})")
+
+
+def records(results):
+    return [
+        (int(results["winner"][i]), tuple(results["scores"][i].tolist()), results.history(i).tobytes())
+        for i in range(len(results))
+    ]
+
+
+def check_games(policy, n_games=200):
+    # One game per environment: the scheduler must play the games of `Dice421Env.run` on the same environments
+    scheduler = GameScheduler(n_envs=n_games, seed=0)
+    player1, player2 = OptimalPlayer(scheduler.envs[0]), GreedyPolicyPlayer(scheduler.envs[0], policy)
+    results = scheduler.run(player1, player2, n_games, keep_history=True)
+    expected = ResultStore(keep_history=True)
+    for env in GameScheduler(n_envs=n_games, seed=0).envs:
+        expected.append(env.run(player1, player2))
+    assert sorted(records(results)) == sorted(records(expected))
+    print(f"{n_games} scheduled games identical to the games played one by one")
+
+
+def run(n_games=2_000):
+    env = Dice421Env(seed=0)
+    agent = trained_agent(env)
+    agent.epsilon = 0.05
+    players = {
+        "Q-learning": agent,
+        "greedy policy": GreedyPolicyPlayer.from_player(agent, env),
+        "optimal": OptimalPlayer(env),
+        "network": NetworkPlayer(env),
+    }
+    check_actions(agent)
+    check_games(players["greedy policy"].policy)
+    for name, player in players.items():
+        opponent = OptimalPlayer(env, objective="round")
+        start = time.perf_counter()
+        for _ in range(n_games):
+            env.run(player, opponent, player1_learn=False, player2_learn=False)
+        rates = [f"one by one {n_games / (time.perf_counter() - start):.0f}"]
+        for n_envs in [16, 64, 256]:
+            scheduler = GameScheduler(n_envs=n_envs, seed=0)
+            start = time.perf_counter()
+            scheduler.run(player, opponent, n_games, player1_learn=False, player2_learn=False)
+            rates.append(f"{n_envs} at once {n_games / (time.perf_counter() - start):.0f}")
+        print(f"{name:>13} vs optimal: games/s {', '.join(rates)}")
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,78 @@
+"""Games saved by the sequential evaluation of `Dice421.evaluation` compared with a fixed number of games.
+
+First checks the error guarantees of the stopping rules on simulated outcomes with known win rates (coverage of the
+final Wilson interval, error rates of the SPRT), then evaluates real matchups, lopsided (optimal player against a
+random player) and balanced (two random players), with each rule and with a fixed number of games.
+
+Usage: `python -m benchmarks.bench_sequential [max_games]`
+"""
+
+import sys
+import time
+from functools import partial
+
+import numpy as np
+
+from src.Agents.OptimalAgent import OptimalPlayer
+from src.Agents.RandomAgent import RandomPlayer
+from src.Dice421.Game import Dice421Env
+from src.Dice421.evaluation import SPRTStopping, WilsonStopping, evaluate, wilson_interval
+
+
+def simulate(rule, p, batch_size, max_games, rng):
+    """Applies a rule to simulated decisive games won with probability `p` by the first player."""
+    max_checks = -(-max_games // batch_size)
+    wins = n = 0
+    while n < max_games:
+        size = min(batch_size, max_games - n)
+        wins += int(rng.binomial(size, p))
+        n += size
+        stopped, estimate = rule.check((wins, n - wins, 0), max_checks)
+        if stopped:
+            break
+    return n, estimate
+
+
+def check(batch_size=100, max_games=4000, n_runs=2000):
+    rng = np.random.default_rng(0)
+    rule = WilsonStopping(width=0.05)
+    for p in [0.5, 0.8, 0.97]:
+        runs = [simulate(rule, p, batch_size, max_games, rng) for _ in range(n_runs)]
+        coverage = np.mean([low <= p <= high for _, estimate in runs for low, high in [estimate["interval"]]])
+        print(f"Wilson, p = {p}: coverage {coverage:.3f}, {np.mean([n for n, _ in runs]):.0f} games on average")
+        assert coverage >= 0.95 - 3 * np.sqrt(0.05 * 0.95 / n_runs)
+    rule = SPRTStopping(p0=0.45, p1=0.55)
+    for p, wrong in [(0.45, "H1"), (0.55, "H0")]:
+        runs = [simulate(rule, p, batch_size, max_games, rng) for _ in range(n_runs)]
+        error = np.mean([estimate["decision"] == wrong for _, estimate in runs])
+        print(f"SPRT, p = {p}: error rate {error:.3f}, {np.mean([n for n, _ in runs]):.0f} games on average")
+        assert error <= 0.05 + 3 * np.sqrt(0.05 * 0.95 / n_runs)
+
+
+def run(max_games=4000, batch_size=100):
+    matchups = {
+        "Optimal vs Random": (partial(OptimalPlayer, objective="round"), RandomPlayer),
+        "Random vs Random": (RandomPlayer, RandomPlayer),
+    }
+    # A rule with width 0 never stops: fixed number of games
+    rules = {"fixed": WilsonStopping(width=0.0), "Wilson 0.05": WilsonStopping(width=0.05), "SPRT": SPRTStopping()}
+    for matchup, (player1_factory, player2_factory) in matchups.items():
+        for name, rule in rules.items():
+            # Same games for each rule
+            np.random.seed(0)
+            env = Dice421Env(seed=0)
+            player1, player2 = player1_factory(env), player2_factory(env)
+            start = time.perf_counter()
+            evaluation = evaluate(env, player1, player2, rule, batch_size=batch_size, max_games=max_games)
+            elapsed = time.perf_counter() - start
+            low, high = wilson_interval(evaluation["win_1"] * evaluation["n_games"], evaluation["n_games"])
+            decision = evaluation["estimate"].get("decision") or ""
+            print(
+                f"{matchup:>18} {name:>11}: {evaluation['n_games']:5d} games in {elapsed:6.2f} s, "
+                f"win rate {evaluation['win_1']:.3f} (95% interval {low:.3f}-{high:.3f}) {decision}"
+            )
+
+
+if __name__ == "__main__":
+    check()
+    run(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,100 @@
+"""Startup time of worker processes: import of the modules and construction and reset of environments.
+
+Imports each module in a new interpreter with `-X importtime` and reports the time of all the imports it triggers
+(without the imports of the interpreter itself) and the part of `numpy` and gymnasium (median of several
+interpreters), checking that only the environment imports gymnasium and that `Dice421-v0` is registered whatever
+the order of the imports of `src` and gymnasium, then times the construction of an environment, the first use of its
+action space and `reset`.
+
+Usage: `python -m benchmarks.bench_startup [repeat]`
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import timeit
+
+import numpy as np
+
+from src.Dice421.Game import Dice421Env
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = [
+    "src",
+    "src.Dice421",
+    "src.Dice421.Combination",
+    "src.Dice421.Tournament",
+    "src.Agents.QTable",
+    "src.Agents.GreedyAgent",
+    "src.Agents.OptimalAgent",
+    "src.Agents.NNAgent",
+    "src.Dice421.Game",
+]
+# Only the environment needs gymnasium
+GYMNASIUM_MODULES = ["src.Dice421.Game"]
+PACKAGES = ["numpy", "gymnasium"]
+# Ways of making the environment from its registered id
+REGISTRATIONS = [
+    "import src; import gymnasium",
+    "import gymnasium; import src",
+    "import gymnasium; import src.Dice421.Game",
+]
+
+
+def import_times(statement):
+    """Import times (in ms) of a statement run in a new interpreter: total of the top-level imports and cumulative
+    time of the packages of `PACKAGES` (0 if not imported)."""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement], cwd=ROOT, capture_output=True, text=True
+    )
+    process.check_returncode()
+    times = dict.fromkeys(["total", *PACKAGES], 0.0)
+    # Lines "import time: self [us] | cumulative | imported package", the packages being indented by depth
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if not name[1:].startswith(" "):
+            times["total"] += int(cumulative) / 1e3
+        if name.strip() in PACKAGES and not times[name.strip()]:
+            times[name.strip()] = int(cumulative) / 1e3
+    return times
+
+
+def median_times(statement, repeat):
+    samples = [import_times(statement) for _ in range(repeat)]
+    return {name: statistics.median(sample[name] for sample in samples) for name in samples[0]}
+
+
+def run(repeat=5):
+    # Imports of the interpreter itself (e.g. `site`)
+    interpreter = median_times("pass", repeat)["total"]
+    print(f"{'module':>24} {'import (ms)':>12} " + " ".join(f"{package + ' (ms)':>15}" for package in PACKAGES))
+    for module in MODULES:
+        times = median_times(f"import {module}", repeat)
+        assert bool(times["gymnasium"]) == (module in GYMNASIUM_MODULES), f"{module} imports gymnasium"
+        print(
+            f"{module:>24} {times['total'] - interpreter:12.1f} "
+            + " ".join(f"{times[package]:15.1f}" if times[package] else f"{'-':>15}" for package in PACKAGES)
+        )
+
+    for imports in REGISTRATIONS:
+        statement = f"{imports}; gymnasium.make('Dice421-v0')"
+        subprocess.run([sys.executable, "-W", "ignore", "-c", statement], cwd=ROOT, check=True)
+    print(f"Dice421-v0 registered with the imports: {', '.join(REGISTRATIONS)}")
+
+    seeds = np.random.SeedSequence(0).spawn(1_000)
+    construction = timeit.timeit(lambda: [Dice421Env(seed=seed) for seed in seeds], number=1) / len(seeds)
+    envs = [Dice421Env(seed=seed) for seed in seeds]
+    action_space = timeit.timeit(lambda: [env.action_space for env in envs], number=1) / len(envs)
+    env = envs[0]
+    reset = timeit.timeit(env.reset, number=100_000) / 100_000
+    print(
+        f"Environment: construction {1e6 * construction:.1f} us, first use of the action space "
+        f"{1e6 * action_space:.1f} us, reset {1e6 * reset:.2f} us"
+    )
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,57 @@
+"""Hyperparameter sweep of `NNPlayer` by successive halving.
+
+Samples configurations of the learning rate, epsilon schedule and discount factor, runs the sweep and prints the
+results table, the training episodes it used and the episodes a full training of every configuration would take.
+
+Usage: `python -m benchmarks.bench_sweep [n_configs] [max_workers]`
+"""
+
+import os
+import sys
+import tempfile
+import time
+from functools import partial
+
+from src.Agents.OptimalAgent import OptimalPlayer
+from src.Agents.RandomAgent import RandomPlayer
+from src.Agents.Sweep import HyperparameterSweep, random_search
+
+SPACE = {
+    "learning_rate": (0.001, 0.5),
+    "initial_epsilon": 1.0,
+    "epsilon_decay": [1e-3, 2e-3, 5e-3],
+    "final_epsilon": [0.05, 0.1, 0.2],
+    "discount_factor": (0.8, 1.0),
+}
+
+
+def run(directory, n_configs=8, max_workers=None, min_episodes=200, max_episodes=800):
+    sweep = HyperparameterSweep(
+        random_search(SPACE, n_configs, seed=0),
+        directory,
+        opponents={"random": RandomPlayer, "optimal": partial(OptimalPlayer, objective="round")},
+        min_episodes=min_episodes,
+        max_episodes=max_episodes,
+        n_games=200,
+        seed=0,
+    )
+    start = time.perf_counter()
+    rows = sweep.run(max_workers=max_workers)
+    elapsed = time.perf_counter() - start
+    with open(os.path.join(directory, "results.csv")) as file:
+        print(file.read())
+    episodes = {}
+    for row in rows:
+        episodes[row["config"]] = max(episodes.get(row["config"], 0), row["episodes"])
+    print(
+        f"{n_configs} configurations in {elapsed:.1f} s: {sum(episodes.values())} training episodes instead of "
+        f"{n_configs * max_episodes} for a full training of each"
+    )
+    best = rows[-1]
+    print(f"Best: configuration {best['config']}, mean win rate {best['mean_win_rate']:.3f}")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        args = [int(arg) for arg in sys.argv[1:]]
+        run(directory, *args)
@@ -0,0 +1,42 @@
+"""Scaling of the tournament runner with the number of worker processes.
+
+Plays the same Random vs Random matchups with pools of increasing size, checks that the results do not depend on the
+size of the pool and reports the number of games per second.
+
+Usage: `python -m benchmarks.bench_tournament [max_workers]`
+"""
+
+import functools
+import os
+import sys
+import time
+
+import numpy as np
+
+from src.Agents.RandomAgent import RandomPlayer
+from src.Dice421.Tournament import Tournament, summarize
+
+
+def run(max_workers=None, n_games=2_000):
+    max_workers = max_workers or os.cpu_count()
+    matchups = [
+        (functools.partial(RandomPlayer, name="North"), functools.partial(RandomPlayer, name="South"), n_games),
+    ] * 4
+    tournament = Tournament(matchups, seed=421, chunk_size=100)
+    reference = None
+    workers = 1
+    while workers <= max_workers:
+        start = time.perf_counter()
+        results = tournament.run(max_workers=workers)
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference = results
+        assert all(np.array_equal(a.records(), b.records()) for a, b in zip(reference, results)), "Results depend on the number of workers"
+        print(f"{workers:3d} workers: {len(matchups) * n_games / elapsed:10,.0f} games/s")
+        workers *= 2
+    for idx, results in enumerate(reference):
+        print(f"Matchup {idx}: {summarize(results)}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,122 @@
+"""Benchmark of the vectorized environment against the scalar one.
+
+Both environments are driven by the same deterministic policy. The script first checks that each lane of
+`Dice421VectorEnv` plays exactly the games of the scalar environment with the same seed, then compares the number of
+decisions per second.
+
+Usage: `python -m benchmarks.bench_vector_env`
+"""
+
+import time
+
+import numpy as np
+
+from src.Dice421.Game import Dice421Env, BASIC_ACTIONS
+from src.Dice421.Player import Player
+from src.Dice421.VectorGame import Dice421VectorEnv, unbatch_observation
+from src.Dice421.logger import log_disable
+
+ACTIONS = np.array(sorted(BASIC_ACTIONS))
+
+
+def policy(player_comb, current_throws, round_nb, player_score):
+    """Deterministic policy which works on scalars as well as on arrays."""
+    return (player_comb[..., 0] + 3 * player_comb[..., 2] + current_throws + round_nb + player_score) % len(ACTIONS)
+
+
+class ScriptedPlayer(Player):
+    """Plays `policy` and records every transition it learns from."""
+
+    def __init__(self, env, name, transcript):
+        super().__init__(env, name)
+        self.transcript = transcript
+
+    def get_next_action(self, state):
+        idx = policy(np.array(state["player_comb"]), state["current_throws"], state["round_nb"], state["player_score"])
+        return tuple(int(x) for x in ACTIONS[idx])
+
+    def learn(self, state, action, state_next, reward, done, info):
+        self.transcript.append((state, action, state_next, reward, done))
+
+    def reset(self):
+        pass
+
+
+def scalar_games(seed, n_games):
+    env = Dice421Env(seed=seed)
+    transcript, results = [], []
+    players = [ScriptedPlayer(env, "North", transcript), ScriptedPlayer(env, "South", transcript)]
+    for _ in range(n_games):
+        output = env.run(*players)
+        results.append((output["winner"], tuple(output["final_scores"]), output["number_rounds"]))
+    return transcript, results
+
+
+def vector_actions(observations):
+    idx = policy(
+        observations["player_comb"], observations["current_throws"], observations["round_nb"], observations["player_score"]
+    )
+    return ACTIONS[idx]
+
+
+def check(num_envs=8, n_games=5, seed=421):
+    """Checks that the vectorized environment matches the scalar one."""
+    venv = Dice421VectorEnv(num_envs, seed=seed)
+    observations = venv.reset()
+    transcripts = [[] for _ in range(num_envs)]
+    results = [[] for _ in range(num_envs)]
+    while min(len(r) for r in results) < n_games:
+        actions = vector_actions(observations)
+        new_observations, rewards, dones, infos = venv.step(actions)
+        for lane in range(num_envs):
+            if len(results[lane]) < n_games:
+                transcripts[lane].append(
+                    (
+                        unbatch_observation(observations, lane),
+                        tuple(int(x) for x in actions[lane]),
+                        unbatch_observation(infos["step_observation"], lane),
+                        float(rewards[lane]),
+                        bool(dones[lane]),
+                    )
+                )
+                if infos["game_over"][lane]:
+                    results[lane].append(
+                        (
+                            int(infos["winner"][lane]),
+                            tuple(int(x) for x in infos["final_scores"][lane]),
+                            int(infos["number_rounds"][lane]),
+                        )
+                    )
+        observations = new_observations
+    for lane in range(num_envs):
+        transcript, scalar_results = scalar_games(seed + lane, n_games)
+        assert transcript == transcripts[lane], f"Lane {lane} differs from the scalar environment"
+        assert scalar_results == results[lane], f"Lane {lane} differs from the scalar environment"
+    print(f"Vectorized environment matches the scalar one on {num_envs} lanes x {n_games} games")
+
+
+def run(num_envs=4096, n_steps=200, n_games_scalar=200):
+    log_disable()
+    check()
+
+    env = Dice421Env(seed=0)
+    transcript = []
+    players = [ScriptedPlayer(env, "North", transcript), ScriptedPlayer(env, "South", transcript)]
+    start = time.perf_counter()
+    for _ in range(n_games_scalar):
+        env.run(*players)
+    scalar_rate = len(transcript) / (time.perf_counter() - start)
+
+    venv = Dice421VectorEnv(num_envs, seed=0)
+    observations = venv.reset()
+    start = time.perf_counter()
+    for _ in range(n_steps):
+        observations, *_ = venv.step(vector_actions(observations))
+    vector_rate = num_envs * n_steps / (time.perf_counter() - start)
+
+    print(f"    scalar: {scalar_rate:12,.0f} decisions/s")
+    print(f"vectorized: {vector_rate:12,.0f} decisions/s ({num_envs} lanes), speedup x{vector_rate / scalar_rate:.0f}")
+
+
+if __name__ == "__main__":
+    run()
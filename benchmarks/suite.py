@@ -0,0 +1,243 @@
+"""Benchmark suite of the hot paths of the game, with baselines and regression checks.
+
+Each case reports its throughput (best of several repeats), the peak memory traced during its calls and the number of
+memory blocks still allocated after them. Results can be saved as a JSON baseline and later runs compared with it: the
+suite fails (exit code 1) when a throughput drops or a peak memory grows by more than the threshold (peaks also allow
+one refill of the dice stream, which happens during the traced calls or not depending on the faces drawn before them).
+Everything runs offline with the standard library and `numpy`.
+
+Usage:
+    python -m benchmarks.suite                       # run and compare with the baseline, if any
+    python -m benchmarks.suite --save                # run and save the results as the baseline
+    python -m benchmarks.suite --threshold 0.1 --cases dice_throw env_step
+"""
+
+import argparse
+import gc
+import itertools as it
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from src.Agents.NNAgent import NNPlayer
+from src.Agents.RandomAgent import RandomPlayer
+from src.Dice421.Combination import Combination
+from src.Dice421.Dice import Dice
+from src.Dice421.Game import Dice421Env, THROW_ALL
+from src.Dice421.rng import BLOCK_SIZE
+from src.Dice421.transitions import ACTIONS
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Peak memory of a refill of the dice stream (`DiceStream.refill`): the generated array, the new list and the old
+# list of faces (8 bytes per face, with a margin for their headers). Whether the traced calls refill the stream depends
+# on the faces drawn before them (e.g. with `--repeat 2`), so the peaks are compared with this tolerance on top of the
+# threshold
+REFILL_MEMORY = 3 * (8 * BLOCK_SIZE + 1024)
+
+CASES = {}
+
+
+def case(unit):
+    """Registers a case: a function returning a callable (one call of the benchmark) and the number of units (e.g.
+    games) per call."""
+
+    def register(setup):
+        CASES[setup.__name__] = (unit, setup)
+        return setup
+
+    return register
+
+
+def make_agent(env, n_episodes=1_000):
+    return NNPlayer(
+        env, learning_rate=0.01, initial_epsilon=1.0, epsilon_decay=1.0 / (n_episodes / 2), final_epsilon=0.1
+    )
+
+
+@case("combinations/s")
+def combination():
+    throws = [list(throw) for throw in it.product(range(1, 7), repeat=3)]
+
+    def call():
+        previous = Combination(throws[-1])
+        for throw in throws:
+            combination = Combination(throw)
+            _ = combination > previous
+            previous = combination
+
+    return call, len(throws)
+
+
+@case("throws/s")
+def dice_throw():
+    dice = Dice(seed=0)
+    masks = ACTIONS[1:] * 100
+
+    def call():
+        for mask in masks:
+            dice.throw_dice(mask)
+
+    return call, len(masks)
+
+
+@case("envs/s")
+def env_startup():
+    seeds = np.random.SeedSequence(0).spawn(100)
+
+    def call():
+        for seed in seeds:
+            Dice421Env(seed=seed).reset()
+
+    return call, len(seeds)
+
+
+@case("steps/s")
+def env_step():
+    env = Dice421Env(seed=0)
+    env.players = [RandomPlayer(env), RandomPlayer(env)]
+    env.reset()
+    env.reset_round()
+    n_steps = 1_000
+
+    def call():
+        for _ in range(n_steps):
+            env.step(THROW_ALL)
+
+    return call, n_steps
+
+
+@case("games/s")
+def run_random():
+    env = Dice421Env(seed=0)
+    player1, player2 = RandomPlayer(env), RandomPlayer(env)
+    n_games = 20
+
+    def call():
+        for _ in range(n_games):
+            env.run(player1, player2)
+
+    return call, n_games
+
+
+@case("updates/s")
+def nn_learn():
+    env = Dice421Env(seed=0)
+    player, opponent = make_agent(env), RandomPlayer(env)
+    # Transitions of real games, replayed
+    transitions = []
+    player.learn = lambda *transition: transitions.append(transition)
+    for _ in range(20):
+        env.run(player, opponent)
+    del player.learn
+
+    def call():
+        for transition in transitions:
+            player.learn(*transition)
+
+    return call, len(transitions)
+
+
+@case("episodes/s")
+def training():
+    n_episodes = 100
+
+    def call():
+        np.random.seed(0)
+        env = Dice421Env(seed=0)
+        agent, opponent = make_agent(env, n_episodes), RandomPlayer(env)
+        for _ in range(n_episodes):
+            env.run(agent, opponent)
+            agent.decay_epsilon()
+
+    return call, n_episodes
+
+
+def measure(setup, repeat=5, min_time=0.2):
+    """Returns the throughput (units per second, best of `repeat`), the peak traced memory of a call (bytes, maximum
+    over `repeat` calls, as some calls refill buffers) and the number of blocks still allocated after them."""
+    call, units = setup()
+    call()  # Warm-up
+    # Number of calls per repeat so that each repeat lasts at least `min_time`
+    start = time.perf_counter()
+    call()
+    number = max(1, int(min_time / max(time.perf_counter() - start, 1e-9)))
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            call()
+        best = min(best, (time.perf_counter() - start) / number)
+
+    gc.collect()
+    tracemalloc.start()
+    blocks = sys.getallocatedblocks()
+    for _ in range(repeat):
+        call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    gc.collect()
+    return {"throughput": units / best, "peak_memory": peak, "blocks": sys.getallocatedblocks() - blocks}
+
+
+def compare(results, baseline, threshold):
+    """Returns the list of regressions (throughput lower than the baseline by more than the relative threshold, or peak
+    memory higher by more than the relative threshold and one refill of the dice stream)."""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        reference = baseline[name]
+        if result["throughput"] < (1 - threshold) * reference["throughput"]:
+            regressions.append(f"{name}: throughput {result['throughput']:,.0f} < {reference['throughput']:,.0f}")
+        if result["peak_memory"] > (1 + threshold) * reference["peak_memory"] + REFILL_MEMORY:
+            regressions.append(f"{name}: peak memory {result['peak_memory']:,} > {reference['peak_memory']:,}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="JSON file of the baseline")
+    parser.add_argument("--save", action="store_true", help="Save the results as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative regression allowed (default 0.2)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in args.cases:
+        unit, setup = CASES[name]
+        results[name] = dict(measure(setup, repeat=args.repeat), unit=unit)
+        result = results[name]
+        print(
+            f"{name:>12}: {result['throughput']:12,.0f} {unit:<15} peak {result['peak_memory'] / 1024:9.1f} KiB"
+            f"  blocks {result['blocks']:+6d}"
+        )
+
+    if args.save:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as file:
+                baseline = json.load(file)
+        baseline.update(results)
+        with open(args.baseline, "w") as file:
+            json.dump(baseline, file, indent=2)
+        print(f"Baseline saved in {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare with (use --save)")
+        return 0
+    with open(args.baseline) as file:
+        regressions = compare(results, json.load(file), args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+from .QTable import QTable
+import copy
+import os
+import pickle
+import queue
+import shutil
+import threading
+import time
+import numpy as np
+
+# Files of a checkpoint directory: the Q-values (see `QTable.save`) and the rest of the training state (pickled)
+QTABLE_FILE = "qtable.qtable"
+STATE_FILE = "state.pkl"
+PREFIX = "checkpoint_"
+
+
+class CheckpointWriter:
+    """Background thread writing checkpoints to disk, so that the training loop only pays for the snapshot.
+
+    Checkpoints are written in a temporary directory renamed once complete, so a crash never leaves a partial
+    checkpoint. Only the `keep` most recent checkpoints are kept. An error of the thread is raised by the next call of
+    `submit` or `close`.
+    """
+
+    def __init__(self, directory, keep=3):
+        self.directory = directory
+        self.keep = keep
+        self.error = None
+        os.makedirs(directory, exist_ok=True)
+        # At most one snapshot waits while another is written: a slow disk delays training instead of piling copies
+        self.queue = queue.Queue(maxsize=1)
+        self.thread = threading.Thread(target=self.loop, daemon=True)
+        self.thread.start()
+
+    def loop(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            try:
+                self.write(*item)
+            except Exception as error:
+                self.error = error
+
+    def write(self, episode, q_values, state):
+        path = os.path.join(self.directory, f"{PREFIX}{episode:09d}")
+        tmp_path = path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        q_values.save(os.path.join(tmp_path, QTABLE_FILE), metadata={"episode": episode, "epsilon": state["epsilon"]})
+        with open(os.path.join(tmp_path, STATE_FILE), "wb") as file:
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+        shutil.rmtree(path, ignore_errors=True)
+        os.rename(tmp_path, path)
+        for old in list_checkpoints(self.directory)[: -self.keep]:
+            shutil.rmtree(old, ignore_errors=True)
+
+    def check(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise RuntimeError("Writing a checkpoint failed") from error
+
+    def submit(self, episode, q_values, state):
+        self.check()
+        self.queue.put((episode, q_values, state))
+
+    def close(self):
+        """Waits for the pending checkpoints to be written and stops the thread."""
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        self.check()
+
+
+def list_checkpoints(directory):
+    """Returns the paths of the complete checkpoints of a directory, from the oldest to the most recent."""
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(name for name in os.listdir(directory) if name.startswith(PREFIX) and not name.endswith(".tmp"))
+    return [os.path.join(directory, name) for name in names]
+
+
+class CheckpointTrainer:
+    """Trains an `NNPlayer` against an opponent with periodic checkpoints, and resumes from the latest one.
+
+    A checkpoint holds the Q-values, the epsilon of the agent, its buffered transitions and metrics, the number of
+    episodes and the states of the random generators (global `numpy` generator used for exploration, dice stream and
+    action space of the environment). Resuming from a checkpoint therefore continues the run exactly as if it had not
+    been interrupted. The training loop only copies the state (a few milliseconds for a dense table), the files are
+    written by a background thread (see `CheckpointWriter`).
+
+    The opponent must not keep a state between games other than the generators of the environment (e.g.
+    `RandomPlayer`, `OptimalPlayer` or a frozen agent), and the agent must use `agent.env`.
+
+    Args:
+        agent (NNPlayer): Agent to train.
+        opponent (Player): Opponent of the training games.
+        directory (str): Directory of the checkpoints.
+        checkpoint_every (int): Number of episodes between two checkpoints.
+        keep (int): Number of checkpoints kept on disk.
+    """
+
+    def __init__(self, agent, opponent, directory, checkpoint_every=1000, keep=3):
+        self.agent = agent
+        self.opponent = opponent
+        self.env = agent.env
+        self.directory = directory
+        self.checkpoint_every = checkpoint_every
+        self.keep = keep
+        self.episode = 0
+
+    def snapshot(self):
+        """Returns copies of the Q-values and of the rest of the training state."""
+        agent = self.agent
+        buffer = None if agent.buffer is None else agent.buffer.arrays()
+        state = {
+            "episode": self.episode,
+            "epsilon": agent.epsilon,
+            "metrics": copy.deepcopy(agent.metrics),
+            "buffer": buffer,
+            "np_random": np.random.get_state(),
+            "env_rng": self.env.get_rng_state(),
+        }
+        return agent.q_values.copy(), state
+
+    def restore(self, path):
+        """Restores the training state of a checkpoint directory."""
+        q_values, _ = QTable.load(os.path.join(path, QTABLE_FILE), mmap_mode=None)
+        if not q_values.dense:
+            # Dictionary of rows, faster to update than the binary search of a loaded table
+            q_values.rows = dict(q_values.rows.items())
+        with open(os.path.join(path, STATE_FILE), "rb") as file:
+            state = pickle.load(file)
+        agent = self.agent
+        agent.set_qvalues(q_values)
+        agent.epsilon = state["epsilon"]
+        agent.metrics = state["metrics"]
+        if state["buffer"] is not None:
+            buffer = agent.buffer
+            buffer.states, buffer.actions, buffer.next_states, buffer.rewards, buffer.dones = (
+                array.tolist() for array in state["buffer"]
+            )
+        np.random.set_state(state["np_random"])
+        self.env.set_rng_state(state["env_rng"])
+        self.episode = state["episode"]
+
+    def resume(self):
+        """Restores the latest checkpoint of the directory, if any.
+
+        Returns:
+            int: Number of episodes of the restored checkpoint (0 without checkpoint).
+        """
+        checkpoints = list_checkpoints(self.directory)
+        if checkpoints:
+            self.restore(checkpoints[-1])
+        return self.episode
+
+    def train(self, n_episodes):
+        """Plays training games until `n_episodes` episodes in total (including the episodes of a resumed run).
+
+        Returns:
+            dict: Episodes played by this call, their duration, the number of checkpoints written and the time
+                spent in the snapshots.
+        """
+        writer = CheckpointWriter(self.directory, self.keep)
+        agent, opponent, env = self.agent, self.opponent, self.env
+        start_episode = self.episode
+        n_checkpoints = 0
+        snapshot_time = 0.0
+        start = time.perf_counter()
+        try:
+            while self.episode < n_episodes:
+                result = env.run(agent, opponent)
+                agent.metrics.record_game(result)
+                agent.decay_epsilon()
+                self.episode += 1
+                if self.episode % self.checkpoint_every == 0 or self.episode == n_episodes:
+                    snapshot_start = time.perf_counter()
+                    writer.submit(self.episode, *self.snapshot())
+                    snapshot_time += time.perf_counter() - snapshot_start
+                    n_checkpoints += 1
+        finally:
+            writer.close()
+        return {
+            "episodes": self.episode - start_episode,
+            "elapsed": time.perf_counter() - start,
+            "checkpoints": n_checkpoints,
+            "snapshot_time": snapshot_time,
+        }
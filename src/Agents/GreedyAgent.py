@@ -0,0 +1,149 @@
+from ..Dice421.Player import Player
+from ..Dice421.encoding import encode_states
+from ..Dice421.transitions import ACTIONS
+from .QTable import QTable, N_ACTIONS, action_index, encoder_header, read_arrays, read_binary_header, write_binary
+import numpy as np
+
+# Binary format of saved policies (see `write_binary`): magic bytes, version, header length, JSON header padded to
+# `ALIGNMENT` bytes, then the actions (`uint8`, one per state) of a dense policy or the sorted codes (`int64`) and the
+# actions of a sparse one
+MAGIC = b"G421"
+FORMAT_VERSION = 1
+
+
+class GreedyPolicy:
+    """Greedy actions of a `QTable` compiled into a `uint8` array (indices in `ACTIONS`).
+
+    Dense tables give one action per possible state, the unvisited states having the fallback action. Sparse tables
+    give the sorted codes of their visited states and their actions, found by binary search. The policy is a
+    picklable factory of `GreedyPolicyPlayer` instances (e.g. for `Tournament`).
+
+    Args:
+        encoder (ObservationEncoder or FeatureEncoder): Encoding of the states.
+        actions (np.ndarray): Action of each state (dense) or of each code of `codes` (sparse).
+        codes (np.ndarray, optional): Sorted codes of the states of a sparse policy.
+        fallback (int): Action of the unseen states (0, throwing no dice, as the argmax of zero Q-values).
+    """
+
+    def __init__(self, encoder, actions, codes=None, fallback=0):
+        self.encoder = encoder
+        self.actions = actions
+        self.codes = codes
+        self.fallback = fallback
+
+    @classmethod
+    def from_qtable(cls, q_values, fallback=0):
+        """Compiles the greedy actions of a `QTable` (ties go to the first action, as in `NNPlayer`)."""
+        if not isinstance(fallback, (int, np.integer)):
+            fallback = action_index(fallback)
+        if q_values.dense:
+            actions = q_values.values.argmax(axis=1).astype(np.uint8)
+            actions[~q_values.visited] = fallback
+            return cls(q_values.encoder, actions, fallback=fallback)
+        codes, rows = np.array(list(q_values.rows.items()), dtype=np.int64).reshape(-1, 2).T
+        order = np.argsort(codes)
+        actions = q_values.values[rows[order]].argmax(axis=1).astype(np.uint8)
+        return cls(q_values.encoder, actions, codes=codes[order], fallback=fallback)
+
+    @property
+    def dense(self):
+        return self.codes is None
+
+    @property
+    def nbytes(self):
+        return self.actions.nbytes + (0 if self.dense else self.codes.nbytes)
+
+    def __len__(self):
+        return len(self.actions)
+
+    def action_index(self, state):
+        """Returns the index in `ACTIONS` of the greedy action of a state (observation or encoded integer)."""
+        code = state if isinstance(state, (int, np.integer)) else self.encoder.encode(state)
+        if self.codes is None:
+            return self.actions[code]
+        i = self.codes.searchsorted(code)
+        if i < len(self.codes) and self.codes[i] == code:
+            return self.actions[i]
+        return self.fallback
+
+    def action_indices(self, codes):
+        """Vectorized `action_index` for an array of encoded states."""
+        codes = np.asarray(codes, dtype=np.int64)
+        if self.codes is None:
+            return self.actions[codes]
+        if len(self.codes) == 0:
+            return np.full(len(codes), self.fallback, dtype=np.uint8)
+        i = np.minimum(self.codes.searchsorted(codes), len(self.codes) - 1)
+        return np.where(self.codes[i] == codes, self.actions[i], self.fallback).astype(np.uint8)
+
+    def action_probabilities(self, observations):
+        """Greedy actions of a batch of observations (dictionary of arrays) as one-hot probabilities."""
+        return np.eye(N_ACTIONS)[self.action_indices(self.encoder.encode_batch(observations))]
+
+    def save(self, path, metadata=None):
+        """Saves the policy in a binary file which can be memory-mapped by `load`."""
+        header = dict(
+            encoder_header(self.encoder),
+            dense=self.dense,
+            n_states=len(self.actions),
+            fallback=int(self.fallback),
+            metadata=metadata or {},
+        )
+        arrays = [self.actions] if self.dense else [self.codes.astype("<i8"), self.actions]
+        write_binary(path, MAGIC, FORMAT_VERSION, header, arrays)
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        """Loads a policy saved by `save`.
+
+        Args:
+            path (str): Path of the file.
+            mmap_mode (str, optional): Mode of `np.memmap` ("r" to share one copy between processes through the page
+                cache) or None to read the arrays in memory.
+
+        Returns:
+            tuple(GreedyPolicy, dict): The policy and the metadata saved with it.
+        """
+        header, offset = read_binary_header(path, MAGIC, FORMAT_VERSION, "policy")
+        n_states = header["n_states"]
+        shapes = [(np.uint8, n_states)] if header["dense"] else [(np.dtype("<i8"), n_states), (np.uint8, n_states)]
+        arrays = read_arrays(path, offset, shapes, mmap_mode)
+        encoder = QTable.header_encoder(header)
+        codes = None if header["dense"] else arrays[0]
+        return cls(encoder, arrays[-1], codes=codes, fallback=header["fallback"]), header["metadata"]
+
+    def __call__(self, env):
+        return GreedyPolicyPlayer(env, self)
+
+
+class GreedyPolicyPlayer(Player):
+    """Agent playing a compiled `GreedyPolicy`, without exploration nor learning (e.g. a frozen `NNPlayer` in
+    evaluation games). Each decision is an encoding and a lookup in the array of actions."""
+
+    def __init__(self, env, policy=None, name="GreedyPolicyPlayer"):
+        super().__init__(env, name)
+        self.policy = policy
+
+    @classmethod
+    def from_player(cls, player, env=None, fallback=0):
+        """Freezes the greedy policy of an `NNPlayer` (its buffered transitions are learned first)."""
+        return cls(player.env if env is None else env, player.compile_policy(fallback), player.name)
+
+    def get_next_action(self, state):
+        return ACTIONS[self.policy.action_index(state)]
+
+    def get_next_actions(self, states_batch):
+        return [ACTIONS[i] for i in self.policy.action_indices(encode_states(self.policy.encoder, states_batch))]
+
+    def action_probabilities(self, observations):
+        return self.policy.action_probabilities(observations)
+
+    def reset(self) -> None:
+        pass
+
+    def save_model(self, model_prefix: str = None):
+        """Saves the policy in `{model_prefix}.policy` (see `GreedyPolicy.save`)."""
+        self.policy.save(f"{model_prefix or self.name}.policy", metadata={"name": self.name})
+
+    def load_model(self, model_prefix: str = None, mmap_mode="r"):
+        self.policy, _ = GreedyPolicy.load(f"{model_prefix or self.name}.policy", mmap_mode=mmap_mode)
@@ -0,0 +1,220 @@
+from ..Dice421.Game import Dice421Env
+from ..Dice421.encoding import ObservationEncoder, ROUND_RADICES
+from .NNAgent import NNPlayer
+from .QTable import QTable, N_ACTIONS, DENSE_MAX_STATES
+from .RandomAgent import RandomPlayer
+from multiprocessing import shared_memory
+import multiprocessing as mp
+import time
+import numpy as np
+
+# Entries of the shared control array written by the coordinator
+EPSILON, STOP = 0, 1
+
+
+class SharedQTable:
+    """Dense `QTable` whose arrays live in `multiprocessing.shared_memory` blocks.
+
+    The coordinator creates the blocks (`names=None`) and the workers attach to them by name: all the processes read
+    and update the same Q-values.
+    """
+
+    def __init__(self, encoder=None, names=None):
+        self.encoder = ObservationEncoder(ROUND_RADICES) if encoder is None else encoder
+        n_states = self.encoder.n_states
+        if n_states > DENSE_MAX_STATES:
+            raise ValueError(f"The encoding has {n_states} states, too many for a dense table")
+        create = names is None
+        sizes = [n_states * N_ACTIONS * np.dtype(np.float32).itemsize, n_states]
+        self.blocks = [
+            shared_memory.SharedMemory(name=None if create else name, create=create, size=size)
+            for name, size in zip(names or [None, None], sizes)
+        ]
+        self.table = QTable.__new__(QTable)
+        self.table.encoder = self.encoder
+        self.table.dense = True
+        self.table.values = np.ndarray((n_states, N_ACTIONS), dtype=np.float32, buffer=self.blocks[0].buf)
+        self.table.visited = np.ndarray(n_states, dtype=bool, buffer=self.blocks[1].buf)
+        if create:
+            self.table.values[...] = 0.0
+            self.table.visited[...] = False
+
+    @property
+    def names(self):
+        return [block.name for block in self.blocks]
+
+    def close(self, unlink=False):
+        # The arrays must be released before the blocks
+        self.table = None
+        for block in self.blocks:
+            block.close()
+            if unlink:
+                block.unlink()
+
+
+class SharedArray:
+    """Small `numpy` array in a shared memory block (created if `name` is None, attached otherwise)."""
+
+    def __init__(self, shape, dtype, name=None):
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        self.block = shared_memory.SharedMemory(name=name, create=name is None, size=size)
+        self.array = np.ndarray(shape, dtype=dtype, buffer=self.block.buf)
+        if name is None:
+            self.array[...] = 0
+
+    def close(self, unlink=False):
+        self.array = None
+        self.block.close()
+        if unlink:
+            self.block.unlink()
+
+
+def _train_worker(
+    index,
+    n_workers,
+    table_names,
+    encoder,
+    agent_kwargs,
+    opponent_factory,
+    n_episodes,
+    seed_sequence,
+    control_name,
+    counters_name,
+    timings_name,
+):
+    """Plays `n_episodes` training games, updating the shared Q-table without locks, and writes its own training time
+    (from its first to its last game)."""
+    table = SharedQTable(encoder, names=table_names)
+    control = SharedArray(2, np.float64, name=control_name)
+    counters = SharedArray(n_workers, np.int64, name=counters_name)
+    timings = SharedArray(n_workers, np.float64, name=timings_name)
+    # Exploration uses the global generator
+    np.random.seed(int(seed_sequence.generate_state(1)[0]))
+    env = Dice421Env(seed=seed_sequence)
+    agent = NNPlayer(env, **agent_kwargs)
+    agent.set_qvalues(table.table)
+    opponent = opponent_factory(env)
+    start = time.perf_counter()
+    for _ in range(n_episodes):
+        if control.array[STOP]:
+            break
+        agent.epsilon = float(control.array[EPSILON])
+        env.run(agent, opponent)
+        counters.array[index] += 1
+    timings.array[index] = time.perf_counter() - start
+    del agent
+    table.close()
+    control.close()
+    counters.close()
+    timings.close()
+
+
+class HogwildTrainer:
+    """Trains an `NNPlayer` with several processes updating one shared dense Q-table without locks (Hogwild).
+
+    Each worker has its own `Dice421Env` and seed, and plays training games against a player built by
+    `opponent_factory`. The coordinator (the calling process) follows the total number of episodes to apply the
+    epsilon schedule of `NNPlayer` (`epsilon = max(final_epsilon, initial_epsilon - epsilon_decay * episodes)`) and
+    writes checkpoints of the Q-table. The encoding must be small enough for a dense table (by default, the fields of
+    the current round, see `ROUND_RADICES`), and observations are dictionaries.
+
+    Args:
+        n_workers (int): Number of worker processes.
+        opponent_factory (callable): Builds the opponent from the environment (must be picklable).
+        encoder (ObservationEncoder or FeatureEncoder, optional): Encoding of the states (must be picklable).
+        seed (int, optional): Seed of the workers (each one gets its own child seed).
+        **agent_kwargs: Hyperparameters of `NNPlayer` (learning_rate, initial_epsilon, epsilon_decay, final_epsilon,
+            discount_factor).
+    """
+
+    def __init__(self, n_workers, opponent_factory=RandomPlayer, encoder=None, seed=None, **agent_kwargs):
+        self.n_workers = n_workers
+        self.opponent_factory = opponent_factory
+        self.encoder = ObservationEncoder(ROUND_RADICES) if encoder is None else encoder
+        self.entropy = np.random.SeedSequence(seed).entropy
+        self.agent_kwargs = agent_kwargs
+
+    def epsilon(self, episodes):
+        kwargs = self.agent_kwargs
+        return max(kwargs["final_epsilon"], kwargs["initial_epsilon"] - kwargs["epsilon_decay"] * episodes)
+
+    def train(self, n_episodes, checkpoint_every=None, checkpoint_prefix=None, poll_interval=0.02):
+        """Plays `n_episodes` training games split between the workers.
+
+        Args:
+            n_episodes (int): Total number of training games.
+            checkpoint_every (int, optional): Number of episodes between checkpoints (requires `checkpoint_prefix`).
+            checkpoint_prefix (str, optional): Checkpoints are saved in `{checkpoint_prefix}_{episodes}.qtable`.
+            poll_interval (float): Seconds between two updates of epsilon by the coordinator.
+
+        Returns:
+            tuple(QTable, dict): The learned Q-values (a copy in private memory) and statistics of the run (episodes,
+                training time and episodes per second of each worker, and in total).
+        """
+        if checkpoint_every is not None and checkpoint_prefix is None:
+            raise ValueError("Checkpoints need a checkpoint_prefix")
+        table = SharedQTable(self.encoder)
+        control = SharedArray(2, np.float64)
+        counters = SharedArray(self.n_workers, np.int64)
+        timings = SharedArray(self.n_workers, np.float64)
+        control.array[EPSILON] = self.epsilon(0)
+        seeds = np.random.SeedSequence(self.entropy).spawn(self.n_workers)
+        workers = [
+            mp.Process(
+                target=_train_worker,
+                args=(
+                    index,
+                    self.n_workers,
+                    table.names,
+                    self.encoder,
+                    self.agent_kwargs,
+                    self.opponent_factory,
+                    n_episodes // self.n_workers + (index < n_episodes % self.n_workers),
+                    seeds[index],
+                    control.block.name,
+                    counters.block.name,
+                    timings.block.name,
+                ),
+            )
+            for index in range(self.n_workers)
+        ]
+        start = time.perf_counter()
+        try:
+            for worker in workers:
+                worker.start()
+            next_checkpoint = checkpoint_every
+            while any(worker.is_alive() for worker in workers):
+                time.sleep(poll_interval)
+                episodes = int(counters.array.sum())
+                control.array[EPSILON] = self.epsilon(episodes)
+                if next_checkpoint is not None and episodes >= next_checkpoint:
+                    metadata = dict(self.agent_kwargs, epsilon=float(control.array[EPSILON]), episodes=episodes)
+                    table.table.copy().save(f"{checkpoint_prefix}_{episodes}.qtable", metadata=metadata)
+                    next_checkpoint = (episodes // checkpoint_every + 1) * checkpoint_every
+            elapsed = time.perf_counter() - start
+            for worker in workers:
+                worker.join()
+            if any(worker.exitcode != 0 for worker in workers):
+                raise RuntimeError("A training worker failed")
+            q_values = table.table.copy()
+            episodes = counters.array.copy()
+            worker_elapsed = timings.array.copy()
+        finally:
+            control.array[STOP] = 1
+            for worker in workers:
+                if worker.is_alive():
+                    worker.join()
+            table.close(unlink=True)
+            control.close(unlink=True)
+            counters.close(unlink=True)
+            timings.close(unlink=True)
+        # Each worker over its own training time (the processes start one after the other), the total over the time of
+        # the whole run
+        stats = {
+            "episodes": episodes,
+            "elapsed": elapsed,
+            "worker_elapsed": worker_elapsed,
+            "episodes_per_second": episodes / np.maximum(worker_elapsed, 1e-9),
+            "total_episodes_per_second": episodes.sum() / elapsed,
+        }
+        return q_values, stats
@@ -1,7 +1,7 @@
 from ..Dice421.Player import Player
 import numpy as np
 from ..Dice421.logger import log
-from ..Dice421.Game import BASIC_ACTIONS, PASS
+from ..Dice421.constants import BASIC_ACTIONS, PASS
 import time
 
 
@@ -1,5 +1,10 @@
 from ..Dice421.Player import Player
-from collections import defaultdict
+from ..Dice421.encoding import encode_states
+from ..Dice421.metrics import TrainingMetrics
+from ..Dice421.transitions import ACTIONS
+from .GreedyAgent import GreedyPolicy
+from .QTable import QTable, action_index
+from .TransitionBuffer import TransitionBuffer
 import numpy as np
 
 
@@ -15,9 +20,20 @@ class NNPlayer(Player):
         final_epsilon,
         discount_factor=0.95,
         name="NNPlayer",
+        batch_size=None,
+        encoder=None,
     ):
         super().__init__(env, name)
-        self.q_values = defaultdict(lambda: np.zeros((2, 2, 2)))
+        # States are encoded by `encoder` (e.g. a `FeatureEncoder` abstracting the observations, which must then be
+        # dictionaries) or by the full `ObservationEncoder`, which reads the codes carried by the observations of the
+        # environment (or given with `observation_mode="code"`): no encoding in the agent
+        self.q_values = QTable(encoder)
+        full_encoder = getattr(self.q_values.encoder, "all_fields", False)
+        if getattr(env, "observation_mode", "dict") == "code" and not full_encoder:
+            raise ValueError("Observations given as codes need the full ObservationEncoder")
+        # With a batch size, the transitions given to `learn` are buffered and learned by batches (see `learn_batch`)
+        self.batch_size = batch_size
+        self.buffer = None if batch_size is None else TransitionBuffer(batch_size, self.q_values.encode)
 
         self.lr = learning_rate
         self.discount_factor = discount_factor
@@ -26,37 +42,109 @@ class NNPlayer(Player):
         self.epsilon_decay = epsilon_decay
         self.final_epsilon = final_epsilon
 
-        self.training_error = []
+        # Streaming statistics of the temporal differences (the results of the games can be recorded with
+        # `metrics.record_game`)
+        self.metrics = TrainingMetrics()
 
     def get_next_action(self, state):
         """
         Returns the best action with probability (1 - epsilon)
         otherwise a random action with probability epsilon to ensure exploration.
         """
-        state_hashed = tuple(state.values())
         # with probability epsilon return a random action to explore the environment
         if np.random.random() < self.epsilon:
             return self.env.action_space.sample()
 
         # with probability (1 - epsilon) act greedily (exploit)
         else:
-            q_vals = self.q_values[state_hashed]
-            action = np.unravel_index(np.argmax(q_vals), q_vals.shape)
-            return action
+            # Index of the greedy action in `ACTIONS` (first one in case of ties)
+            return ACTIONS[self.q_values.get(state).argmax()]
+
+    def get_next_actions(self, states_batch):
+        """Epsilon-greedy actions of a batch of observations, with one gather of the Q-values of all of them."""
+        q_values = self.q_values.get_batch(encode_states(self.q_values.encoder, states_batch))
+        actions = [ACTIONS[i] for i in q_values.argmax(axis=1)]
+        for i in np.flatnonzero(np.random.random(len(actions)) < self.epsilon):
+            actions[i] = self.env.action_space.sample()
+        return actions
+
+    def action_probabilities(self, observations):
+        """Probabilities of the epsilon-greedy actions for a batch of observations (dictionary of arrays)."""
+        q_values = self.q_values.get_batch(self.q_values.encoder.encode_batch(observations))
+        greedy = np.eye(q_values.shape[1])[q_values.argmax(axis=1)]
+        return (1 - self.epsilon) * greedy + self.epsilon / q_values.shape[1]
 
     def learn(self, state, action, state_next, reward, done, info):
-        """Updates the Q-value of an action."""
-        state_hashed = tuple(state.values())
-        state_next_hashed = tuple(state_next.values())
-        # print(self.q_values)
-        future_q_value = (not done) * np.max(self.q_values[state_next_hashed])
-        temporal_difference = reward + self.discount_factor * future_q_value - self.q_values[state_hashed][action]
+        """Updates the Q-value of an action (or buffers the transition if the agent learns by batches)."""
+        if self.buffer is not None:
+            self.buffer.append(state, action, state_next, reward, done)
+            if self.buffer.is_full():
+                self.flush()
+            return
+        future_q_value = (not done) * np.max(self.q_values.get(state_next))
+        q_vals = self.q_values[state].reshape(-1)
+        idx = action_index(action)
+        temporal_difference = reward + self.discount_factor * future_q_value - q_vals[idx]
+
+        q_vals[idx] = q_vals[idx] + self.lr * temporal_difference
+        self.metrics.record_td(temporal_difference)
+
+    def learn_batch(self, states, actions, next_states, rewards, dones, duplicates="sum"):
+        """Updates the Q-values with a batch of transitions at once.
+
+        All the targets are computed with the Q-values from before the batch. When a pair (state, action) appears
+        several times in the batch, its temporal differences are either summed (`duplicates="sum"`, the same update
+        as learning the transitions one at a time to first order in the learning rate) or averaged
+        (`duplicates="mean"`, one update per pair, which stays stable for large batches).
+
+        Args:
+            states (np.ndarray): Encoded states (see `QTable.encode`).
+            actions (np.ndarray): Indices of the actions (see `action_index`) or actions of shape `(N, 3)`.
+            next_states (np.ndarray): Encoded states after the actions.
+            rewards (np.ndarray): Rewards of the transitions.
+            dones (np.ndarray): Whether the transitions end the game (no future Q-value).
+            duplicates (str): "sum" or "mean".
+
+        Returns:
+            np.ndarray: Temporal differences of the transitions.
+        """
+        if duplicates not in ("sum", "mean"):
+            raise ValueError(f"Unknown duplicates mode {duplicates}")
+        actions = np.asarray(actions, dtype=np.int64)
+        if actions.ndim == 2:
+            actions = actions @ np.array([4, 2, 1])
+        future_q_values = np.where(dones, 0.0, self.q_values.get_batch(next_states).max(axis=1))
+        rows = self.q_values.insert_rows(states)
+        # Flat index of each updated Q-value (the table may have grown when inserting the rows)
+        idx = rows * self.q_values.values.shape[1] + actions
+        q_values = self.q_values.values.reshape(-1)
+        temporal_differences = rewards + self.discount_factor * future_q_values - q_values[idx]
+
+        updates = self.lr * temporal_differences
+        if duplicates == "mean":
+            _, inverse, counts = np.unique(idx, return_inverse=True, return_counts=True)
+            updates = updates / counts[inverse]
+        np.add.at(q_values, idx, updates.astype(np.float32))
+        self.metrics.record_td_batch(temporal_differences)
+        return temporal_differences
 
-        self.q_values[state_hashed][action] = self.q_values[state_hashed][action] + self.lr * temporal_difference
-        self.training_error.append(temporal_difference)
+    @property
+    def training_error(self):
+        """Temporal differences of the most recent learned steps (see `metrics` for the statistics of all steps)."""
+        self.metrics.td_errors.flush()
+        return self.metrics.td_errors.window.values()
+
+    def flush(self):
+        """Learns the buffered transitions, if any (to call at the end of training when learning by batches)."""
+        if self.buffer is not None and len(self.buffer) > 0:
+            self.learn_batch(*self.buffer.arrays())
+            self.buffer.clear()
 
     def set_qvalues(self, q_values):
-        self.q_values = q_values
+        """Sets the Q-values from a `QTable` or from a dictionary mapping states to `(2, 2, 2)` arrays."""
+        self.q_values = q_values if isinstance(q_values, QTable) else QTable.from_dict(q_values)
+        if self.buffer is not None:
+            self.buffer = TransitionBuffer(self.batch_size, self.q_values.encode)
 
     def decay_epsilon(self):
         self.epsilon = max(self.final_epsilon, self.epsilon - self.epsilon_decay)
@@ -65,4 +153,56 @@ class NNPlayer(Player):
         pass
 
     def save_model(self, model_prefix: str = None):
-        pass
+        """Saves the Q-values and the hyperparameters in `{model_prefix}.qtable` (see `QTable.save`)."""
+        metadata = {
+            "name": self.name,
+            "learning_rate": self.lr,
+            "discount_factor": self.discount_factor,
+            "epsilon": self.epsilon,
+            "epsilon_decay": self.epsilon_decay,
+            "final_epsilon": self.final_epsilon,
+        }
+        self.flush()
+        self.q_values.save(f"{model_prefix or self.name}.qtable", metadata=metadata)
+
+    def load_model(self, model_prefix: str = None, mmap_mode="c"):
+        """Loads the Q-values and the hyperparameters saved by `save_model`. The Q-values are memory-mapped (see
+        `QTable.load`): with `mmap_mode="r"` processes share one read-only copy, which cannot learn."""
+        q_values, metadata = QTable.load(f"{model_prefix or self.name}.qtable", mmap_mode=mmap_mode)
+        self.set_qvalues(q_values)
+        self.lr = metadata["learning_rate"]
+        self.discount_factor = metadata["discount_factor"]
+        self.epsilon = metadata["epsilon"]
+        self.epsilon_decay = metadata["epsilon_decay"]
+        self.final_epsilon = metadata["final_epsilon"]
+
+    def freeze(self):
+        """Returns a picklable factory building copies of the agent which do not learn."""
+        return FrozenQValues(self.q_values, epsilon=self.epsilon, name=self.name)
+
+    def compile_policy(self, fallback=0):
+        """Returns the greedy policy of the Q-values as a `GreedyPolicy` (a factory of `GreedyPolicyPlayer`, which
+        acts with one lookup per decision). Unseen states get the `fallback` action."""
+        self.flush()
+        return GreedyPolicy.from_qtable(self.q_values, fallback)
+
+
+class FrozenQValues:
+    """Picklable factory of `NNPlayer` instances with fixed Q-values, e.g. for evaluation in other processes."""
+
+    def __init__(self, q_values, epsilon=0.0, name="NNPlayer"):
+        self.q_values = q_values.copy()
+        self.epsilon = epsilon
+        self.name = name
+
+    def __call__(self, env):
+        player = NNPlayer(
+            env,
+            learning_rate=0.0,
+            initial_epsilon=self.epsilon,
+            epsilon_decay=0.0,
+            final_epsilon=self.epsilon,
+            name=self.name,
+        )
+        player.set_qvalues(self.q_values)
+        return player
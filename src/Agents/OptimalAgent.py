@@ -0,0 +1,87 @@
+from ..Dice421.Player import Player
+from ..Dice421.encoding import COMBINATION_CODES, ObservationEncoder, combination_codes, stack_observations
+from ..Dice421.solver import solve_game, solve_round_points, DIFFERENCES
+from ..Dice421.transitions import ACTIONS
+import numpy as np
+
+# Smaller batches are decided one observation at a time: the lookups of `get_next_action` are cheaper than the fixed
+# cost of the array operations of `action_indices`
+MIN_VECTORIZED_BATCH = 128
+
+
+class OptimalPlayer(Player):
+    """Agent playing the exact optimal policy computed by `Dice421.solver`.
+
+    With `objective="game"`, the agent maximizes its probability of winning the game given the score difference,
+    with `objective="round"` it maximizes the expected points won in each round. The policies are computed once per
+    process (in a few seconds) and each action is then a table lookup.
+    """
+
+    def __init__(self, env, objective="game", name="OptimalPlayer"):
+        super().__init__(env, name)
+        if objective == "game":
+            solution = solve_game()
+        elif objective == "round":
+            solution = solve_round_points()
+        else:
+            raise ValueError(f"Unknown objective {objective}")
+        self.objective = objective
+        self.encoder = ObservationEncoder()
+        self.first_actions = solution["first_actions"]
+        self.second_actions = solution["second_actions"]
+
+    def get_next_action(self, state):
+        if not isinstance(state, dict):
+            # Observation packed into an integer
+            state = self.encoder.decode(state)
+        combination = COMBINATION_CODES[state["player_comb"]] - 1
+        opponent = COMBINATION_CODES[state["opp_comb"]] - 1
+        # The opponent has not played yet only if we started the round
+        first = opponent < 0
+        if self.objective == "game":
+            # Score difference from the point of view of the first player of the round
+            difference = state["player_score"] - state["opp_score"]
+            difference = difference if first else -difference
+            idx = min(max(difference, DIFFERENCES[0]), DIFFERENCES[-1]) - DIFFERENCES[0]
+            first_actions, second_actions = self.first_actions[idx], self.second_actions[idx]
+        else:
+            first_actions, second_actions = self.first_actions, self.second_actions
+        if first:
+            action = first_actions[state["current_throws"] - 1, combination]
+        else:
+            action = second_actions[state["max_throws"] - state["current_throws"] - 1, combination, opponent]
+        return ACTIONS[action]
+
+    def get_next_actions(self, states_batch):
+        if len(states_batch) < MIN_VECTORIZED_BATCH:
+            return [self.get_next_action(state) for state in states_batch]
+        if not isinstance(states_batch[0], dict):
+            states_batch = [self.encoder.decode(state) for state in states_batch]
+        return [ACTIONS[i] for i in self.action_indices(stack_observations(states_batch))]
+
+    def action_indices(self, observations):
+        """Indices in `ACTIONS` of the optimal actions of a batch of observations (dictionary of arrays)."""
+        combination = combination_codes(observations["player_comb"]) - 1
+        opponent = combination_codes(observations["opp_comb"]) - 1
+        first = opponent < 0
+        current_throws = np.asarray(observations["current_throws"])
+        throws_left = np.asarray(observations["max_throws"]) - current_throws - 1
+        # Indices valid in both tables (the other one is not used)
+        first_idx = (np.maximum(current_throws - 1, 0), combination)
+        second_idx = (np.clip(throws_left, 0, 1), combination, np.maximum(opponent, 0))
+        if self.objective == "game":
+            difference = np.asarray(observations["player_score"]) - np.asarray(observations["opp_score"])
+            difference = np.where(first, difference, -difference)
+            idx = np.clip(difference, DIFFERENCES[0], DIFFERENCES[-1]) - DIFFERENCES[0]
+            first_idx, second_idx = (idx, *first_idx), (idx, *second_idx)
+        return np.where(first, self.first_actions[first_idx], self.second_actions[second_idx])
+
+    def action_probabilities(self, observations):
+        """Optimal actions of a batch of observations (dictionary of arrays) as one-hot probabilities."""
+        return np.eye(len(ACTIONS))[self.action_indices(observations)]
+
+    def reset(self) -> None:
+        pass
+
+    def save_model(self, model_prefix: str = None):
+        pass
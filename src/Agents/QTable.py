@@ -0,0 +1,336 @@
+from ..Dice421.encoding import Observation, ObservationEncoder
+from ..Dice421.features import FeatureEncoder
+import json
+import sys
+import numpy as np
+
+# Number of actions: one bit per die
+N_ACTIONS = 8
+# Encodings with at most this number of states are stored densely (one row per possible state)
+DENSE_MAX_STATES = 1 << 20
+# Q-values of unvisited states
+_ZEROS = np.zeros(N_ACTIONS, dtype=np.float32)
+_ZEROS.flags.writeable = False
+
+# Binary format of saved tables (see `write_binary`): magic bytes, version, header length, JSON header padded to
+# `ALIGNMENT` bytes, then the Q-values (`float32`, one row per state) and the visited flags (dense) or the codes of the
+# rows (sparse)
+MAGIC = b"Q421"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+# Approximate memory of a state of a sparse table: row of Q-values and entry of the dictionary of rows (measured with
+# `benchmarks/bench_qtable.py`)
+SPARSE_BYTES_PER_STATE = 104
+
+
+class SortedRows:
+    """Rows of the states of a loaded sparse table: row `i` is the state `codes[i]` (sorted codes, possibly
+    memory-mapped), found by binary search, plus a dictionary of the rows inserted after loading.
+
+    Loading a table therefore does not build a dictionary of all its states.
+    """
+
+    def __init__(self, codes):
+        self.codes = codes
+        self.extra = {}
+
+    def get(self, code, default=None):
+        codes = self.codes
+        i = int(codes.searchsorted(code))
+        if i < len(codes) and codes[i] == code:
+            return i
+        return self.extra.get(code, default)
+
+    def __setitem__(self, code, row):
+        self.extra[code] = row
+
+    def __len__(self):
+        return len(self.codes) + len(self.extra)
+
+    def __sizeof__(self):
+        return self.codes.nbytes + sys.getsizeof(self.extra)
+
+    def items(self):
+        yield from zip(self.codes.tolist(), range(len(self.codes)))
+        yield from self.extra.items()
+
+    def copy(self):
+        rows = SortedRows(self.codes)
+        rows.extra = self.extra.copy()
+        return rows
+
+
+def action_index(action):
+    """Index of an action (which dice to throw) in a row of Q-values."""
+    return 4 * action[0] + 2 * action[1] + action[2]
+
+
+def write_binary(path, magic, version, header, arrays):
+    """Writes a binary file of saved arrays (Q-tables and policies): magic bytes, version and length of the JSON header
+    (`uint32`), header padded to `ALIGNMENT` bytes, then the bytes of the arrays, which `read_arrays` can memory-map.
+
+    Args:
+        path (str): Path of the file.
+        magic (bytes): Magic bytes of the format (4 bytes).
+        version (int): Version of the format.
+        header (dict): JSON-serializable header.
+        arrays (list): Arrays written one after the other.
+    """
+    header = json.dumps(header).encode()
+    # Start of the arrays, aligned
+    start = -(-(len(magic) + 8 + len(header)) // ALIGNMENT) * ALIGNMENT
+    with open(path, "wb") as file:
+        file.write(magic)
+        file.write(np.array([version, len(header)], dtype="<u4").tobytes())
+        file.write(header.ljust(start - len(magic) - 8))
+        for array in arrays:
+            file.write(np.ascontiguousarray(array).tobytes())
+
+
+def read_binary_header(path, magic, version, kind):
+    """Returns the header of a file written by `write_binary` and the offset of its arrays, after checking its magic
+    bytes and version (`kind` names the content in the errors, e.g. "Q-table")."""
+    with open(path, "rb") as file:
+        if file.read(len(magic)) != magic:
+            raise ValueError(f"{path} is not a saved {kind}")
+        file_version, length = np.frombuffer(file.read(8), dtype="<u4")
+        if file_version != version:
+            raise ValueError(f"Unsupported {kind} format version {file_version} (expected {version})")
+        header = json.loads(file.read(int(length)))
+    return header, -(-(len(magic) + 8 + int(length)) // ALIGNMENT) * ALIGNMENT
+
+
+def read_arrays(path, offset, shapes, mmap_mode):
+    """Reads the arrays written by `write_binary` from `offset`.
+
+    Args:
+        path (str): Path of the file.
+        offset (int): Offset of the first array (see `read_binary_header`).
+        shapes (list): Data type and shape of each array.
+        mmap_mode (str, optional): Mode of `np.memmap` or None to read the arrays in memory.
+
+    Returns:
+        list: The arrays (plain arrays on the mapped memory, as indexing `np.memmap` objects is slower).
+    """
+    arrays = []
+    for dtype, shape in shapes:
+        count = int(np.prod(shape))
+        # Files cannot map empty arrays
+        if mmap_mode is None or count == 0:
+            with open(path, "rb") as file:
+                file.seek(offset)
+                arrays.append(np.fromfile(file, dtype=dtype, count=count).reshape(shape))
+        else:
+            arrays.append(np.asarray(np.memmap(path, dtype=dtype, mode=mmap_mode, offset=offset, shape=shape)))
+        offset += count * np.dtype(dtype).itemsize
+    return arrays
+
+
+def encoder_header(encoder):
+    """Fields of a saved header describing the encoding of the states (see `QTable.header_encoder`)."""
+    # Features of a `FeatureEncoder` (None for an `ObservationEncoder`)
+    features = encoder.spec() if isinstance(encoder, FeatureEncoder) else None
+    return {"radices": encoder.radices, "features": features}
+
+
+class QTable:
+    """Q-values stored in one contiguous `float32` array with one row of `N_ACTIONS` values per state.
+
+    States are observations (or their encoded integer) mapped to integers by an `ObservationEncoder` (or a
+    `FeatureEncoder`). Small encodings are stored densely, the code being the row. Otherwise rows are allocated on the
+    first update of a state and a dictionary maps codes to rows. Reading a state never inserts it: unvisited states
+    have Q-values zero.
+    """
+
+    def __init__(self, encoder=None, capacity=1024):
+        self.encoder = ObservationEncoder() if encoder is None else encoder
+        self.dense = self.encoder.n_states <= DENSE_MAX_STATES
+        if self.dense:
+            self.values = np.zeros((self.encoder.n_states, N_ACTIONS), dtype=np.float32)
+            self.visited = np.zeros(self.encoder.n_states, dtype=bool)
+        else:
+            self.values = np.zeros((capacity, N_ACTIONS), dtype=np.float32)
+            self.rows = {}
+
+    def encode(self, state):
+        return state if isinstance(state, (int, np.integer)) else self.encoder.encode(state)
+
+    def find_row(self, code):
+        """Returns the row of a state, or -1 if it was never updated."""
+        if self.dense:
+            return code if self.visited[code] else -1
+        return self.rows.get(code, -1)
+
+    def insert_row(self, code):
+        """Returns the row of a state, allocating it if needed."""
+        if self.dense:
+            self.visited[code] = True
+            return code
+        row = self.rows.get(code)
+        if row is None:
+            row = len(self.rows)
+            if row == len(self.values):
+                # Amortized growth of the storage
+                self.values = np.concatenate([self.values, np.zeros_like(self.values)])
+            self.rows[code] = row
+        return row
+
+    def find_rows(self, codes):
+        """Vectorized `find_row` for an array of codes."""
+        codes = np.asarray(codes, dtype=np.int64)
+        if self.dense:
+            return np.where(self.visited[codes], codes, -1)
+        rows = self.rows
+        return np.fromiter((rows.get(code, -1) for code in codes.tolist()), dtype=np.int64, count=len(codes))
+
+    def insert_rows(self, codes):
+        """Vectorized `insert_row` for an array of codes."""
+        codes = np.asarray(codes, dtype=np.int64)
+        if self.dense:
+            self.visited[codes] = True
+            return codes
+        return np.fromiter((self.insert_row(code) for code in codes.tolist()), dtype=np.int64, count=len(codes))
+
+    def get_batch(self, codes):
+        """Returns the Q-values of a batch of encoded states, of shape `(len(codes), N_ACTIONS)` (a copy)."""
+        rows = self.find_rows(codes)
+        return np.where((rows >= 0)[:, None], self.values[np.maximum(rows, 0)], 0.0).astype(np.float32)
+
+    def get(self, state):
+        """Returns the Q-values of all actions in a state (read-only zeros if the state was never updated)."""
+        # Inlined `encode` and `find_row` (the lookup of the greedy actions): the observations of the environment carry
+        # their code by the full encoding
+        if type(state) is int:
+            code = state
+        elif type(state) is Observation and getattr(self.encoder, "all_fields", False):
+            code = state.code
+        else:
+            code = self.encode(state)
+        row = (code if self.visited[code] else -1) if self.dense else self.rows.get(code, -1)
+        return self.values[row] if row >= 0 else _ZEROS
+
+    def __getitem__(self, state):
+        """Returns the writable Q-values of a state with the shape `(2, 2, 2)`, inserting it if needed."""
+        row = self.insert_row(self.encode(state))
+        return self.values[row].reshape(2, 2, 2)
+
+    def __contains__(self, state):
+        return self.find_row(self.encode(state)) >= 0
+
+    def __len__(self):
+        return int(self.visited.sum()) if self.dense else len(self.rows)
+
+    def items(self):
+        """Iterates over the codes of the visited states and their Q-values."""
+        if self.dense:
+            for code in np.flatnonzero(self.visited):
+                yield int(code), self.values[code]
+        else:
+            for code, row in self.rows.items():
+                yield code, self.values[row]
+
+    @property
+    def nbytes(self):
+        """Memory used by the arrays and the dictionary of rows, if any (without the integers it contains)."""
+        if self.dense:
+            return self.values.nbytes + self.visited.nbytes
+        return self.values.nbytes + sys.getsizeof(self.rows)
+
+    def copy(self):
+        table = QTable.__new__(QTable)
+        table.__dict__.update(self.__dict__)
+        table.values = self.values.copy()
+        if self.dense:
+            table.visited = self.visited.copy()
+        else:
+            table.rows = self.rows.copy()
+        return table
+
+    def save(self, path, metadata=None):
+        """Saves the table in a binary file which can be memory-mapped by `load`.
+
+        Args:
+            path (str): Path of the file.
+            metadata (dict, optional): JSON-serializable data saved in the header (e.g. hyperparameters).
+        """
+        if self.dense:
+            n_rows = len(self.values)
+        else:
+            # Rows sorted by code, so that loaded tables can find them by binary search (see `SortedRows`)
+            codes, rows = np.array([[code, row] for code, row in self.rows.items()], dtype=np.int64).reshape(-1, 2).T
+            order = np.argsort(codes)
+            codes, rows = codes[order], rows[order]
+            n_rows = len(codes)
+        header = dict(
+            encoder_header(self.encoder),
+            dense=self.dense,
+            n_rows=n_rows,
+            n_actions=N_ACTIONS,
+            dtype=self.values.dtype.str,
+            metadata=metadata or {},
+        )
+        arrays = [self.values, self.visited] if self.dense else [self.values[rows], codes.astype("<i8")]
+        write_binary(path, MAGIC, FORMAT_VERSION, header, arrays)
+
+    @staticmethod
+    def read_header(path):
+        """Returns the header of a saved table and the offset of its arrays."""
+        return read_binary_header(path, MAGIC, FORMAT_VERSION, "Q-table")
+
+    @staticmethod
+    def header_encoder(header):
+        if header.get("features"):
+            return FeatureEncoder.from_spec(header["features"])
+        return ObservationEncoder(header["radices"])
+
+    @classmethod
+    def load(cls, path, mmap_mode="c"):
+        """Loads a table saved by `save`.
+
+        Args:
+            path (str): Path of the file.
+            mmap_mode (str, optional): Mode of `np.memmap` ("r" for read-only tables shared by processes through
+                the page cache, "c" for copy-on-write) or None to read the arrays in memory.
+
+        Returns:
+            tuple(QTable, dict): The table and the metadata saved with it.
+        """
+        header, offset = cls.read_header(path)
+        n_rows = header["n_rows"]
+        dtype = np.dtype(header["dtype"])
+        if n_rows == 0:
+            # Empty sparse table (files cannot map empty arrays)
+            return cls(cls.header_encoder(header)), header["metadata"]
+        table = cls.__new__(cls)
+        table.encoder = cls.header_encoder(header)
+        table.dense = header["dense"]
+        extra = (np.bool_, n_rows) if table.dense else (np.dtype("<i8"), n_rows)
+        arrays = read_arrays(path, offset, [(dtype, (n_rows, header["n_actions"])), extra], mmap_mode)
+        table.values = arrays[0]
+        if table.dense:
+            table.visited = arrays[1]
+        else:
+            table.rows = SortedRows(arrays[1])
+        return table, header["metadata"]
+
+    @classmethod
+    def from_dict(cls, q_values, encoder=None):
+        """Builds a table from a dictionary mapping states (tuples of observation values) to `(2, 2, 2)` arrays."""
+        table = cls(encoder=encoder, capacity=max(len(q_values), 1))
+        for state, values in q_values.items():
+            table[state][...] = values
+        return table
+
+
+def describe_encoder(encoder, n_visited=None):
+    """Size of the Q-tables of an encoding: number of states, storage and memory (for a dense table, or for a sparse
+    table with `n_visited` states).
+
+    Returns:
+        dict: Keys "n_states", "storage" ("dense" or "sparse") and "nbytes" (None for a sparse table without
+            `n_visited`).
+    """
+    if encoder.n_states <= DENSE_MAX_STATES:
+        return {"n_states": encoder.n_states, "storage": "dense", "nbytes": encoder.n_states * (N_ACTIONS * 4 + 1)}
+    nbytes = None if n_visited is None else n_visited * SPARSE_BYTES_PER_STATE
+    return {"n_states": encoder.n_states, "storage": "sparse", "nbytes": nbytes}
@@ -10,6 +10,10 @@ class RandomPlayer(Player):
         # Just randomly sample the possible actions
         return self.env.action_space.sample()
 
+    def action_probabilities(self, observations):
+        # Each die is thrown with probability one half
+        return np.full((len(observations["max_throws"]), 8), 1 / 8)
+
     def reset(self) -> None:
         pass
 
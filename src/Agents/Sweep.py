@@ -0,0 +1,181 @@
+from ..Dice421.Game import Dice421Env
+from ..Dice421.Tournament import play_games, summarize
+from .CheckpointTrainer import CheckpointTrainer
+from .NNAgent import NNPlayer
+from .RandomAgent import RandomPlayer
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import itertools as it
+import math
+import os
+import time
+import numpy as np
+
+
+def grid(space):
+    """Lists all the combinations of a search space mapping argument names to lists of values."""
+    names = list(space)
+    return [dict(zip(names, values)) for values in it.product(*(space[name] for name in names))]
+
+
+def random_search(space, n_configs, seed=None):
+    """Samples `n_configs` configurations of a search space.
+
+    Values of the space are lists (one value drawn uniformly), tuples `(low, high)` (drawn uniformly in the interval,
+    on a logarithmic scale if `low > 0` and `high / low >= 100`), callables taking a `np.random.Generator`, or
+    constants.
+    """
+    gen = np.random.default_rng(seed)
+    configs = []
+    for _ in range(n_configs):
+        config = {}
+        for name, values in space.items():
+            if isinstance(values, list):
+                config[name] = values[gen.integers(len(values))]
+            elif isinstance(values, tuple):
+                low, high = values
+                if low > 0 and high / low >= 100:
+                    config[name] = float(math.exp(gen.uniform(math.log(low), math.log(high))))
+                else:
+                    config[name] = float(gen.uniform(low, high))
+            elif callable(values):
+                config[name] = values(gen)
+            else:
+                config[name] = values
+        configs.append(config)
+    return configs
+
+
+def _train_config(index, config, seed_sequence, directory, n_episodes, opponent_factory, opponents, n_games, eval_seed):
+    """Trains configuration `index` up to `n_episodes` episodes (resuming from its checkpoint) and evaluates its greedy
+    policy against each opponent."""
+    np.random.seed(int(seed_sequence.generate_state(1)[0]))
+    env = Dice421Env(seed=seed_sequence)
+    agent = NNPlayer(env, **config)
+    path = os.path.join(directory, f"config_{index:04d}")
+    trainer = CheckpointTrainer(agent, opponent_factory(env), path, checkpoint_every=n_episodes, keep=1)
+    trainer.resume()
+    start = time.perf_counter()
+    trainer.train(n_episodes)
+    elapsed = time.perf_counter() - start
+    agent.flush()
+    policy = agent.compile_policy()
+    # Same evaluation games for all the configurations
+    win_rates = {
+        name: summarize(play_games(policy, factory, n_games, np.random.SeedSequence(eval_seed)))["win_1"]
+        for name, factory in opponents.items()
+    }
+    return {"config": index, "episodes": n_episodes, "train_time": elapsed, **win_rates}
+
+
+class HyperparameterSweep:
+    """Search of hyperparameters of `NNPlayer` by successive halving, with the configurations trained in a pool of
+    processes.
+
+    All the configurations are trained for `min_episodes` episodes and their greedy policies are evaluated against
+    each opponent of `opponents`. The best `1 / eta` of them (by mean win rate) are trained `eta` times longer, from
+    their checkpoint, and so on until `max_episodes` (or a single configuration is left). Each configuration has its
+    own seed (a child of `np.random.SeedSequence(seed)`) and its checkpoints in `{directory}/config_{index}` (see
+    `CheckpointTrainer`), so training by rungs gives the same agent as training at once. Each evaluation plays the
+    same games, seeded by `seed`, for all configurations.
+
+    Args:
+        configs (list(dict)): Arguments of `NNPlayer` of each configuration (see `grid` and `random_search`).
+        directory (str): Directory of the checkpoints and of the results table.
+        opponents (dict, optional): Factories of the evaluation opponents by name (must be picklable), by default
+            a random player.
+        opponent_factory (callable): Factory of the training opponent (must be picklable).
+        min_episodes (int): Training episodes of the first rung.
+        max_episodes (int): Maximum training episodes of a configuration.
+        eta (int): Reduction factor between two rungs.
+        n_games (int): Evaluation games against each opponent.
+        seed (int, optional): Seed of the configurations and of the evaluation games.
+    """
+
+    def __init__(
+        self,
+        configs,
+        directory,
+        opponents=None,
+        opponent_factory=RandomPlayer,
+        min_episodes=500,
+        max_episodes=4000,
+        eta=2,
+        n_games=500,
+        seed=None,
+    ):
+        self.configs = list(configs)
+        self.directory = directory
+        self.opponents = {"random": RandomPlayer} if opponents is None else dict(opponents)
+        self.opponent_factory = opponent_factory
+        self.min_episodes = min_episodes
+        self.max_episodes = max_episodes
+        self.eta = eta
+        self.n_games = n_games
+        self.entropy = np.random.SeedSequence(seed).entropy
+
+    def run(self, max_workers=None):
+        """Runs the sweep and writes the results table in `{directory}/results.csv`.
+
+        Args:
+            max_workers (int, optional): Size of the pool of processes (0 to train in the current process).
+
+        Returns:
+            list(dict): One row per evaluation (configuration, rung, episodes, training time, win rate against each
+                opponent and mean win rate, and the arguments of the configuration), best configurations last.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        seeds = np.random.SeedSequence(self.entropy).spawn(len(self.configs))
+        eval_seed = np.random.SeedSequence(self.entropy).generate_state(1)[0]
+        alive = list(range(len(self.configs)))
+        n_episodes = min(self.min_episodes, self.max_episodes)
+        rows = []
+        executor = None if max_workers == 0 else ProcessPoolExecutor(max_workers=max_workers)
+        try:
+            for rung in it.count():
+                tasks = [
+                    (
+                        index,
+                        self.configs[index],
+                        seeds[index],
+                        self.directory,
+                        n_episodes,
+                        self.opponent_factory,
+                        self.opponents,
+                        self.n_games,
+                        int(eval_seed),
+                    )
+                    for index in alive
+                ]
+                if executor is None:
+                    results = [_train_config(*task) for task in tasks]
+                else:
+                    results = list(executor.map(_train_config, *zip(*tasks)))
+                for result in results:
+                    result["rung"] = rung
+                    result["mean_win_rate"] = float(np.mean([result[name] for name in self.opponents]))
+                    result.update(self.configs[result["config"]])
+                rows.extend(results)
+                if n_episodes >= self.max_episodes or len(alive) == 1:
+                    break
+                results.sort(key=lambda result: result["mean_win_rate"], reverse=True)
+                alive = [result["config"] for result in results[: max(1, len(results) // self.eta)]]
+                n_episodes = min(n_episodes * self.eta, self.max_episodes)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        rows.sort(key=lambda row: (row["rung"], row["mean_win_rate"]))
+        self.write(rows)
+        return rows
+
+    def write(self, rows):
+        fields = ["config", "rung", "episodes", "train_time", *self.opponents, "mean_win_rate"]
+        fields += list(dict.fromkeys(name for config in self.configs for name in config))
+        with open(os.path.join(self.directory, "results.csv"), "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=fields, restval="")
+            writer.writeheader()
+            # Floats with 6 significant digits
+            writer.writerows(
+                {name: f"{value:.6g}" if isinstance(value, float) else value for name, value in row.items()}
+                for row in rows
+            )
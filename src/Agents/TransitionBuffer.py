@@ -0,0 +1,40 @@
+from .QTable import action_index
+import numpy as np
+
+
+class TransitionBuffer:
+    """Transitions collected one at a time (e.g. by `Player.learn`) and returned as arrays for `NNPlayer.learn_batch`.
+
+    States are stored as their integer codes (see `QTable.encode`) and actions as their index in a row of Q-values.
+    """
+
+    def __init__(self, capacity, encode):
+        self.capacity = capacity
+        self.encode = encode
+        self.clear()
+
+    def clear(self):
+        self.states, self.actions, self.next_states, self.rewards, self.dones = [], [], [], [], []
+
+    def append(self, state, action, next_state, reward, done):
+        self.states.append(self.encode(state))
+        self.actions.append(action_index(action))
+        self.next_states.append(self.encode(next_state))
+        self.rewards.append(reward)
+        self.dones.append(done)
+
+    def __len__(self):
+        return len(self.states)
+
+    def is_full(self):
+        return len(self.states) >= self.capacity
+
+    def arrays(self):
+        """Returns the transitions as the arrays `(states, actions, next_states, rewards, dones)`."""
+        return (
+            np.array(self.states, dtype=np.int64),
+            np.array(self.actions, dtype=np.int64),
+            np.array(self.next_states, dtype=np.int64),
+            np.array(self.rewards, dtype=np.float64),
+            np.array(self.dones, dtype=bool),
+        )
@@ -1,4 +1,5 @@
 from .utils import list_to_number
+import itertools as it
 import numpy as np
 
 list_points = {
@@ -22,12 +23,108 @@ list_points = {
 sequences = [654, 543, 432, 321]
 
 
+def _order_key(value):
+    """Sorting key reproducing the rules of the game: points first, then the special order or the plain value."""
+    points, order = list_points.get(value, (1, -1))
+    return (points, value) if order == -1 else (points, -order)
+
+
+# All the distinct combinations (dice sorted from higher to lower), ordered from the weakest to the strongest.
+# The position of a combination in this list is its rank: comparing two combinations is comparing two integers.
+SORTED_TRIPLES = np.array(
+    sorted(it.combinations_with_replacement(range(6, 0, -1), 3), key=lambda t: _order_key(100 * t[0] + 10 * t[1] + t[2])),
+    dtype=np.int64,
+)
+N_COMBINATIONS = len(SORTED_TRIPLES)
+# Per-rank tables
+VALUES_TABLE = SORTED_TRIPLES @ np.array([100, 10, 1])
+POINTS_TABLE = np.array([list_points.get(value, (1, -1))[0] for value in VALUES_TABLE])
+ORDER_TABLE = np.array([list_points.get(value, (1, -1))[1] for value in VALUES_TABLE])
+# Rank of any raw throw, indexed by the values of the dice minus one (in any order)
+RANK_TABLE = np.empty((6, 6, 6), dtype=np.int64)
+for _rank, _triple in enumerate(SORTED_TRIPLES):
+    for _dice in set(it.permutations(_triple - 1)):
+        RANK_TABLE[_dice] = _rank
+
+
+def ranks(dice):
+    """Ranks of an array of throws, with the dice in any order.
+
+    Args:
+        dice (np.ndarray): Values of the dice, of shape `(..., 3)` with values in 1-6.
+
+    Returns:
+        np.ndarray: Rank of each throw (see `SORTED_TRIPLES`), of shape `dice.shape[:-1]`.
+    """
+    dice = np.asarray(dice)
+    if dice.shape[-1:] != (3,):
+        raise ValueError(f"Throws must have 3 dice, got an array of shape {dice.shape}")
+    if dice.size and (dice.min() < 1 or dice.max() > 6):
+        raise ValueError("Dice values must be between 1 and 6")
+    return RANK_TABLE[dice[..., 0] - 1, dice[..., 1] - 1, dice[..., 2] - 1]
+
+
+def score(dice):
+    """Scores an array of throws at once, as `Combination` does one throw at a time.
+
+    Args:
+        dice (np.ndarray): Values of the dice, of shape `(..., 3)` with values in 1-6.
+
+    Returns:
+        dict: Arrays `values` (dice sorted from higher to lower, shape `(..., 3)`), `value` (concatenated value of
+            the sorted dice), `points` and `rank`, as the attributes of the same name of `Combination`.
+    """
+    rank = ranks(dice)
+    return {"values": SORTED_TRIPLES[rank], "value": VALUES_TABLE[rank], "points": POINTS_TABLE[rank], "rank": rank}
+
+
+def resolve_rounds(dice1, dice2):
+    """Resolves rounds from the final throws of both players, as `Dice421Env.compute_new_score_and_winner_round`.
+
+    Args:
+        dice1 (np.ndarray): Final throws of the first player, of shape `(..., 3)`.
+        dice2 (np.ndarray): Final throws of the second player, of the same shape.
+
+    Returns:
+        tuple(np.ndarray, np.ndarray): Winner of each round (0 or 1, -1 for a tie) and points awarded to the winner
+            (0 for a tie).
+    """
+    rank1, rank2 = ranks(dice1), ranks(dice2)
+    winner = np.where(rank1 > rank2, 0, np.where(rank2 > rank1, 1, -1))
+    points = np.where(winner == 0, POINTS_TABLE[rank1], np.where(winner == 1, POINTS_TABLE[rank2], 0))
+    return winner, points
+
+
 class Combination:
-    def __init__(self, values_dice):
-        # First sort the values of the dice from higher to lower
-        self.values = values_dice.copy()
+    """Combination of three dice.
+
+    Combinations are interned: there is a single instance per rank, shared by every throw giving the same dice.
+    """
+
+    __slots__ = ("values", "value", "points", "order", "rank")
+
+    # Interned instances indexed by the concatenated value of the dice (in the order they were given)
+    _interned = {}
+
+    def __new__(cls, values_dice):
+        if len(values_dice) == 3:
+            # Fast path: the three dice are enough to find the instance
+            combination = cls._interned.get(100 * values_dice[0] + 10 * values_dice[1] + values_dice[2])
+            if combination is not None:
+                return combination
+        # Values which are not a throw of three dice (e.g. dice not thrown yet) are not interned
+        self = super().__new__(cls)
+        self.values = tuple(int(x) for x in values_dice)
         self.value = list_to_number(self.values)
         self.points, self.order = list_points.get(self.value, (1, -1))
+        # Below every actual throw
+        self.rank = -1
+        return self
+
+    @classmethod
+    def from_rank(cls, rank):
+        """Returns the combination of a given rank."""
+        return cls._interned[int(VALUES_TABLE[rank])]
 
     def get_points(self):
         return self.points
@@ -38,30 +135,43 @@ class Combination:
     def get_value(self):
         return self.value
 
+    def get_rank(self):
+        return self.rank
+
+    def __repr__(self):
+        return f"Combination({self.value})"
+
+    def __hash__(self):
+        return hash(self.value)
+
+    # Ordering is given by the rank of the combinations
     def __eq__(self, other):
         # Equality is easily defined as equal combinations.
         return self.value == other.value
 
     def __lt__(self, other):
-        # We remove the equal case first as it's the most bothersome
-        if self == other:
-            return False
-        # If the points are different, the order is simply given by the points
-        if self.points != other.points:
-            return self.points < other.points
-        # If the points are equal, we must check the various cases
-
-        # In the case of no special combination, the larger number wins
-        if self.points == 1:
-            return self.value < other.value
-        else:
-            return self.order > other.order
+        return self.rank < other.rank
 
     def __gt__(self, other):
-        return not (self < other or self == other)
+        return self.rank > other.rank
 
     def __ge__(self, other):
-        return self > other or self == other
+        return self.rank >= other.rank
 
     def __le__(self, other):
-        return self < other or self == other
+        return self.rank <= other.rank
+
+
+def _build_interned():
+    for rank, triple in enumerate(SORTED_TRIPLES):
+        combination = object.__new__(Combination)
+        combination.values = tuple(int(x) for x in triple)
+        combination.value = int(VALUES_TABLE[rank])
+        combination.points, combination.order = int(POINTS_TABLE[rank]), int(ORDER_TABLE[rank])
+        combination.rank = rank
+        # Every permutation of the dice leads to the same combination
+        for dice in set(it.permutations(combination.values)):
+            Combination._interned[100 * dice[0] + 10 * dice[1] + dice[2]] = combination
+
+
+_build_interned()
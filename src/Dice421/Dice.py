@@ -1,24 +1,27 @@
-import numpy as np
 from .Combination import Combination
+from .rng import DiceStream
 
 
 class Die:
-    def __init__(self, seed=None):
-        # Random generator
-        self.gen = np.random.default_rng(seed=seed)
+    def __init__(self, seed=None, stream=None):
+        # Stream of faces (possibly shared with other dice)
+        self.stream = stream if stream is not None else DiceStream(seed)
         # Value of the die
         self.value = 0
 
     def throw_die(self):
-        self.value = self.gen.integers(low=1, high=7)
+        self.value = self.stream.face()
 
     def get_value(self):
         return self.value
 
 
 class Dice:
-    def __init__(self, seed=None):
-        self.dice = [Die() for _ in range(3)]
+    def __init__(self, seed=None, stream=None):
+        # The three dice share one stream of faces (possibly shared with other dice, see `Dice421Env`) so that the
+        # throws are reproducible for a given seed
+        self.stream = stream if stream is not None else DiceStream(seed)
+        # Values of the dice, sorted in decreasing order
         self.values = [0, 0, 0]
 
     def throw_dice(self, dices_to_throw):
@@ -27,22 +30,16 @@ class Dice:
         Args:
             dices_to_throw (list(bool)): Which dice to throw
         """
-        for i, die in enumerate(self.dice):
-            # Only throw the requested dice
+        values, face = self.values, self.stream.face
+        # Only throw the requested dice, in the order of the dice
+        for i in range(3):
             if dices_to_throw[i]:
-                die.throw_die()
-        _ = self.store_values()
-        return Combination(self.values.tolist())
+                values[i] = face()
+        self.sort_dice()
+        return Combination(values)
 
     def sort_dice(self):
-        values_idx_sorted = np.flip(np.argsort(self.values))
-        self.values = self.values[values_idx_sorted]
-        # Dice are not stored in a numpy array
-        self.dice = [self.dice[i] for i in values_idx_sorted]
-
-    def store_values(self):
-        self.values = np.array([die.get_value() for die in self.dice])
-        self.sort_dice()
+        self.values.sort(reverse=True)
 
     def get_combination(self):
         return Combination(self.values)
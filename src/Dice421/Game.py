@@ -1,116 +1,189 @@
 from .Dice import Dice
+from .constants import (
+    MAX_ROUNDS,
+    PASS,
+    THROW_ALL,
+    BASIC_ACTIONS,
+    LOSS_REWARD,
+    IMPROVEMENT_REWARD,
+    DRAW_REWARD,
+    WIN_GAME_REWARD,
+)
+from .encoding import Observation, ObservationEncoder
+from .rng import DiceStream
 from gymnasium import Env, spaces, error
 import numpy as np
-import itertools as it
+import logging
 from .logger import log, log_enable, log_disable
-
-MAX_ROUNDS = 100
-PASS = (0, 0, 0)
-THROW_ALL = (1, 1, 1)
-BASIC_ACTIONS = list(set(it.product((0, 1), (0, 1), (0, 1))))
-
-
-LOSS_REWARD = -1
-IMPROVEMENT_REWARD = 1
-DRAW_REWARD = 0.5
-WIN_GAME_REWARD = 100
+from .. import register_env
+
+# Level and message of each event of the game, logged when rendering
+EVENTS = {
+    "game_start": (logging.INFO, "Starting the game..."),
+    "game_reset": (logging.DEBUG, "Resetting game..."),
+    "round_start": (logging.INFO, "Starting round number {round_nb}"),
+    "round_reset": (logging.DEBUG, "Resetting round..."),
+    "turn_start": (logging.INFO, "Player {player} has {max_throws} throws"),
+    "throw": (logging.DEBUG, "Throw number {throw}"),
+    "action": (logging.DEBUG, "Player {player}'s action: {action}"),
+    "new_combination": (logging.DEBUG, "Player {player}'s new combination: {new} vs {old}"),
+    "reward": (logging.DEBUG, "Reward matrix: {factors}, reward for action: {reward}"),
+    "combinations": (logging.INFO, "Combinations are {combinations}"),
+    "pass": (logging.DEBUG, "Player {player} passed!"),
+    "scores": (logging.INFO, "The current scores are {scores}"),
+    "round_winner": (logging.INFO, "The winner of the round is {player}"),
+    "game_over": (logging.INFO, "Game finished!"),
+    "max_rounds": (logging.INFO, "Maximum number of rounds reached!"),
+    "game_winner": (logging.INFO, "The winner of the game is {player}"),
+}
+
+# Encoding of the observations into integers (see `get_observation_code`): weights of the combinations and radices of
+# the other fields
+OBSERVATION_ENCODER = ObservationEncoder()
+CODE_TERMS = (*OBSERVATION_ENCODER.int_weights[:2], *list(OBSERVATION_ENCODER.radices.values())[3:])
+
+# Description of the states, built once and shared by all the environments (it is never sampled)
+OBSERVATION_SPACE = spaces.Dict(
+    {
+        # Player's combination
+        "player_comb": spaces.Box(low=0, high=6, shape=(3,)),
+        # Opponents's combination
+        "opp_comb": spaces.Box(low=0, high=6, shape=(3,)),
+        # Current round number
+        "round_nb": spaces.Discrete(MAX_ROUNDS),
+        # Maximum number of throws allowed
+        "max_throws": spaces.Discrete(3),
+        # Current number of throws
+        "current_throws": spaces.Discrete(3),
+        # State of the round
+        "state_round": spaces.Discrete(2),
+        # Player score
+        "player_score": spaces.Discrete(MAX_ROUNDS * 8),
+        # Opponent's score
+        "opp_score": spaces.Discrete(MAX_ROUNDS * 8),
+    }
+)
 
 
 class Dice421Env(Env):
 
-    def __init__(self, seed=None):
+    def __init__(self, seed=None, event_sink=None, observation_mode="dict"):
 
         log.debug("Game initialization...")
         super(Dice421Env, self).__init__()
 
         # Main data of the game
-        self.seed = seed  # Seed for random generators
+        self.seed = seed  # Seed for random generators (integer, None or `np.random.SeedSequence`)
         self.players = [None, None]  # Player instances
         self.scores = [0, 0]  # Scores of players
-        self.dice = [Dice(seed=self.seed), Dice(seed=self.seed)]  # Dice instances
-        self.gen = np.random.default_rng(seed=self.seed)
+        # One stream of faces for the whole game: the dice of both players and the coin deciding who starts a round
+        self.stream = DiceStream(self.seed)
+        self.gen = self.stream.gen
+        self.dice = [Dice(stream=self.stream) for _ in range(2)]  # Dice instances
 
         # Required variables for Gymnasium
         self.metadata = {"render.modes": ["console"]}
-        # Possible actions by the player
-        # self.action_space = spaces.Discrete(len(BASIC_ACTIONS), seed=self.seed)  # Actions
-        self.action_space = spaces.Tuple((spaces.Discrete(2), spaces.Discrete(2), spaces.Discrete(2)), seed=self.seed)
+        # Possible actions by the player, built on first use (see `action_space`)
+        self._action_space = None
         # Description of the states
-        self.observation_space = spaces.Dict(
-            {
-                # Player's combination
-                "player_comb": spaces.Box(low=0, high=6, shape=(3,)),
-                # Opponents's combination
-                "opp_comb": spaces.Box(low=0, high=6, shape=(3,)),
-                # Current round number
-                "round_nb": spaces.Discrete(MAX_ROUNDS),
-                # Maximum number of throws allowed
-                "max_throws": spaces.Discrete(3),
-                # Current number of throws
-                "current_throws": spaces.Discrete(3),
-                # State of the round
-                "state_round": spaces.Discrete(2),
-                # Player score
-                "player_score": spaces.Discrete(MAX_ROUNDS * 8),
-                # Opponent's score
-                "opp_score": spaces.Discrete(MAX_ROUNDS * 8),
-            }
-        )
+        self.observation_space = OBSERVATION_SPACE
 
         # Internal variables describing the events of the game
         self.__winner_round = -1  # Who won the last round
         self.__is_game_over = False  # Is the game over
         self.__winner_game = -1  # Who won the game
-        self.__current_player = self.gen.integers(
-            low=0, high=2
-        )  # Who is currently playing (random for the first round)
+        self.__current_player = 0  # Who is currently playing (drawn at the beginning of each round)
         self.__state_round = 0  # Is the first or second player of the round currently playing
         self.__number_round = 0  # Running counter of rounds
         self.__current_combinations = [None, None]  # Combinations of the dice
         self.__max_throws = 3  # How many throws are allowed for the player
         self.__current_throw = 0  # Counter of throws by current player
 
+        # Observations given to the players: dictionaries (as described by `observation_space`, carrying their code)
+        # or, with `observation_mode="code"`, integers packing the same fields (see `encoding.ObservationEncoder`)
+        if observation_mode not in ("dict", "code"):
+            raise ValueError(f"Unknown observation mode {observation_mode}")
+        self.observation_mode = observation_mode
+        self.encoder = OBSERVATION_ENCODER
+
         # Useful logging variable
         self.scores_history_ = [(0, 0)]  # History of scores in each round
+        # Tracing of the events of the game: nothing is formatted nor recorded unless rendering or given a sink
+        self.event_sink = event_sink  # Optional sink recording the events (see `logger.RingBufferSink`)
+        self.__logging = False  # Are events logged
+        self.__tracing = event_sink is not None  # Are events logged or recorded
+        # Optional timers and counters of the phases of the games (see `profiling.Profiler`)
+        self.profiler = None
+        self.__profiling = False
+
+    @property
+    def action_space(self):
+        """Possible actions (which dice to throw), seeded by the seed of the environment. Built on first use: seeding
+        its generators takes most of the construction of an environment, and only random actions sample it."""
+        if self._action_space is None:
+            action_seed = self.seed
+            if isinstance(action_seed, np.random.SeedSequence):
+                action_seed = int(action_seed.generate_state(1)[0])
+            self._action_space = spaces.Tuple(
+                (spaces.Discrete(2), spaces.Discrete(2), spaces.Discrete(2)), seed=action_seed
+            )
+        return self._action_space
+
+    @action_space.setter
+    def action_space(self, action_space):
+        self._action_space = action_space
+
+    def set_event_sink(self, event_sink):
+        """Sets the sink recording the events of the game (None to disable)."""
+        self.event_sink = event_sink
+        self.__tracing = self.__logging or event_sink is not None
+
+    def set_profiler(self, profiler):
+        """Sets the profiler timing the phases of the games (None to disable)."""
+        self.profiler = profiler
+        self.__profiling = profiler is not None
+
+    def get_rng_state(self):
+        """Returns the state of the random generators kept between games (dice and coin stream, action space), e.g.
+        for checkpoints."""
+        generators = [space.np_random for space in [self.action_space, *self.action_space.spaces]]
+        return {"stream": self.stream.get_state(), "action_space": [gen.bit_generator.state for gen in generators]}
+
+    def set_rng_state(self, state):
+        """Restores a state returned by `get_rng_state`: the next games replay the same throws and random actions."""
+        self.stream.set_state(state["stream"])
+        generators = [space.np_random for space in [self.action_space, *self.action_space.spaces]]
+        for gen, gen_state in zip(generators, state["action_space"]):
+            gen.bit_generator.state = gen_state
+
+    def trace(self, event, **fields):
+        """Logs an event of the game and sends it to the event sink, if any.
+        Callers check `self.__tracing` first so that the fields are not even computed in silent mode."""
+        if self.__logging:
+            level, message = EVENTS[event]
+            log.log(level, message.format(**fields))
+        if self.event_sink is not None:
+            self.event_sink.record(event, fields)
 
     def reset_round(self):
-        log.debug("Resetting round...")
+        if self.__tracing:
+            self.trace("round_reset")
         # At the beginning of each round, reset the variables
-        # Set the first player to the winner of the previous round
-        self.__current_player = max(self.__winner_round, self.gen.integers(low=0, high=2))
-        self.__current_combinations = [None, None]
+        # Set the first player to the winner of the previous round (random after a tie or at the start of the game)
+        coin = self.stream.coin()
+        self.__current_player = self.__winner_round if self.__winner_round >= 0 else coin
+        # The list of combinations is reused from one round to the next
+        self.__current_combinations[0] = self.__current_combinations[1] = None
         self.__max_throws = 3
         self.__current_throw = 0
 
     def reset(self):
-        log.debug("Resetting game...")
+        if self.__tracing:
+            self.trace("game_reset")
         # At the beginning of the game, reset all variables
         self.scores = [0, 0]
-        self.dice = [Dice(seed=self.seed), Dice(seed=self.seed)]
-
-        # self.action_space = spaces.Discrete(len(BASIC_ACTIONS), seed=self.seed)
-        self.action_space = spaces.Tuple((spaces.Discrete(2), spaces.Discrete(2), spaces.Discrete(2)), seed=self.seed)
-        self.observation_space = spaces.Dict(
-            {
-                # Player's combination
-                "player_comb": spaces.Box(low=0, high=6, shape=(3,)),
-                # Opponents's combination
-                "opp_comb": spaces.Box(low=0, high=6, shape=(3,)),
-                # Current round number
-                "round_nb": spaces.Discrete(MAX_ROUNDS),
-                # Maximum number of throws allowed
-                "max_throws": spaces.Discrete(3),
-                # Current number of throws
-                "current_throws": spaces.Discrete(3),
-                # State of the round
-                "state_round": spaces.Discrete(2),
-                # Player score
-                "player_score": spaces.Discrete(MAX_ROUNDS * 8),
-                # Opponent's score
-                "opp_score": spaces.Discrete(MAX_ROUNDS * 8),
-            }
-        )
-
+        # Dice and spaces are kept between games: rebuilding them with the same seed would replay the same throws and
+        # random actions in every game
         self.__winner_round = -1
         self.__state_round = 0
         self.__number_round = 0
@@ -130,19 +203,42 @@ class Dice421Env(Env):
         ]
 
     def get_observation_space(self):
-        """Build observation space out of the variables."""
+        """Build observation space out of the variables (with its code, see `encoding.Observation`)."""
         player_combination = self.__current_combinations[self.__current_player]
         other_combination = self.__current_combinations[1 - self.__current_player]
-        return {
-            "player_comb": tuple(player_combination.get_values()) if player_combination is not None else (0, 0, 0),
-            "opp_comb": tuple(other_combination.get_values()) if other_combination is not None else (0, 0, 0),
-            "round_nb": self.__number_round,
-            "max_throws": self.__max_throws,
-            "current_throws": self.__current_throw,
-            "state_round": self.__state_round,
-            "player_score": self.scores[self.__current_player],
-            "opp_score": self.scores[1 - self.__current_player],
-        }
+        observation = Observation(
+            player_comb=tuple(player_combination.get_values()) if player_combination is not None else (0, 0, 0),
+            opp_comb=tuple(other_combination.get_values()) if other_combination is not None else (0, 0, 0),
+            round_nb=self.__number_round,
+            max_throws=self.__max_throws,
+            current_throws=self.__current_throw,
+            state_round=self.__state_round,
+            player_score=self.scores[self.__current_player],
+            opp_score=self.scores[1 - self.__current_player],
+        )
+        observation.code = self.get_observation_code()
+        return observation
+
+    def get_observation_code(self):
+        """Observation of the current player packed into an integer, without building the dictionary."""
+        w_player, w_opp, r_max, r_throw, r_state, r_score, r_opp_score = CODE_TERMS
+        player_combination = self.__current_combinations[self.__current_player]
+        other_combination = self.__current_combinations[1 - self.__current_player]
+        # Fields after the combinations, by Horner's rule
+        rest = ((self.__number_round * r_max + self.__max_throws) * r_throw + self.__current_throw) * r_state
+        rest = (rest + self.__state_round) * r_score + self.scores[self.__current_player]
+        return (
+            (w_player * (player_combination.rank + 1) if player_combination is not None else 0)
+            + (w_opp * (other_combination.rank + 1) if other_combination is not None else 0)
+            + rest * r_opp_score
+            + self.scores[1 - self.__current_player]
+        )
+
+    def get_observation(self):
+        """Observation of the current player in the format of `observation_mode`."""
+        if self.observation_mode == "code":
+            return self.get_observation_code()
+        return self.get_observation_space()
 
     def get_reward(self, new_combination):
         """Returns the reward from the previous action.
@@ -172,10 +268,19 @@ class Dice421Env(Env):
             + factor_round_winning * new_combination.get_points()
             + factor_game_winning * WIN_GAME_REWARD
         )
-        log.debug(
-            f"Reward matrix: {[factor_losing, factor_equalizing, factor_improvement, factor_beating, factor_round_winning,factor_game_winning]}"
-        )
-        log.debug(f"Reward for action: {reward}")
+        if self.__tracing:
+            self.trace(
+                "reward",
+                factors=[
+                    factor_losing,
+                    factor_equalizing,
+                    factor_improvement,
+                    factor_beating,
+                    factor_round_winning,
+                    factor_game_winning,
+                ],
+                reward=reward,
+            )
         return reward
 
     def compute_new_score_and_winner_round(self):
@@ -207,29 +312,73 @@ class Dice421Env(Env):
         return self.get_win_round_estimation(combination) and leads_winner_game
 
     def step(self, action):
+        if self.__profiling:
+            start = self.profiler.clock()
         # Gets the new combination from the player's action
         new_combination = self.dice[self.__current_player].throw_dice(action)
+        if self.__profiling:
+            now = self.profiler.clock()
+            self.profiler.add("throw", now - start)
+            self.profiler.count("throws")
+            start = now
         other_combination = self.__current_combinations[self.__current_player]
-        log.debug(
-            f"Player {self.players[self.__current_player].get_name()}'s new combination: {new_combination.get_value()} vs {other_combination.get_value() if other_combination is not None else 000}"
-        )
+        if self.__tracing:
+            self.trace(
+                "new_combination",
+                player=self.players[self.__current_player].get_name(),
+                new=new_combination.get_value(),
+                old=other_combination.get_value() if other_combination is not None else 000,
+            )
         # Computes the reward from the player's action
         reward = self.get_reward(new_combination)
         # Updates combinations
         self.__current_combinations[self.__current_player] = new_combination
+        win_estimation = self.get_win_estimation(new_combination)
+        if self.__profiling:
+            self.profiler.add("reward", self.profiler.clock() - start)
         return (
-            self.get_observation_space(),
+            self.get_observation(),
             reward,
-            self.get_win_estimation(new_combination),
+            win_estimation,
             {},
         )
 
     def run(self, player1, player2, render=False, player1_learn=True, player2_learn=True):
+        """Plays a game between two players and returns its result (see `play`)."""
+        game = self.play(player1, player2, render, player1_learn, player2_learn)
+        profiler, profiling = self.profiler, self.__profiling
+        try:
+            player, observation = next(game)
+            while True:
+                if profiling:
+                    start = profiler.clock()
+                action = player.get_next_action(observation)
+                if profiling:
+                    profiler.add_player("action", profiler.clock() - start, player.name)
+                player, observation = game.send(action)
+        except StopIteration as stop:
+            return stop.value
+
+    def play(self, player1, player2, render=False, player1_learn=True, player2_learn=True):
+        """Plays a game as a generator suspended at each decision of a player: yields `(player, observation)` and
+        expects the action of the player to be sent back. `run` answers with `get_next_action`, `GameScheduler`
+        answers many games at once with `get_next_actions`.
+
+        Returns:
+            dict: Result of the game (value of the final `StopIteration`): `winner` (-1 for a draw), `final_scores`,
+                `number_rounds` and `scores_history`.
+        """
         if render:
             log_enable()
         else:
             log_disable()
-        log.info("Starting the game...")
+        self.__logging = render
+        self.__tracing = render or self.event_sink is not None
+        if self.__tracing:
+            self.trace("game_start")
+        profiler, profiling = self.profiler, self.__profiling
+        if profiling:
+            profiler.count("games")
         # Define the players
         self.players = [player1, player2]
         player1.reset()
@@ -238,32 +387,48 @@ class Dice421Env(Env):
         self.reset()
         # Main game loop
         while not self.is_game_done():
-            log.info(f"Starting round number {self.__number_round}")
+            if self.__tracing:
+                self.trace("round_start", round_nb=self.__number_round)
             # Each loop is a new round
             self.reset_round()
 
             # Start with the player
-            log.info(f"Player {self.players[self.__current_player].get_name()} has {self.__max_throws} throws")
+            if self.__tracing:
+                self.trace(
+                    "turn_start", player=self.players[self.__current_player].get_name(), max_throws=self.__max_throws
+                )
             for i in range(self.__max_throws):
                 self.__current_throw = i
-                log.debug(f"Throw number {self.__current_throw + 1}")
+                if self.__tracing:
+                    self.trace("throw", throw=self.__current_throw + 1)
                 # The first throw is always of all dice!
-                current_observation = self.get_observation_space().copy()
                 if i == 0:
                     action = THROW_ALL
                 else:
-                    action = self.players[self.__current_player].get_next_action(current_observation)
+                    current_observation = self.get_observation()
+                    # Suspend the game until the player's action is sent back
+                    action = yield self.players[self.__current_player], current_observation
 
-                log.debug(f"Player {self.players[self.__current_player].get_name()}'s action: {action}")
+                if self.__tracing:
+                    self.trace("action", player=self.players[self.__current_player].get_name(), action=action)
                 # Execute the action
                 output_step = self.step(action)
                 # We call the hook for the player
                 if i > 0 and player1_learn:
+                    if profiling:
+                        start = profiler.clock()
                     self.players[self.__current_player].learn(current_observation, action, *output_step)
-                log.info(f"Combinations are {self.get_combinations_values()}")
+                    if profiling:
+                        elapsed = profiler.clock() - start
+                        profiler.add_player("learn", elapsed, self.players[self.__current_player].name)
+                if self.__tracing:
+                    self.trace("combinations", combinations=self.get_combinations_values())
                 # If the first player of the round passes, defined the max number of throws
                 if action == PASS:
-                    log.debug(f"Player {self.players[self.__current_player].get_name()} passed!")
+                    if profiling:
+                        profiler.count("passes")
+                    if self.__tracing:
+                        self.trace("pass", player=self.players[self.__current_player].get_name())
                     self.__max_throws = self.__current_throw
                     break
 
@@ -272,43 +437,71 @@ class Dice421Env(Env):
             self.__state_round = 1 - self.__state_round
 
             # Second player
-            log.info(f"Player {self.__current_player} has {self.__max_throws} throws")
+            if self.__tracing:
+                self.trace(
+                    "turn_start", player=self.players[self.__current_player].get_name(), max_throws=self.__max_throws
+                )
             for i in range(self.__max_throws):
                 self.__current_throw = i
-                log.debug(f"Throw number {self.__current_throw + 1}")
+                if self.__tracing:
+                    self.trace("throw", throw=self.__current_throw + 1)
                 # The first throw is always all dice!
-                current_observation = self.get_observation_space().copy()
                 if i == 0:
                     action = THROW_ALL
                 else:
-                    action = self.players[self.__current_player].get_next_action(self.get_observation_space())
+                    current_observation = self.get_observation()
+                    # Suspend the game until the player's action is sent back
+                    action = yield self.players[self.__current_player], current_observation
 
-                log.debug(f"Player {self.players[self.__current_player].get_name()}'s action: {action}")
+                if self.__tracing:
+                    self.trace("action", player=self.players[self.__current_player].get_name(), action=action)
                 # Execute the action
                 output_step = self.step(action)
                 if i > 0 and player2_learn:
+                    if profiling:
+                        start = profiler.clock()
                     self.players[self.__current_player].learn(current_observation, action, *output_step)
-                log.info(f"Combinations are {self.get_combinations_values()}")
+                    if profiling:
+                        elapsed = profiler.clock() - start
+                        profiler.add_player("learn", elapsed, self.players[self.__current_player].name)
+                if self.__tracing:
+                    self.trace("combinations", combinations=self.get_combinations_values())
                 # If the second player of the round passes, stop the loop
                 if action == PASS:
-                    log.debug(f"Player {self.players[self.__current_player].get_name()} passed!")
+                    if profiling:
+                        profiler.count("passes")
+                    if self.__tracing:
+                        self.trace("pass", player=self.players[self.__current_player].get_name())
                     break
             # Once both players have finished, compute the winner of the round and update the scores
+            if profiling:
+                start = profiler.clock()
             _ = self.compute_new_score_and_winner_round()
-            self.scores_history_ += [self.scores]
-            log.info(f"The current scores are {self.scores}")
+            if profiling:
+                profiler.add("round", profiler.clock() - start)
+                profiler.count("rounds")
+                if self.__winner_round < 0:
+                    profiler.count("ties")
+            # The scores are updated in place: store a copy
+            self.scores_history_.append(tuple(self.scores))
+            if self.__tracing:
+                self.trace("scores", scores=list(self.scores))
             # Go to the next round (if there is a tie, do not increment)
             if self.__winner_round >= 0:
-                log.info(f"The winner of the round is {self.players[self.__winner_round].get_name()}")
+                if self.__tracing:
+                    self.trace("round_winner", player=self.players[self.__winner_round].get_name())
                 self.__number_round += 1
 
         self.__is_game_over = 1
-        log.info("Game finished!")
+        if self.__tracing:
+            self.trace("game_over")
         if self.__number_round >= MAX_ROUNDS:
-            log.info("Maximum number of rounds reached!")
+            if self.__tracing:
+                self.trace("max_rounds")
         else:
             self.__winner_game = self.scores.index(max(self.scores))
-            log.info(f"The winner of the game is {self.players[self.__winner_game].name}")
+            if self.__tracing:
+                self.trace("game_winner", player=self.players[self.__winner_game].name)
 
         return {
             "winner": self.__winner_game,
@@ -327,3 +520,6 @@ class Dice421Env(Env):
 
     def close(self):
         pass
+
+
+register_env()
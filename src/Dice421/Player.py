@@ -15,6 +15,16 @@ class Player(ABC):
     def get_next_action(self, state):
         pass
 
+    def get_next_actions(self, states_batch):
+        """Actions of a batch of observations (a list, e.g. one per game of `GameScheduler`), as a list. By default
+        each observation is given to `get_next_action`: players override it to decide for the whole batch at once."""
+        return [self.get_next_action(state) for state in states_batch]
+
+    def action_probabilities(self, observations):
+        """Probabilities of the actions (in the order of `transitions.ACTIONS`) for a batch of observations given as a
+        dictionary of arrays, for stationary players (see `exact.evaluate_exact`)."""
+        raise NotImplementedError()
+
     def learn(self, state, action, state_next, reward, done, info) -> None:
         pass
 
@@ -0,0 +1,132 @@
+import os
+import numpy as np
+
+# Compact result of a game
+RESULT_DTYPE = np.dtype([("winner", np.int8), ("scores", np.int16, (2,)), ("rounds", np.int16)])
+# Columns of a store, saved as one `.npy` file each
+COLUMNS = {
+    "winner": (np.int8, ()),
+    "scores": (np.int16, (2,)),
+    "rounds": (np.int16, ()),
+    "history_offsets": (np.int64, ()),
+    "history_scores": (np.int16, (2,)),
+}
+
+
+class ResultStore:
+    """Results of games stored in columns: winner, final scores, number of rounds and, optionally, the scores after
+    each round.
+
+    The histories of scores are ragged: the scores of game `i` are the rows `history_offsets[i]` to
+    `history_offsets[i + 1]` of `history_scores`. Columns are preallocated and grow by doubling. A store can be saved
+    as a directory of `.npy` files and loaded back memory-mapped, and stores filled by different workers can be
+    concatenated.
+    """
+
+    def __init__(self, capacity=1024, keep_history=False):
+        self.keep_history = keep_history
+        self.size = 0
+        self.history_size = 0
+        self.columns = {
+            name: np.zeros((capacity,) + shape, dtype=dtype)
+            for name, (dtype, shape) in COLUMNS.items()
+            if not name.startswith("history_")
+        }
+        # The offsets have one more entry than the number of games
+        self.columns["history_offsets"] = np.zeros(capacity + 1, dtype=np.int64)
+        self.columns["history_scores"] = np.zeros((capacity * 32 if keep_history else 0, 2), dtype=np.int16)
+
+    @staticmethod
+    def grow(array, needed):
+        capacity = max(needed, 2 * len(array))
+        grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+        grown[: len(array)] = array
+        return grown
+
+    def append(self, result):
+        """Appends the result of a game, as returned by `Dice421Env.run`."""
+        if self.size == len(self.columns["winner"]):
+            for name in ["winner", "scores", "rounds"]:
+                self.columns[name] = self.grow(self.columns[name], self.size + 1)
+            offsets = self.columns["history_offsets"]
+            self.columns["history_offsets"] = self.grow(offsets, len(self.columns["winner"]) + 1)
+        i = self.size
+        self.columns["winner"][i] = result["winner"]
+        self.columns["scores"][i] = result["final_scores"]
+        self.columns["rounds"][i] = result["number_rounds"]
+        if self.keep_history:
+            history = result["scores_history"]
+            end = self.history_size + len(history)
+            if end > len(self.columns["history_scores"]):
+                self.columns["history_scores"] = self.grow(self.columns["history_scores"], end)
+            self.columns["history_scores"][self.history_size : end] = history
+            self.history_size = end
+        self.columns["history_offsets"][i + 1] = self.history_size
+        self.size += 1
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, name):
+        """Returns the column `name` (a view on the stored games)."""
+        if name == "history_offsets":
+            return self.columns[name][: self.size + 1]
+        if name == "history_scores":
+            return self.columns[name][: self.history_size]
+        return self.columns[name][: self.size]
+
+    def history(self, game):
+        """Returns the scores after each round of a game, of shape `(n, 2)` (empty without history)."""
+        offsets = self["history_offsets"]
+        return self["history_scores"][offsets[game] : offsets[game + 1]]
+
+    def records(self):
+        """Returns the results (without histories) as an array of `RESULT_DTYPE`."""
+        records = np.empty(self.size, dtype=RESULT_DTYPE)
+        for name in RESULT_DTYPE.names:
+            records[name] = self[name]
+        return records
+
+    def compact(self):
+        """Releases the preallocated memory (e.g. before sending the store to another process)."""
+        self.columns = {name: self[name].copy() for name in COLUMNS}
+        return self
+
+    @property
+    def nbytes(self):
+        return sum(self[name].nbytes for name in COLUMNS)
+
+    def save(self, path):
+        """Saves the store as a directory with one `.npy` file per column."""
+        os.makedirs(path, exist_ok=True)
+        for name in COLUMNS:
+            np.save(os.path.join(path, f"{name}.npy"), self[name])
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        """Loads a store saved by `save`, memory-mapped by default (read-only: the games are read on demand)."""
+        store = cls.__new__(cls)
+        store.columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode) for name in COLUMNS}
+        store.size = len(store.columns["winner"])
+        store.history_size = len(store.columns["history_scores"])
+        store.keep_history = store.history_size > 0
+        return store
+
+    @classmethod
+    def concatenate(cls, stores):
+        """Merges stores (e.g. filled by several workers) into a new store, in the given order."""
+        stores = list(stores)
+        store = cls.__new__(cls)
+        store.keep_history = any(s.keep_history for s in stores)
+        store.size = sum(len(s) for s in stores)
+        store.history_size = sum(s.history_size for s in stores)
+        store.columns = {}
+        for name, (dtype, shape) in COLUMNS.items():
+            if name == "history_offsets":
+                # Offsets are shifted by the number of rows of histories of the previous stores
+                starts = np.cumsum([0] + [s.history_size for s in stores])
+                parts = [np.zeros(1, dtype=np.int64)] + [s[name][1:] + start for s, start in zip(stores, starts)]
+            else:
+                parts = [np.empty((0,) + shape, dtype=dtype)] + [s[name] for s in stores]
+            store.columns[name] = np.concatenate(parts)
+        return store
@@ -0,0 +1,66 @@
+from .Game import Dice421Env
+from .ResultStore import ResultStore
+import numpy as np
+
+
+class GameScheduler:
+    """Plays many games at once, with the decisions of each player taken by batches.
+
+    Each game is a `Dice421Env.play` generator on its own environment, suspended at each decision. The scheduler
+    collects the observations of all the suspended games, groups them by player and answers each group with one call
+    to `get_next_actions` (e.g. one gather of Q-values and one argmax for `NNPlayer`), then resumes the games up to
+    their next decision. A finished game is replaced by a new one on the same environment until `n_games` are played.
+    Players without a batched implementation decide one observation at a time (see `Player.get_next_actions`).
+
+    The scheduler is meant for players whose decisions are expensive per call (e.g. a neural network), which are
+    called once per batch. With table lookups (the optimal, greedy and Q-learning agents), the steps of the
+    environments dominate and it is about as fast as playing the games one by one (see `benchmarks/bench_scheduler.py`).
+
+    Args:
+        n_envs (int): Number of games played at once.
+        seed (int or np.random.SeedSequence, optional): Root seed of the environments (one child each).
+        observation_mode (str): Format of the observations given to the players (see `Dice421Env`).
+    """
+
+    def __init__(self, n_envs=64, seed=None, observation_mode="dict"):
+        self.envs = [
+            Dice421Env(seed=seed_env, observation_mode=observation_mode)
+            for seed_env in np.random.SeedSequence(seed).spawn(n_envs)
+        ]
+
+    def run(self, player1, player2, n_games, player1_learn=True, player2_learn=True, keep_history=False):
+        """Plays `n_games` games between two players (same arguments as `Dice421Env.run`).
+
+        Returns:
+            ResultStore: Results of the games, in the order they finished.
+        """
+        results = ResultStore(capacity=n_games, keep_history=keep_history)
+        players = (player1, player2)
+        n_started = min(len(self.envs), n_games)
+        # Games to resume, with the action answering their last decision (None for a new game)
+        pending = [
+            (env, env.play(player1, player2, False, player1_learn, player2_learn), None)
+            for env in self.envs[:n_started]
+        ]
+        while pending:
+            # Suspended games waiting for a decision of each player, and their observations
+            waiting = ([], []), ([], [])
+            # Games started in this loop are appended to `pending` and resumed in the same loop
+            for env, game, action in pending:
+                try:
+                    player, observation = game.send(action)
+                except StopIteration as stop:
+                    results.append(stop.value)
+                    if n_started < n_games:
+                        n_started += 1
+                        pending.append((env, env.play(player1, player2, False, player1_learn, player2_learn), None))
+                    continue
+                games, observations = waiting[player is not player1]
+                games.append((env, game))
+                observations.append(observation)
+            pending = []
+            for player, (games, observations) in zip(players, waiting):
+                if games:
+                    actions = player.get_next_actions(observations)
+                    pending.extend((env, game, action) for (env, game), action in zip(games, actions))
+        return results.compact()
@@ -0,0 +1,102 @@
+from .ResultStore import ResultStore
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+
+def play_games(player1_factory, player2_factory, n_games, seed_sequence, keep_history=False):
+    """Plays `n_games` games between two players built by their factories (callables taking the environment).
+
+    Args:
+        player1_factory (callable): Builds the first player from the environment.
+        player2_factory (callable): Builds the second player from the environment.
+        n_games (int): Number of games to play.
+        seed_sequence (np.random.SeedSequence): Seeds the environment and the global `numpy` generator (whose state is
+            restored afterwards, so that playing in the current process does not reseed the generator of the caller).
+        keep_history (bool): Whether to store the scores after each round.
+
+    Returns:
+        ResultStore: Results of the games.
+    """
+    # Imported here: the tournament is set up without importing the environment
+    from .Game import Dice421Env
+
+    seed = int(seed_sequence.generate_state(1)[0])
+    # Some agents explore with the global generator: it is seeded for the games (the results do not depend on the
+    # process playing them) and the state of the caller is restored after them
+    global_state = np.random.get_state()
+    np.random.seed(seed)
+    try:
+        env = Dice421Env(seed=seed_sequence)
+        player1, player2 = player1_factory(env), player2_factory(env)
+        results = ResultStore(capacity=n_games, keep_history=keep_history)
+        for _ in range(n_games):
+            results.append(env.run(player1, player2, render=False, player1_learn=False, player2_learn=False))
+    finally:
+        np.random.set_state(global_state)
+    return results.compact()
+
+
+def summarize(results):
+    """Returns the number of games and the proportions of wins of each player and of draws (from a `ResultStore` or
+    an array of `RESULT_DTYPE`), which are NaN without games."""
+    n_games = len(results)
+    if n_games == 0:
+        return {"n_games": 0, "win_1": np.nan, "win_2": np.nan, "draw": np.nan}
+    return {
+        "n_games": n_games,
+        "win_1": np.count_nonzero(results["winner"] == 0) / n_games,
+        "win_2": np.count_nonzero(results["winner"] == 1) / n_games,
+        "draw": np.count_nonzero(results["winner"] == -1) / n_games,
+    }
+
+
+class Tournament:
+    """Evaluation of several matchups in a pool of processes.
+
+    Each matchup `(player1_factory, player2_factory, n_games)` is split into chunks of at most `chunk_size` games and
+    each chunk is seeded with its own child of `np.random.SeedSequence(seed)`. The split does not depend on the number
+    of workers, so the results are the same whatever the size of the pool. Factories must be picklable: classes or
+    `functools.partial` objects, or `FrozenQValues` for trained Q-learning agents. Each worker fills its own
+    `ResultStore` and the stores of the chunks are merged at the end.
+    """
+
+    def __init__(self, matchups, seed=None, chunk_size=250, keep_history=False):
+        self.matchups = list(matchups)
+        self.chunk_size = chunk_size
+        self.keep_history = keep_history
+        # Entropy of the root seed sequence (random if no seed is given)
+        self.entropy = np.random.SeedSequence(seed).entropy
+
+    def get_tasks(self):
+        """Lists the chunks as the arguments of `play_games` preceded by the indices of the matchup and of the chunk."""
+        tasks = []
+        for idx, (seed_matchup, (player1_factory, player2_factory, n_games)) in enumerate(
+            zip(np.random.SeedSequence(self.entropy).spawn(len(self.matchups)), self.matchups)
+        ):
+            n_chunks = -(-n_games // self.chunk_size)
+            for chunk, seed_chunk in enumerate(seed_matchup.spawn(n_chunks)):
+                size = min(self.chunk_size, n_games - chunk * self.chunk_size)
+                tasks.append((idx, chunk, player1_factory, player2_factory, size, seed_chunk, self.keep_history))
+        return tasks
+
+    def iter_results(self, max_workers=None):
+        """Plays all the games and yields `(matchup_index, chunk_index, results)` as soon as chunks are finished.
+        With `max_workers=0`, games are played in the current process."""
+        tasks = self.get_tasks()
+        if max_workers == 0:
+            for idx, chunk, *args in tasks:
+                yield idx, chunk, play_games(*args)
+            return
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(play_games, *args): (idx, chunk) for idx, chunk, *args in tasks}
+            for future in as_completed(futures):
+                idx, chunk = futures[future]
+                yield idx, chunk, future.result()
+
+    def run(self, max_workers=None):
+        """Plays all the games and returns the results of each matchup (one `ResultStore` each, in the order of the
+        games)."""
+        chunks = [{} for _ in self.matchups]
+        for idx, chunk, results in self.iter_results(max_workers=max_workers):
+            chunks[idx][chunk] = results
+        return [ResultStore.concatenate(results[chunk] for chunk in sorted(results)) for results in chunks]
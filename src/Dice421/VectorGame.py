@@ -0,0 +1,226 @@
+from .Combination import RANK_TABLE, POINTS_TABLE
+from .rng import DiceStream
+from .Game import Dice421Env
+from .constants import MAX_ROUNDS, LOSS_REWARD, DRAW_REWARD, IMPROVEMENT_REWARD, WIN_GAME_REWARD
+import numpy as np
+
+# Number of random values drawn at once for each generator
+BLOCK_SIZE = 1024
+
+
+class _BlockStream:
+    """Random integers of a batch of generators, drawn by blocks.
+
+    Drawing a block of integers from a generator gives the same values as drawing them one at a time, so each lane
+    reproduces exactly the stream of the corresponding generator in the scalar environment.
+    """
+
+    def __init__(self, gens, low, high, block_size=BLOCK_SIZE):
+        self.gens = gens
+        self.low, self.high = low, high
+        self.block_size = block_size
+        self.buffer = np.stack([gen.integers(low=low, high=high, size=block_size) for gen in gens])
+        self.cursor = np.zeros(len(gens), dtype=np.int64)
+
+    def refill(self, lanes, needed):
+        """Makes sure that `needed` values are available for the given lanes."""
+        for lane in lanes[self.cursor[lanes] + needed > self.block_size]:
+            cursor = self.cursor[lane]
+            self.buffer[lane, : self.block_size - cursor] = self.buffer[lane, cursor:]
+            self.buffer[lane, self.block_size - cursor :] = self.gens[lane].integers(
+                low=self.low, high=self.high, size=cursor
+            )
+            self.cursor[lane] = 0
+
+    def draw(self, lanes, mask):
+        """Draws values for each lane, one for each True entry of the corresponding row of `mask`.
+        Returns an array of the shape of `mask` (entries where `mask` is False are meaningless)."""
+        counts = mask.sum(axis=1)
+        self.refill(lanes, mask.shape[1])
+        idx = np.minimum(self.cursor[lanes, None] + np.cumsum(mask, axis=1) - 1, self.block_size - 1)
+        values = self.buffer[lanes[:, None], idx]
+        self.cursor[lanes] += counts
+        return values
+
+
+class Dice421VectorEnv:
+    """Batch of `num_envs` 421 games played in lockstep.
+
+    The state of the games is stored as arrays (one row per game, or lane). Each lane is always waiting for a decision
+    of its current player: the first throw of each player, which is always of all dice, is played automatically, and
+    finished games are automatically reset. Given the same seed, lane `i` reproduces exactly the games that
+    `Dice421Env(seed=seed + i)` would play with the same actions (rewards, end-of-round flags and scores).
+    """
+
+    def __init__(self, num_envs, seed=None):
+        self.num_envs = num_envs
+        if seed is None or isinstance(seed, int):
+            # Same convention as gymnasium vector environments
+            self.seeds = [None if seed is None else seed + i for i in range(num_envs)]
+        else:
+            self.seeds = list(seed)
+        self.lanes = np.arange(num_envs)
+
+        # Spaces of a single game
+        env = Dice421Env()
+        self.single_action_space = env.action_space
+        self.single_observation_space = env.observation_space
+
+        # Random stream of each lane, identical to the stream of faces of `Dice421Env` (see `rng.DiceStream`)
+        self.faces = _BlockStream([DiceStream(seed_lane).gen for seed_lane in self.seeds], 1, 7)
+
+        # State of the games
+        self.dice = np.zeros((num_envs, 2, 3), dtype=np.int64)  # Values of the dice (sorted) of each player
+        self.combinations = np.full((num_envs, 2), -1, dtype=np.int64)  # Ranks of the combinations (-1 if None)
+        self.scores = np.zeros((num_envs, 2), dtype=np.int64)  # Scores of players
+        self.current_player = np.zeros(num_envs, dtype=np.int64)  # Who is currently playing
+        self.round_position = np.zeros(num_envs, dtype=np.int64)  # Is the first or second player of the round playing
+        self.state_round = np.zeros(num_envs, dtype=np.int64)
+        self.number_round = np.zeros(num_envs, dtype=np.int64)
+        self.winner_round = np.full(num_envs, -1, dtype=np.int64)
+        self.max_throws = np.full(num_envs, 3, dtype=np.int64)
+        self.current_throw = np.zeros(num_envs, dtype=np.int64)
+
+    def reset(self):
+        """Resets all games and plays until the first decision of each lane. Returns the observations."""
+        self.reset_games(self.lanes)
+        self.start_round(self.lanes)
+        return self.get_observations()
+
+    def reset_games(self, lanes):
+        self.scores[lanes] = 0
+        self.winner_round[lanes] = -1
+        self.state_round[lanes] = 0
+        self.number_round[lanes] = 0
+
+    def start_round(self, lanes):
+        """Resets the round and plays the first throw of the first player."""
+        # Same coin as `DiceStream.coin`
+        coins = (self.faces.draw(lanes, np.ones((len(lanes), 1), dtype=bool))[:, 0] - 1) // 3
+        self.current_player[lanes] = np.where(self.winner_round[lanes] >= 0, self.winner_round[lanes], coins)
+        self.combinations[lanes] = -1
+        self.max_throws[lanes] = 3
+        self.round_position[lanes] = 0
+        self.throw(lanes, np.ones((len(lanes), 3), dtype=bool))
+        self.current_throw[lanes] = 1
+
+    def get_observations(self, lanes=None):
+        """Observations of the current players, as a dictionary of arrays with the keys of `Dice421Env`."""
+        lanes = self.lanes if lanes is None else lanes
+        player = self.current_player[lanes]
+        player_comb = self.dice[lanes, player] * (self.combinations[lanes, player] >= 0)[:, None]
+        opp_comb = self.dice[lanes, 1 - player] * (self.combinations[lanes, 1 - player] >= 0)[:, None]
+        return {
+            "player_comb": player_comb,
+            "opp_comb": opp_comb,
+            "round_nb": self.number_round[lanes].copy(),
+            "max_throws": self.max_throws[lanes].copy(),
+            "current_throws": self.current_throw[lanes].copy(),
+            "state_round": self.state_round[lanes].copy(),
+            "player_score": self.scores[lanes, player],
+            "opp_score": self.scores[lanes, 1 - player],
+        }
+
+    def throw(self, lanes, dices_to_throw):
+        """Throws the dice of the current players, updates the combinations and returns the rewards and end flags."""
+        player = self.current_player[lanes]
+        faces = self.faces.draw(lanes, dices_to_throw)
+        values = np.where(dices_to_throw, faces, self.dice[lanes, player])
+        values = -np.sort(-values, axis=1)
+        self.dice[lanes, player] = values
+        new = RANK_TABLE[values[:, 0] - 1, values[:, 1] - 1, values[:, 2] - 1]
+        points = POINTS_TABLE[new]
+
+        # Same rules as `Dice421Env.get_reward`, written with ranks
+        old, other = self.combinations[lanes, 0], self.combinations[lanes, 1]
+        factor_improvement = (old >= 0) & (new > old)
+        factor_equalizing = (other >= 0) & (new == other)
+        factor_beating = (other >= 0) & (new > other)
+        factor_losing = ((old >= 0) & (new < old)) | ((other >= 0) & (new < other))
+        opponent = self.combinations[lanes, 1 - player]
+        leads_winner_game = points + self.scores[lanes, player] - self.scores[lanes, 1 - player] >= 21
+        end_round = self.state_round[lanes] == 1
+        factor_round_winning = end_round & (old >= 0) & (other >= 0) & (new > opponent)
+        factor_game_winning = factor_round_winning & leads_winner_game
+        rewards = (
+            factor_losing * LOSS_REWARD
+            + factor_equalizing * DRAW_REWARD
+            + factor_improvement * IMPROVEMENT_REWARD
+            + factor_beating * IMPROVEMENT_REWARD * 2
+            + factor_round_winning * points
+            + factor_game_winning * WIN_GAME_REWARD
+        )
+        self.combinations[lanes, player] = new
+        dones = end_round & (opponent >= 0) & (new > opponent) & leads_winner_game
+        return rewards, dones
+
+    def step(self, actions):
+        """Applies one action per lane (which dice to throw) and plays until the next decision of each lane.
+
+        Returns:
+            observations (dict(np.ndarray)): Observations of the next decisions.
+            rewards (np.ndarray): Rewards of the actions.
+            dones (np.ndarray): Whether the actions lead to win the game, as in `Dice421Env.step`.
+            infos (dict): `step_observation` holds the observations right after the actions (the next states of
+                `Dice421Env.step`), `player` and `round_position` which player has played the action and whether they
+                started the round. `game_over` flags lanes whose game finished (and was reset), in which case
+                `winner`, `final_scores` and `number_rounds` describe the finished game.
+        """
+        actions = np.asarray(actions, dtype=bool)
+        lanes = self.lanes
+        infos = {"player": self.current_player.copy(), "round_position": self.round_position.copy()}
+        rewards, dones = self.throw(lanes, actions)
+        infos["step_observation"] = self.get_observations()
+
+        # Is the turn of the current player over?
+        passed = ~actions.any(axis=1)
+        first = self.round_position == 0
+        self.max_throws[passed & first] = self.current_throw[passed & first]
+        self.current_throw[~passed] += 1
+        turn_over = passed | (self.current_throw == self.max_throws)
+
+        # The first player has finished: the second player plays their first throw
+        switch = lanes[turn_over & first]
+        self.current_player[switch] = 1 - self.current_player[switch]
+        self.state_round[switch] = 1 - self.state_round[switch]
+        self.round_position[switch] = 1
+        self.current_throw[switch] = 0
+        self.throw(switch, np.ones((len(switch), 3), dtype=bool))
+        self.current_throw[switch] = 1
+        round_over = turn_over & ~first
+        round_over[switch] = self.max_throws[switch] == 1
+
+        # Both players have finished: compute the winner of the round and the scores
+        ended = lanes[round_over]
+        combinations = self.combinations[ended]
+        winner_round = np.where(
+            combinations[:, 0] > combinations[:, 1], 0, np.where(combinations[:, 0] < combinations[:, 1], 1, -1)
+        )
+        won = winner_round >= 0
+        self.scores[ended[won], winner_round[won]] += POINTS_TABLE[combinations[won, winner_round[won]]]
+        self.winner_round[ended] = winner_round
+        self.number_round[ended] += won
+
+        # Finished games are reset
+        game_over = np.zeros(self.num_envs, dtype=bool)
+        game_over[ended] = (np.abs(self.scores[ended, 0] - self.scores[ended, 1]) >= 21) | (
+            self.number_round[ended] >= MAX_ROUNDS
+        )
+        infos["game_over"] = game_over
+        infos["final_scores"] = self.scores.copy()
+        infos["number_rounds"] = self.number_round.copy()
+        infos["winner"] = np.where(
+            game_over & (self.number_round < MAX_ROUNDS), np.argmax(self.scores, axis=1), -1
+        )
+        self.reset_games(lanes[game_over])
+        self.start_round(ended)
+
+        return self.get_observations(), rewards, dones, infos
+
+
+def unbatch_observation(observations, lane):
+    """Returns the observation of a single lane in the format of `Dice421Env.get_observation_space`."""
+    return {
+        key: tuple(int(x) for x in value[lane]) if value.ndim > 1 else int(value[lane])
+        for key, value in observations.items()
+    }
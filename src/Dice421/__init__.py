@@ -1 +1,25 @@
-from .Game import Dice421Env
+from .Tournament import Tournament
+from .ResultStore import ResultStore
+import importlib
+
+# Classes exported by the package and imported on first access, so that importing the package or one of its modules
+# (e.g. `Dice421.Combination`) does not import the environment and gymnasium. Classes named as their module
+# (`Tournament`, `ResultStore`) are imported above: importing the module would otherwise hide the class.
+_EXPORTS = {
+    "Dice421Env": ".Game",
+    "Dice421VectorEnv": ".VectorGame",
+    "GameScheduler": ".Scheduler",
+}
+__all__ = ["Dice421Env", "Dice421VectorEnv", "Tournament", "ResultStore", "GameScheduler"]
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
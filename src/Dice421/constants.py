@@ -0,0 +1,13 @@
+import itertools as it
+
+# Rules of the game, kept apart from `Game` so that the modules using them do not import gymnasium
+MAX_ROUNDS = 100
+PASS = (0, 0, 0)
+THROW_ALL = (1, 1, 1)
+BASIC_ACTIONS = list(set(it.product((0, 1), (0, 1), (0, 1))))
+
+
+LOSS_REWARD = -1
+IMPROVEMENT_REWARD = 1
+DRAW_REWARD = 0.5
+WIN_GAME_REWARD = 100
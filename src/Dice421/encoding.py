@@ -0,0 +1,132 @@
+from .Combination import RANK_TABLE, SORTED_TRIPLES, N_COMBINATIONS
+from .constants import MAX_ROUNDS
+import math
+import operator
+import numpy as np
+
+# Code of each possible value of a combination in an observation: 0 if the player has not played yet, otherwise the
+# rank of the combination plus one
+COMBINATION_CODES = {(0, 0, 0): 0}
+COMBINATION_CODES.update({tuple(int(x) for x in triple): rank + 1 for rank, triple in enumerate(SORTED_TRIPLES)})
+
+# Number of possible values of each field of the observations of `Dice421Env` (in the order of the observations)
+OBSERVATION_RADICES = {
+    "player_comb": N_COMBINATIONS + 1,
+    "opp_comb": N_COMBINATIONS + 1,
+    "round_nb": MAX_ROUNDS,
+    "max_throws": 4,
+    "current_throws": 3,
+    "state_round": 2,
+    "player_score": MAX_ROUNDS * 8 + 1,
+    "opp_score": MAX_ROUNDS * 8 + 1,
+}
+# Fields of the observations describing the current round only (without the round number and the scores): small enough
+# for a dense Q-table (77,976 states)
+ROUND_RADICES = {
+    field: OBSERVATION_RADICES[field]
+    for field in ["player_comb", "opp_comb", "max_throws", "current_throws", "state_round"]
+}
+
+
+class Observation(dict):
+    """Observation of `Dice421Env` given as a dictionary (as described by its `observation_space`), which also carries
+    its code by the full `ObservationEncoder` (`code`), computed by the environment from its state: the Q-tables read
+    it instead of encoding the dictionary. Observations must not be modified."""
+
+    __slots__ = ("code",)
+
+
+def combination_codes(combinations):
+    """Vectorized version of `COMBINATION_CODES` for an array of sorted dice of shape `(N, 3)`."""
+    combinations = np.asarray(combinations)
+    codes = RANK_TABLE[combinations[:, 0] - 1, combinations[:, 1] - 1, combinations[:, 2] - 1] + 1
+    return np.where(combinations[:, 0] > 0, codes, 0)
+
+
+def stack_observations(states):
+    """Stacks a list of observations (dictionaries) into a dictionary of arrays, as taken by `encode_batch`."""
+    return {field: np.array([state[field] for state in states]) for field in states[0]}
+
+
+def encode_states(encoder, states):
+    """Encodes a list of observations given as dictionaries, or already encoded as integers (with
+    `observation_mode="code"`), into an array of codes."""
+    if isinstance(states[0], (int, np.integer)):
+        return np.asarray(states, dtype=np.int64)
+    if getattr(encoder, "all_fields", False):
+        # The unrolled encoding of each observation is cheaper than stacking them (a few arrays per field)
+        return np.fromiter(map(encoder.encode, states), dtype=np.int64, count=len(states))
+    return encoder.encode_batch(stack_observations(states))
+
+
+class ObservationEncoder:
+    """Mixed-radix encoding of the observations of `Dice421Env` into integers.
+
+    Each field is mapped to an integer between 0 and its radix (combinations are mapped to their rank), so that two
+    different observations have different codes and all codes are between 0 and `n_states`. The radices may cover a
+    subset of the fields of the observations (e.g. `ROUND_RADICES`): the other fields are ignored, and observations
+    must then be given as dictionaries.
+    """
+
+    def __init__(self, radices=None):
+        self.radices = dict(OBSERVATION_RADICES if radices is None else radices)
+        self.fields = list(self.radices)
+        self.combination_fields = [field.endswith("_comb") for field in self.fields]
+        self.n_states = math.prod(self.radices.values())
+        # Weight of each field in the code
+        self.weights = np.cumprod([1] + list(self.radices.values())[:0:-1], dtype=np.int64)[::-1]
+        self.int_weights = [int(weight) for weight in self.weights]
+        self.combination_idx = [i for i, is_combination in enumerate(self.combination_fields) if is_combination]
+        self.all_fields = self.fields == list(OBSERVATION_RADICES)
+        if self.all_fields:
+            # Unrolled encoding of the full observations (the default encoding of the Q-tables): the fields are read at
+            # once, the combinations are mapped to their term of the code by dictionaries and the other fields (small
+            # integers) are folded by Horner's rule
+            self.full = (
+                operator.itemgetter(*self.fields),
+                {dice: self.int_weights[0] * code for dice, code in COMBINATION_CODES.items()},
+                {dice: self.int_weights[1] * code for dice, code in COMBINATION_CODES.items()},
+                *list(self.radices.values())[3:],
+            )
+
+    def encode(self, state):
+        """Encodes an observation, given as a dictionary or as the tuple of its values."""
+        if type(state) is Observation and self.all_fields:
+            return state.code
+        if self.all_fields and isinstance(state, dict):
+            get, player_terms, opp_terms, r_max, r_throw, r_state, r_score, r_opp_score = self.full
+            player, opponent, round_nb, max_throws, current_throws, state_round, score, opp_score = get(state)
+            rest = ((round_nb * r_max + max_throws) * r_throw + current_throws) * r_state + state_round
+            rest = rest * r_score + score
+            try:
+                return player_terms[player] + opp_terms[opponent] + rest * r_opp_score + opp_score
+            except (KeyError, TypeError):
+                # Combinations which are not tuples (e.g. lists or arrays)
+                pass
+        if self.all_fields:
+            values = list(state.values() if isinstance(state, dict) else state)
+        else:
+            values = [state[field] for field in self.fields]
+        for i in self.combination_idx:
+            values[i] = COMBINATION_CODES[tuple(values[i])]
+        return sum(map(operator.mul, self.int_weights, values))
+
+    def encode_batch(self, observations):
+        """Encodes a batch of observations given as a dictionary of arrays (e.g. from `Dice421VectorEnv`)."""
+        codes = 0
+        for field, weight, is_combination in zip(self.fields, self.weights, self.combination_fields):
+            values = combination_codes(observations[field]) if is_combination else np.asarray(observations[field])
+            codes = codes + weight * values.astype(np.int64)
+        return codes
+
+    def decode(self, code):
+        """Returns the observation (dictionary) of a code."""
+        values = {}
+        for field, radix, is_combination in zip(
+            self.fields[::-1], list(self.radices.values())[::-1], self.combination_fields[::-1]
+        ):
+            code, value = divmod(code, radix)
+            if is_combination:
+                value = tuple(int(x) for x in SORTED_TRIPLES[value - 1]) if value > 0 else (0, 0, 0)
+            values[field] = value
+        return {field: values[field] for field in self.fields}
@@ -0,0 +1,138 @@
+"""Sequential evaluation of matchups: games are played by batches until a stopping rule reaches its precision.
+
+Two rules are provided:
+
+- `WilsonStopping` stops when the Wilson score interval of the win rate of a player is narrower than a width. The
+  interval is checked after each batch, so its error level is split between the possible checks (Bonferroni
+  correction over `max_games / batch_size` checks): the final interval keeps its coverage whatever the check at which
+  the evaluation stops.
+- `SPRTStopping` is Wald's sequential probability ratio test of the win rate of the first player among decisive games,
+  `p <= p0` against `p >= p1`, with error rates `alpha` and `beta` (checking only after each batch keeps them).
+
+Lopsided matchups stop after a few batches, as their interval is narrow and their likelihood ratio grows fast.
+"""
+
+from .ResultStore import ResultStore
+from statistics import NormalDist
+import math
+import numpy as np
+
+
+def wilson_interval(successes, n, confidence=0.95):
+    """Wilson score interval of a proportion (`(0, 1)` without observations)."""
+    if n == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = successes / n
+    center = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half_width = z / (1 + z * z / n) * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n))
+    return max(0.0, center - half_width), min(1.0, center + half_width)
+
+
+def outcome_counts(winners):
+    """Numbers of wins of the first player, wins of the second player and draws."""
+    draws, wins_1, wins_2 = np.bincount(np.asarray(winners, dtype=np.int64) + 1, minlength=3)
+    return int(wins_1), int(wins_2), int(draws)
+
+
+class WilsonStopping:
+    """Stops when the Wilson interval of the win rate of `player` (0 or 1) is at most `width` wide.
+
+    Args:
+        width (float): Width of the interval to reach.
+        confidence (float): Overall confidence level of the interval.
+        player (int): Index of the player whose win rate is estimated.
+        correct (bool): Whether to split the error level between the checks (keeps the coverage of the final
+            interval, at the cost of wider intervals at each check).
+    """
+
+    def __init__(self, width=0.05, confidence=0.95, player=0, correct=True):
+        self.width = width
+        self.confidence = confidence
+        self.player = player
+        self.correct = correct
+
+    def check(self, counts, max_checks):
+        """Returns whether to stop and the estimate of the win rate after the games of `counts` (see
+        `outcome_counts`)."""
+        n = sum(counts)
+        alpha = 1 - self.confidence
+        if self.correct:
+            alpha /= max_checks
+        low, high = wilson_interval(counts[self.player], n, 1 - alpha)
+        estimate = {"win_rate": counts[self.player] / n if n else 0.0, "interval": (low, high)}
+        return high - low <= self.width, estimate
+
+
+class SPRTStopping:
+    """Sequential probability ratio test of the win rate `p` of the first player among decisive games (draws are
+    ignored), `H0: p = p0` against `H1: p = p1`.
+
+    The decision is "H1" (the first player wins with probability at least `p1`), "H0" (at most `p0`) or None if the
+    evaluation reached its maximum number of games before the test could decide.
+
+    Args:
+        p0 (float): Win rate under the null hypothesis.
+        p1 (float): Win rate under the alternative hypothesis (`p1 > p0`).
+        alpha (float): Probability of deciding "H1" when `p <= p0`.
+        beta (float): Probability of deciding "H0" when `p >= p1`.
+    """
+
+    def __init__(self, p0=0.45, p1=0.55, alpha=0.05, beta=0.05):
+        if not 0 < p0 < p1 < 1:
+            raise ValueError("The win rates must satisfy 0 < p0 < p1 < 1")
+        self.p0, self.p1 = p0, p1
+        self.alpha, self.beta = alpha, beta
+        self.upper = math.log((1 - beta) / alpha)
+        self.lower = math.log(beta / (1 - alpha))
+
+    def log_likelihood_ratio(self, wins, losses):
+        return wins * math.log(self.p1 / self.p0) + losses * math.log((1 - self.p1) / (1 - self.p0))
+
+    def check(self, counts, max_checks):
+        wins, losses, _ = counts
+        llr = self.log_likelihood_ratio(wins, losses)
+        decision = "H1" if llr >= self.upper else "H0" if llr <= self.lower else None
+        decisive = wins + losses
+        estimate = {"win_rate": wins / decisive if decisive else 0.0, "llr": llr, "decision": decision}
+        return decision is not None, estimate
+
+
+def evaluate(env, player1, player2, rule, batch_size=100, max_games=4000, keep_history=False):
+    """Plays games between two players (without learning) by batches of `batch_size` until `rule` stops or
+    `max_games` games are played.
+
+    Args:
+        env (Dice421Env): Environment of the games.
+        player1 (Player): First player.
+        player2 (Player): Second player.
+        rule (WilsonStopping or SPRTStopping): Stopping rule, checked after each batch.
+        batch_size (int): Number of games between two checks.
+        max_games (int): Maximum number of games.
+        keep_history (bool): Whether to store the scores after each round.
+
+    Returns:
+        dict: Number of games played, whether the rule stopped the evaluation, the proportions of wins of each player
+            and of draws, the estimate of the rule (e.g. its interval or decision) and the results of the games (a
+            `ResultStore`).
+    """
+    if batch_size < 1 or max_games < 1:
+        raise ValueError("The batch size and the maximum number of games must be at least 1")
+    max_checks = -(-max_games // batch_size)
+    results = ResultStore(capacity=min(max_games, 1024), keep_history=keep_history)
+    stopped = False
+    while len(results) < max_games and not stopped:
+        for _ in range(min(batch_size, max_games - len(results))):
+            results.append(env.run(player1, player2, render=False, player1_learn=False, player2_learn=False))
+        counts = outcome_counts(results["winner"])
+        stopped, estimate = rule.check(counts, max_checks)
+    n_games = len(results)
+    return {
+        "n_games": n_games,
+        "stopped": stopped,
+        "win_1": counts[0] / n_games,
+        "win_2": counts[1] / n_games,
+        "draw": counts[2] / n_games,
+        "estimate": estimate,
+        "results": results.compact(),
+    }
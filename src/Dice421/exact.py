@@ -0,0 +1,341 @@
+"""Exact evaluation of a game between two stationary policies, without simulation.
+
+Given the probabilities of the actions of both players in every state of a round, the distribution of the outcome of
+a round (winner and points, or tie) follows exactly from the probabilities of the dice (`transitions.keep_transitions`).
+The game is then a Markov chain over the score difference, the player starting the round and the parity of the rounds
+played (the `state_round` of the observations flips once per round, ties included), played for at most `MAX_ROUNDS`
+decisive rounds: a tie is replayed with a starter drawn at random and is not counted, as in `Dice421Env.run`, and the
+game is a draw if nobody leads by 21 points after `MAX_ROUNDS` rounds.
+
+Policies are objects with a method `action_probabilities(observations)` returning the probabilities of the actions
+(shape `(N, N_ACTIONS)`, in the order of `ACTIONS`) for a batch of observations given as a dictionary of arrays (e.g.
+`GreedyPolicy`, `NNPlayer`, `OptimalPlayer` or `RandomPlayer`). The evaluation is exact for policies which depend on
+the scores only through their difference, and on the round number only with `by_round=True`.
+"""
+
+from .Combination import N_COMBINATIONS, POINTS_TABLE, SORTED_TRIPLES
+from .constants import MAX_ROUNDS
+from .solver import DIFFERENCES, WINNING_DIFFERENCE
+from .transitions import keep_transitions, THROW_ALL_IDX
+from functools import lru_cache
+import numpy as np
+
+# Decisions of the second player of a round: (maximum number of throws, current throw)
+SECOND_DECISIONS = [(2, 1), (3, 1), (3, 2)]
+N_POINTS = int(POINTS_TABLE.max()) + 1
+
+
+# The observations of a round take about 70 MB: only those of the first round and of the checks of
+# `_check_stationary` are kept
+@lru_cache(maxsize=3)
+def decision_observations(round_nb=0, score_offset=0):
+    """Observations of all the decisions of a round, for each parity of the round and each score difference of
+    `DIFFERENCES` (from the point of view of the player deciding), as read-only arrays.
+
+    Returns:
+        tuple(dict, dict): Observations of the first player, ordered by (parity, difference, throw 1 or 2,
+            combination), and of the second player, ordered by (parity, difference, decision of `SECOND_DECISIONS`,
+            combination, combination of the first player). The first player of a round of parity `p` sees
+            `state_round == p` and the second one `1 - p`. Scores are `max(difference, 0)` and `max(-difference, 0)`
+            plus `score_offset`.
+    """
+
+    def observations(shape, player, opponent, max_throws, current_throws, state_round):
+        difference = np.broadcast_to(DIFFERENCES.reshape((1, -1) + (1,) * (len(shape) - 2)), shape).ravel()
+        n = difference.size
+        arrays = {
+            "player_comb": SORTED_TRIPLES[np.broadcast_to(player, shape).ravel()],
+            "opp_comb": (
+                np.zeros((n, 3), dtype=np.int64)
+                if opponent is None
+                else SORTED_TRIPLES[np.broadcast_to(opponent, shape).ravel()]
+            ),
+            "round_nb": np.full(n, round_nb),
+            "max_throws": np.broadcast_to(max_throws, shape).ravel(),
+            "current_throws": np.broadcast_to(current_throws, shape).ravel(),
+            "state_round": np.broadcast_to(state_round, shape).ravel(),
+            "player_score": np.maximum(difference, 0) + score_offset,
+            "opp_score": np.maximum(-difference, 0) + score_offset,
+        }
+        for array in arrays.values():
+            array.flags.writeable = False
+        return arrays
+
+    combinations = np.arange(N_COMBINATIONS)
+    parities = np.arange(2)
+    first = observations(
+        (2, len(DIFFERENCES), 2, N_COMBINATIONS),
+        combinations[None, None, None, :],
+        None,
+        3,
+        np.array([1, 2])[None, None, :, None],
+        parities[:, None, None, None],
+    )
+    max_throws, current_throws = np.array(SECOND_DECISIONS).T
+    second = observations(
+        (2, len(DIFFERENCES), len(SECOND_DECISIONS), N_COMBINATIONS, N_COMBINATIONS),
+        combinations[None, None, None, :, None],
+        combinations[None, None, None, None, :],
+        max_throws[None, None, :, None, None],
+        current_throws[None, None, :, None, None],
+        1 - parities[:, None, None, None, None],
+    )
+    return first, second
+
+
+def decision_probabilities(policy, round_nb=0, score_offset=0):
+    """Probabilities of the actions of a policy in all the decisions of a round (see `decision_observations`), of
+    shapes `(2, len(DIFFERENCES), 2, N_COMBINATIONS, N_ACTIONS)` and `(2, len(DIFFERENCES), 3, N_COMBINATIONS,
+    N_COMBINATIONS, N_ACTIONS)` (the first axis being the parity of the round)."""
+    first, second = decision_observations(round_nb, score_offset)
+    n_differences = len(DIFFERENCES)
+    return (
+        np.asarray(policy.action_probabilities(first), dtype=float).reshape(2, n_differences, 2, N_COMBINATIONS, -1),
+        np.asarray(policy.action_probabilities(second), dtype=float).reshape(
+            2, n_differences, len(SECOND_DECISIONS), N_COMBINATIONS, N_COMBINATIONS, -1
+        ),
+    )
+
+
+def _throw(dist, probabilities):
+    """Distribution of the next combination (last axis) when the actions are not passing: `dist[..., c]` is the
+    probability of the combination `c` and `probabilities[..., c, a]` the probability of the action `a`."""
+    P_throw = keep_transitions()[:, 1:, :].reshape(-1, N_COMBINATIONS)  # Actions throwing at least one die
+    weights = dist[..., None] * probabilities[..., 1:]
+    return (weights.reshape(-1, P_throw.shape[0]) @ P_throw).reshape(dist.shape)
+
+
+def round_distributions(first_probabilities, second_probabilities):
+    """Distributions of the final combinations of a policy in a round, when it starts and when it answers, for every
+    parity and difference (they only depend on the policy, and are combined with those of the opponent by
+    `round_outcomes`).
+
+    Args:
+        first_probabilities (np.ndarray): Probabilities of the actions as first player (see `decision_probabilities`).
+        second_probabilities (np.ndarray): Probabilities of the actions as second player.
+
+    Returns:
+        tuple(np.ndarray, np.ndarray): Probabilities of the final combination of the first player by number of throws,
+            of shape `(2, len(DIFFERENCES), 3, N_COMBINATIONS)`, and of the final combination of the second player
+            given the number of throws and the combination of the first player, of shape `(2, len(DIFFERENCES), 3,
+            N_COMBINATIONS, N_COMBINATIONS)`.
+    """
+    P_all = keep_transitions()[0, THROW_ALL_IDX]
+    # Policies often ignore the score difference, or clip it: the distributions are computed once per run of
+    # consecutive differences with the same probabilities of actions
+    starts = [0] + [
+        i
+        for i in range(1, first_probabilities.shape[1])
+        if not all(np.array_equal(p[:, i], p[:, i - 1]) for p in (first_probabilities, second_probabilities))
+    ]
+    lengths = np.diff(starts + [first_probabilities.shape[1]])
+    first_probabilities, second_probabilities = first_probabilities[:, starts], second_probabilities[:, starts]
+
+    # First player: probability of each final combination, by number of throws (which the second player gets)
+    dist = np.broadcast_to(P_all, first_probabilities.shape[:2] + (N_COMBINATIONS,))
+    first = []
+    for throw_idx in range(2):
+        probabilities = first_probabilities[:, :, throw_idx]
+        first.append(dist * probabilities[..., 0])
+        dist = _throw(dist, probabilities)
+    first.append(dist)
+
+    # Second player: probability of each final combination given the final combination of the first player, indexed
+    # by (parity, difference, first combination, second combination)
+    dist_all = np.broadcast_to(P_all, second_probabilities.shape[:2] + (N_COMBINATIONS, N_COMBINATIONS))
+    second = [dist_all]
+    for max_throws in (2, 3):
+        dist, final = dist_all, 0.0
+        for current_throws in range(1, max_throws):
+            probabilities = second_probabilities[:, :, SECOND_DECISIONS.index((max_throws, current_throws))]
+            # Indexed by (parity, difference, combination of the first player, own combination, action)
+            probabilities = np.swapaxes(probabilities, 2, 3)
+            final = final + dist * probabilities[..., 0]
+            dist = _throw(dist, probabilities)
+        second.append(final + dist)
+    return np.repeat(np.stack(first, axis=2), lengths, axis=1), np.repeat(np.stack(second, axis=2), lengths, axis=1)
+
+
+def round_outcomes(first_distributions, second_distributions):
+    """Distribution of the outcome of a round for each parity and score difference.
+
+    Args:
+        first_distributions (np.ndarray): Final combinations of the first player of the round (first result of
+            `round_distributions`).
+        second_distributions (np.ndarray): Final combinations of the second player (second result of
+            `round_distributions`), for the same differences from the point of view of the first player.
+
+    Returns:
+        dict: `first` and `second` (shape `(2, n_differences, N_POINTS)`): probabilities that the first or the second
+            player wins the round with a number of points, `tie` (shape `(2, n_differences)`): probability of a tie.
+    """
+    # Indexed by (parity, difference, first combination, second combination)
+    joint = (first_distributions[..., None] * second_distributions).sum(axis=2)
+    first, second = np.meshgrid(np.arange(N_COMBINATIONS), np.arange(N_COMBINATIONS), indexing="ij")
+    points = np.eye(N_POINTS)[POINTS_TABLE]
+    return {
+        "first": (joint * (first > second)).sum(axis=3) @ points,
+        "second": (joint * (first < second)).sum(axis=2) @ points,
+        "tie": (joint * (first == second)).sum(axis=(2, 3)),
+    }
+
+
+def _check_stationary(policy, probabilities, name, by_round):
+    """Raises if the actions of a policy (with the `probabilities` of `decision_probabilities` in the first round)
+    change with the absolute scores, or with the round number if not `by_round`, as the evaluation would not be
+    exact. Both are changed at once, and separately only to tell which one the actions depend on."""
+
+    def changes(round_nb, score_offset):
+        return not all(map(np.array_equal, probabilities, decision_probabilities(policy, round_nb, score_offset)))
+
+    if by_round or changes(MAX_ROUNDS // 2, 10):
+        if changes(0, 10):
+            raise ValueError(f"The actions of {name} depend on the scores, not only on their difference")
+        if not by_round:
+            raise ValueError(f"The actions of {name} depend on the round number (use by_round=True)")
+
+
+class PolicyRounds:
+    """Round distributions of a policy (see `round_distributions`), so that those of the first round are computed once
+    for the evaluations of the policy against several opponents. With `by_round`, the distributions of the other
+    rounds are computed on each use (they take about 6 MB per round).
+
+    Args:
+        policy: Policy (with a method `action_probabilities`), which must not change while it is kept.
+        by_round (bool): Whether the policy depends on the round number (otherwise the first round stands for all).
+    """
+
+    def __init__(self, policy, by_round=False):
+        self.policy = policy
+        self.by_round = by_round
+        self.checked = False
+        self.first_round = None
+
+    def check(self, name):
+        """Checks once that the policy can be evaluated exactly (see `_check_stationary`)."""
+        if not self.checked:
+            probabilities = decision_probabilities(self.policy)
+            _check_stationary(self.policy, probabilities, name, self.by_round)
+            if self.first_round is None:
+                self.first_round = round_distributions(*probabilities)
+            self.checked = True
+
+    def __getitem__(self, round_nb):
+        if self.by_round and round_nb > 0:
+            return round_distributions(*decision_probabilities(self.policy, round_nb))
+        if self.first_round is None:
+            self.first_round = round_distributions(*decision_probabilities(self.policy))
+        return self.first_round
+
+
+def round_transitions(distributions1, distributions2):
+    """Transition matrix of a decisive round of the game between two policies (ties are replayed), given the
+    distributions of their final combinations (see `round_distributions`).
+
+    States are indexed by `4 * i + 2 * s + p` where `i` is the index in `DIFFERENCES` of the score of the first policy
+    minus the score of the second one, `s` the policy starting the round (0 or 1) and `p` the parity of the number of
+    rounds played (ties included), followed by two absorbing states (the first or the second policy wins the game).
+
+    Returns:
+        tuple(np.ndarray, np.ndarray): Transition matrix of shape `(n_states, n_states)` and expected number of ties
+            before the decisive round from each transient state.
+    """
+    n = len(DIFFERENCES)
+    # Outcomes when the first policy starts, and when the second one starts (for its own differences, reversed to index
+    # them by the difference of the first policy)
+    starts1 = round_outcomes(distributions1[0], distributions2[1][:, ::-1])
+    starts2 = round_outcomes(distributions2[0], distributions1[1][:, ::-1])
+    starts2 = {key: value[:, ::-1] for key, value in starts2.items()}
+    # Decisive outcomes by (difference, starter, parity, winner, points): the first policy wins, or the other one (the
+    # winner of the round starts the next one), and probabilities of a tie by (difference, starter, parity)
+    wins = np.stack(
+        [
+            np.stack([starts1["first"], starts1["second"]], axis=2),
+            np.stack([starts2["second"], starts2["first"]], axis=2),
+        ]
+    ).transpose(2, 0, 1, 3, 4)
+    ties = np.stack([starts1["tie"], starts2["tie"]]).transpose(2, 0, 1)
+    # After a tie, the starter is drawn at random and the parity flips: decisive outcome from a random starter at each
+    # parity `p`, `M[p] = A[p] + t[p] * M[1 - p]`, with the parity `q` of the decisive round (shape (difference,
+    # parity, parity of the decisive round, winner, points))
+    random_wins = wins.mean(axis=1)
+    tie_random = ties.mean(axis=1)
+    t0, t1 = tie_random[:, 0, None, None], tie_random[:, 1, None, None]
+    determinant = 1 - t0 * t1
+    from_random = np.zeros((n, 2, 2, 2, N_POINTS))
+    from_random[:, 0, 0] = random_wins[:, 0] / determinant
+    from_random[:, 0, 1] = t0 * random_wins[:, 1] / determinant
+    from_random[:, 1, 1] = random_wins[:, 1] / determinant
+    from_random[:, 1, 0] = t1 * random_wins[:, 0] / determinant
+    # Indexed by (difference, starter, parity, decisive parity, winner, points)
+    outcomes = ties[..., None, None, None] * from_random[:, None, ::-1]
+    parities = np.arange(2)
+    outcomes[:, :, parities, parities] += wins
+    # Expected ties: `T[p] = t[p] * (1 + T[1 - p])` from a random starter
+    t0, t1 = tie_random[:, 0], tie_random[:, 1]
+    ties_random = np.stack([t0 * (1 + t1), t1 * (1 + t0)], axis=1) / (1 - t0 * t1)[:, None]
+    expected_ties = ties * (1 + ties_random[:, None, ::-1])
+
+    # Source and target state of every outcome (the next round has the other parity)
+    i, starter, parity, decisive_parity, winner, points = np.indices(outcomes.shape, sparse=True)
+    new_differences = DIFFERENCES[i] + (1 - 2 * winner) * points
+    targets = 4 * (new_differences - DIFFERENCES[0]) + 2 * winner + 1 - decisive_parity
+    targets = np.where(new_differences >= WINNING_DIFFERENCE, 4 * n, targets)
+    targets = np.where(new_differences <= -WINNING_DIFFERENCE, 4 * n + 1, targets)
+    sources = 4 * i + 2 * starter + parity
+    n_states = 4 * n + 2
+    flat = np.broadcast_to(sources * n_states + targets, outcomes.shape).ravel()
+    transitions = np.bincount(flat, weights=outcomes.ravel(), minlength=n_states * n_states).reshape(n_states, -1)
+    transitions[4 * n, 4 * n] = transitions[4 * n + 1, 4 * n + 1] = 1.0
+    return transitions, expected_ties.ravel()
+
+
+def evaluate_exact(policy1, policy2, by_round=False, check=True, cache=None):
+    """Exact probabilities of the outcomes of a game between two policies (the first one being `player1` of
+    `Dice421Env.run`).
+
+    Args:
+        policy1: First policy (with a method `action_probabilities`).
+        policy2: Second policy.
+        by_round (bool): Whether the policies depend on the round number (the rounds are then computed one by one, about
+            `MAX_ROUNDS` times slower).
+        check (bool): Whether to check that the policies depend on the scores only through their difference (and not
+            on the round number without `by_round`).
+        cache (dict, optional): Round distributions of the policies (`PolicyRounds`) kept between calls: evaluating a
+            policy against several opponents with the same `cache` computes them once. The policies must not change
+            meanwhile.
+
+    Returns:
+        dict: Probabilities that the first policy wins (`win_1`), that the second one wins (`win_2`) and of a draw
+            (`draw`), expected number of rounds as counted by `Dice421Env.run` (`expected_rounds`, without the ties)
+            and expected number of ties (`expected_ties`).
+    """
+    cache = {} if cache is None else cache
+    # The cached rounds keep their policy alive, so that its id is not reused
+    rounds1, rounds2 = (
+        cache.setdefault((id(policy), by_round), PolicyRounds(policy, by_round)) for policy in (policy1, policy2)
+    )
+    if check:
+        rounds1.check("the first policy")
+        rounds2.check("the second policy")
+    n = len(DIFFERENCES)
+    # Start: difference 0, starter drawn at random, first round (`state_round` 0 for the starter)
+    state = np.zeros(4 * n + 2)
+    state[4 * (0 - DIFFERENCES[0]) : 4 * (0 - DIFFERENCES[0]) + 4 : 2] = 0.5
+    expected_rounds = expected_ties = 0.0
+    for round_nb in range(MAX_ROUNDS):
+        if round_nb == 0 or by_round:
+            transitions, ties = round_transitions(rounds1[round_nb], rounds2[round_nb])
+        alive = state[: 4 * n]
+        expected_rounds += alive.sum()
+        expected_ties += alive @ ties
+        previous, state = state, state @ transitions
+    # `Dice421Env.run` checks the number of rounds first: a game decided in the last round is a draw
+    win_1, win_2 = previous[4 * n], previous[4 * n + 1]
+    return {
+        "win_1": win_1,
+        "win_2": win_2,
+        "draw": 1.0 - win_1 - win_2,
+        "expected_rounds": expected_rounds,
+        "expected_ties": expected_ties,
+    }
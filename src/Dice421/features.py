@@ -0,0 +1,131 @@
+"""Features of the observations of `Dice421Env`, combined into compact state encodings for Q-tables.
+
+A `FeatureEncoder` has the interface of `ObservationEncoder` (`n_states`, `radices`, `encode`, `encode_batch`,
+`decode`) but encodes features computed from the observations instead of their raw fields, e.g. the score difference
+clipped to the points which matter instead of both scores, or the combination of the opponent reduced to a bucket of
+ranks. Observations must be given as dictionaries.
+"""
+
+from .Combination import N_COMBINATIONS
+from .encoding import COMBINATION_CODES, OBSERVATION_RADICES, combination_codes
+import math
+import numpy as np
+
+
+class Field:
+    """Raw field of the observations (combinations are mapped to their code, see `COMBINATION_CODES`)."""
+
+    def __init__(self, field):
+        self.name = field
+        self.radix = OBSERVATION_RADICES[field]
+        self.combination = field.endswith("_comb")
+
+    def __call__(self, state):
+        value = state[self.name]
+        return COMBINATION_CODES[tuple(value)] if self.combination else int(value)
+
+    def batch(self, observations):
+        values = observations[self.name]
+        return combination_codes(values) if self.combination else np.asarray(values, dtype=np.int64)
+
+    def spec(self):
+        return ["Field", self.name]
+
+
+class ScoreDifference:
+    """Score of the player minus score of the opponent, clipped to `[-clip, clip]` (a game is won with a difference
+    of 21 points, so larger differences are equivalent)."""
+
+    def __init__(self, clip=21):
+        self.name = "score_difference"
+        self.clip = clip
+        self.radix = 2 * clip + 1
+
+    def __call__(self, state):
+        return min(max(state["player_score"] - state["opp_score"], -self.clip), self.clip) + self.clip
+
+    def batch(self, observations):
+        difference = np.asarray(observations["player_score"]) - np.asarray(observations["opp_score"])
+        return np.clip(difference, -self.clip, self.clip).astype(np.int64) + self.clip
+
+    def spec(self):
+        return ["ScoreDifference", self.clip]
+
+
+class RankBucket:
+    """Combination of a field reduced to one of `n_buckets` buckets of consecutive ranks (0 without combination)."""
+
+    def __init__(self, field, n_buckets=8):
+        self.name = f"{field}_bucket"
+        self.field = field
+        self.n_buckets = n_buckets
+        self.radix = n_buckets + 1
+
+    def __call__(self, state):
+        code = COMBINATION_CODES[tuple(state[self.field])]
+        return 1 + (code - 1) * self.n_buckets // N_COMBINATIONS if code > 0 else 0
+
+    def batch(self, observations):
+        codes = combination_codes(observations[self.field])
+        return np.where(codes > 0, 1 + (codes - 1) * self.n_buckets // N_COMBINATIONS, 0)
+
+    def spec(self):
+        return ["RankBucket", self.field, self.n_buckets]
+
+
+FEATURES = {"Field": Field, "ScoreDifference": ScoreDifference, "RankBucket": RankBucket}
+
+
+class FeatureEncoder:
+    """Mixed-radix encoding of a list of features of the observations (the first feature is the most significant)."""
+
+    def __init__(self, features):
+        self.features = list(features)
+        self.radices = {feature.name: feature.radix for feature in self.features}
+        if len(self.radices) != len(self.features):
+            raise ValueError("Features must have different names")
+        self.n_states = math.prod(self.radices.values())
+
+    def encode(self, state):
+        code = 0
+        for feature in self.features:
+            code = code * feature.radix + feature(state)
+        return code
+
+    def encode_batch(self, observations):
+        """Encodes a batch of observations given as a dictionary of arrays (e.g. from `Dice421VectorEnv`)."""
+        codes = 0
+        for feature in self.features:
+            codes = codes * feature.radix + feature.batch(observations)
+        return codes
+
+    def decode(self, code):
+        """Returns the values of the features of a code."""
+        values = {}
+        for feature in self.features[::-1]:
+            code, values[feature.name] = divmod(code, feature.radix)
+        return {feature.name: values[feature.name] for feature in self.features}
+
+    def spec(self):
+        """JSON-serializable description of the features (see `from_spec`)."""
+        return [feature.spec() for feature in self.features]
+
+    @classmethod
+    def from_spec(cls, spec):
+        return cls(FEATURES[name](*args) for name, *args in spec)
+
+
+def abstract_encoder(clip=21, opponent_buckets=None):
+    """Encoding of the observations without the round number and with the clipped score difference instead of the
+    scores, optionally with the combination of the opponent reduced to `opponent_buckets` buckets of ranks."""
+    opponent = Field("opp_comb") if opponent_buckets is None else RankBucket("opp_comb", opponent_buckets)
+    return FeatureEncoder(
+        [
+            Field("player_comb"),
+            opponent,
+            Field("max_throws"),
+            Field("current_throws"),
+            Field("state_round"),
+            ScoreDifference(clip),
+        ]
+    )
@@ -1,23 +1,31 @@
+from collections import deque
+import json
 import logging
 import sys
 
 LOGFILE = "game.log"
 
-log = logging.getLogger()
-log.setLevel(logging.DEBUG)
+log = logging.getLogger("Dice421")
+# Silent until logging is enabled: handlers (and the log file) are only created then
+log.setLevel(logging.CRITICAL)
+log.propagate = False
 formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 
-fhandler = logging.FileHandler(filename=LOGFILE, mode="a")
-fhandler.setFormatter(formatter)
-fhandler.setLevel(level=logging.DEBUG)
 
-streamhandler = logging.StreamHandler(stream=sys.stdout)
-streamhandler.setFormatter(formatter)
-streamhandler.setLevel(level=logging.INFO)
+def setup_handlers():
+    """Adds the file and console handlers to the logger (only once)."""
+    if log.handlers:
+        return
+    fhandler = logging.FileHandler(filename=LOGFILE, mode="a")
+    fhandler.setFormatter(formatter)
+    fhandler.setLevel(level=logging.DEBUG)
 
+    streamhandler = logging.StreamHandler(stream=sys.stdout)
+    streamhandler.setFormatter(formatter)
+    streamhandler.setLevel(level=logging.INFO)
 
-log.addHandler(fhandler)
-log.addHandler(streamhandler)
+    log.addHandler(fhandler)
+    log.addHandler(streamhandler)
 
 
 def clear_log():
@@ -26,8 +34,48 @@ def clear_log():
 
 
 def log_enable():
+    setup_handlers()
     log.setLevel(logging.DEBUG)
 
 
 def log_disable():
     log.setLevel(logging.CRITICAL)
+
+
+class RingBufferSink:
+    """Event sink keeping the last `maxlen` events of the games as `(event, fields)` tuples."""
+
+    def __init__(self, maxlen=10_000):
+        self.events = deque(maxlen=maxlen)
+
+    def record(self, event, fields):
+        self.events.append((event, fields))
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def __len__(self):
+        return len(self.events)
+
+
+class BatchedWriterSink:
+    """Event sink writing the events of the games to a file as JSON lines, by batches of `batch_size` events."""
+
+    def __init__(self, path, batch_size=10_000):
+        self.path = path
+        self.batch_size = batch_size
+        self.batch = []
+
+    def record(self, event, fields):
+        self.batch.append((event, fields))
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        with open(self.path, "a") as f:
+            # Numpy integers are written as integers
+            f.writelines(json.dumps({"event": event, **fields}, default=int) + "\n" for event, fields in self.batch)
+        self.batch = []
+
+    def close(self):
+        self.flush()
@@ -0,0 +1,262 @@
+"""Streaming statistics of training runs, in fixed memory.
+
+Values are recorded one at a time (or by arrays) and folded by chunks into running statistics, so that a training run
+of any length keeps a constant memory. All the statistics can be queried at any time and exported as arrays.
+"""
+
+import numpy as np
+
+# Number of values recorded one at a time before they are folded into the statistics
+CHUNK_SIZE = 1024
+
+
+class RunningStats:
+    """Count, mean, variance, minimum and maximum of a stream of values (merged by chunks, Chan et al.)."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared differences to the mean
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        count, mean = len(values), float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta**2 * self.count * count / total
+        self.count = total
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count > 0 else np.nan
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+    def to_array(self):
+        """Returns `[count, mean, variance, min, max]`."""
+        return np.array([self.count, self.mean if self.count else np.nan, self.variance, self.min, self.max])
+
+
+class Window:
+    """Last `size` values of a stream (ring buffer)."""
+
+    def __init__(self, size, dtype=np.float64):
+        self.buffer = np.zeros(size, dtype=dtype)
+        self.position = 0  # Next position written
+        self.count = 0  # Number of values in the buffer
+
+    def update(self, values):
+        values = np.asarray(values, dtype=self.buffer.dtype)[-len(self.buffer) :]
+        size, n = len(self.buffer), len(values)
+        end = self.position + n
+        if end <= size:
+            self.buffer[self.position : end] = values
+        else:
+            self.buffer[self.position :] = values[: size - self.position]
+            self.buffer[: end - size] = values[size - self.position :]
+        self.position = end % size
+        self.count = min(self.count + n, size)
+
+    def values(self):
+        """Returns the values in the order they were recorded (a copy)."""
+        if self.count < len(self.buffer):
+            return self.buffer[: self.count].copy()
+        return np.roll(self.buffer, -self.position)
+
+    def mean(self):
+        return float(self.buffer[: self.count].mean()) if self.count else np.nan
+
+
+class Histogram:
+    """Counts of the values in `n_bins` regular bins between `low` and `high`, plus one bin below and one above."""
+
+    def __init__(self, low, high, n_bins):
+        self.edges = np.linspace(low, high, n_bins + 1)
+        self.counts = np.zeros(n_bins + 2, dtype=np.int64)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        n_bins = len(self.edges) - 1
+        low, high = self.edges[0], self.edges[-1]
+        idx = np.floor((values - low) * (n_bins / (high - low))).astype(np.int64) + 1
+        self.counts += np.bincount(np.clip(idx, 0, n_bins + 1), minlength=n_bins + 2)
+
+
+class History:
+    """Means of consecutive groups of values over the whole stream, with at most `max_points` groups.
+
+    When all the points are used, consecutive points are merged by pairs and the groups become twice as large, so the
+    history always covers the whole stream with a bounded resolution.
+    """
+
+    def __init__(self, max_points=1024):
+        self.max_points = max_points - max_points % 2
+        self.points = np.zeros(self.max_points, dtype=np.float64)
+        self.n_points = 0
+        self.group_size = 1  # Number of values per point
+        self.pending_sum = 0.0
+        self.pending_count = 0
+
+    def add_points(self, means):
+        self.points[self.n_points : self.n_points + len(means)] = means
+        self.n_points += len(means)
+        if self.n_points == self.max_points:
+            # Merge consecutive points by pairs
+            self.points[: self.max_points // 2] = self.points.reshape(-1, 2).mean(axis=1)
+            self.n_points = self.max_points // 2
+            self.group_size *= 2
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        while len(values) > 0:
+            if self.pending_count > 0 or len(values) < self.group_size:
+                # Fill the current group
+                n = min(len(values), self.group_size - self.pending_count)
+                self.pending_sum += float(values[:n].sum())
+                self.pending_count += n
+                values = values[n:]
+                if self.pending_count == self.group_size:
+                    self.add_points([self.pending_sum / self.group_size])
+                    self.pending_sum, self.pending_count = 0.0, 0
+            else:
+                # Complete groups, as long as there is room for their points
+                n_groups = min(len(values) // self.group_size, self.max_points - self.n_points)
+                n = n_groups * self.group_size
+                self.add_points(values[:n].reshape(n_groups, -1).mean(axis=1))
+                values = values[n:]
+
+    def to_array(self):
+        return self.points[: self.n_points].copy()
+
+
+class StreamStatistics:
+    """All the streaming statistics of one quantity: running moments, last values, histogram and history."""
+
+    def __init__(self, window=1000, low=-1.0, high=1.0, n_bins=100, max_points=1024):
+        self.stats = RunningStats()
+        self.window = Window(window)
+        self.histogram = Histogram(low, high, n_bins)
+        self.history = History(max_points)
+        self.pending = []
+
+    def record(self, value):
+        """Records one value (folded into the statistics by chunks)."""
+        self.pending.append(value)
+        if len(self.pending) >= CHUNK_SIZE:
+            self.flush()
+
+    def update(self, values):
+        """Records an array of values."""
+        self.flush()
+        self.fold(np.asarray(values, dtype=np.float64).reshape(-1))
+
+    def flush(self):
+        if self.pending:
+            values = np.array(self.pending, dtype=np.float64)
+            self.pending = []
+            self.fold(values)
+
+    def fold(self, values):
+        self.stats.update(values)
+        self.window.update(values)
+        self.histogram.update(values)
+        self.history.update(values)
+
+    def summary(self):
+        self.flush()
+        return {
+            "count": self.stats.count,
+            "mean": self.stats.mean,
+            "std": self.stats.std,
+            "min": self.stats.min,
+            "max": self.stats.max,
+            "moving_average": self.window.mean(),
+        }
+
+    def to_arrays(self, prefix):
+        self.flush()
+        return {
+            f"{prefix}_stats": self.stats.to_array(),
+            f"{prefix}_window": self.window.values(),
+            f"{prefix}_histogram": self.histogram.counts.copy(),
+            f"{prefix}_histogram_edges": self.histogram.edges.copy(),
+            f"{prefix}_history": self.history.to_array(),
+            f"{prefix}_history_group_size": np.array(self.history.group_size),
+        }
+
+
+class TrainingMetrics:
+    """Streaming metrics of a training run: temporal differences of the learned steps and results of the games.
+
+    Args:
+        window (int): Number of recent values used for moving averages and rolling win rates.
+        td_range (tuple(float)): Range of the histogram of temporal differences (values outside are counted in two
+            overflow bins).
+        n_bins (int): Number of bins of the histogram of temporal differences.
+        max_points (int): Maximal number of points of the histories covering the whole run.
+    """
+
+    def __init__(self, window=1000, td_range=(-120.0, 120.0), n_bins=240, max_points=1024):
+        self.td_errors = StreamStatistics(window, *td_range, n_bins, max_points)
+        self.rounds = StreamStatistics(window, 0, 100, 100, max_points)
+        # Winner of the recent games (-1 for a draw) and number of games won by each player and drawn
+        self.winners = Window(window, dtype=np.int8)
+        self.results = np.zeros(3, dtype=np.int64)
+
+    def record_td(self, temporal_difference):
+        self.td_errors.record(temporal_difference)
+
+    def record_td_batch(self, temporal_differences):
+        self.td_errors.update(temporal_differences)
+
+    def record_game(self, result):
+        """Records the result of a game, as returned by `Dice421Env.run` (the result itself is not kept)."""
+        winner = result["winner"]
+        self.winners.update([winner])
+        self.results[winner] += 1  # Draws (-1) are counted in the last entry
+        self.rounds.record(result["number_rounds"])
+
+    def win_rates(self):
+        """Rolling proportions of games won by player 1, won by player 2 and drawn over the recent games."""
+        winners = self.winners.buffer[: self.winners.count]
+        if len(winners) == 0:
+            return np.full(3, np.nan)
+        return np.array([(winners == 0).mean(), (winners == 1).mean(), (winners == -1).mean()])
+
+    def summary(self):
+        """Current values of the metrics, as a dictionary of numbers."""
+        td = self.td_errors.summary()
+        n_games = int(self.results.sum())
+        win_rates = self.win_rates()
+        return {
+            "n_steps": td["count"],
+            "td_error_mean": td["mean"],
+            "td_error_std": td["std"],
+            "td_error_moving_average": td["moving_average"],
+            "n_games": n_games,
+            "win_rate_1": win_rates[0],
+            "win_rate_2": win_rates[1],
+            "draw_rate": win_rates[2],
+            "rounds_moving_average": self.rounds.summary()["moving_average"],
+        }
+
+    def to_arrays(self):
+        """Exports the metrics as a dictionary of arrays (e.g. for `np.savez`)."""
+        arrays = self.td_errors.to_arrays("td_error")
+        arrays.update(self.rounds.to_arrays("rounds"))
+        arrays["winners_window"] = self.winners.values()
+        arrays["results"] = self.results.copy()
+        return arrays
+
+    def save(self, path):
+        np.savez_compressed(path, **self.to_arrays())
@@ -0,0 +1,98 @@
+"""Opt-in instrumentation of `Dice421Env`: timers of the phases of a game and counters of game events.
+
+A `Profiler` is attached with `env.set_profiler(Profiler())`. Without profiler, the environment only checks a flag at
+each phase, as for the tracing of events.
+"""
+
+import cProfile
+import io
+import pstats
+import time
+
+# Timed phases: decision of a player, throw of the dice, computation of the reward (and of the win estimation),
+# learning hook of a player and resolution of a round
+PHASES = ["action", "throw", "reward", "learn", "round"]
+COUNTERS = ["games", "rounds", "throws", "passes", "ties"]
+
+
+class Profiler:
+    """Accumulates the time spent in each phase of the games (in total and per player) and counts game events."""
+
+    clock = staticmethod(time.perf_counter)
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.calls = dict.fromkeys(PHASES, 0)
+        # Time of the decisions and learning hooks of each player (by name)
+        self.player_times = {}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def add(self, phase, elapsed):
+        self.times[phase] += elapsed
+        self.calls[phase] += 1
+
+    def add_player(self, phase, elapsed, player):
+        self.add(phase, elapsed)
+        times = self.player_times.get(player)
+        if times is None:
+            times = self.player_times[player] = {"action": 0.0, "learn": 0.0}
+        times[phase] += elapsed
+
+    def count(self, counter, n=1):
+        self.counters[counter] += n
+
+    def snapshot(self):
+        """Returns the timers and counters as a dictionary (times in seconds)."""
+        counters = dict(self.counters)
+        games, rounds = counters["games"], counters["rounds"]
+        return {
+            "phases": {
+                phase: {
+                    "time": self.times[phase],
+                    "calls": self.calls[phase],
+                    "mean_us": 1e6 * self.times[phase] / self.calls[phase] if self.calls[phase] else 0.0,
+                }
+                for phase in PHASES
+            },
+            "players": {player: dict(times) for player, times in self.player_times.items()},
+            "counters": counters,
+            "throws_per_round": counters["throws"] / rounds if rounds else 0.0,
+            "rounds_per_game": rounds / games if games else 0.0,
+        }
+
+    def report(self):
+        """Returns a text summary of the snapshot."""
+        snapshot = self.snapshot()
+        total = sum(self.times.values())
+        lines = [f"{'phase':>8} {'time (s)':>10} {'share':>7} {'calls':>10} {'mean (us)':>10}"]
+        for phase, values in snapshot["phases"].items():
+            share = values["time"] / total if total else 0.0
+            lines.append(
+                f"{phase:>8} {values['time']:10.4f} {share:7.1%} {values['calls']:10d} {values['mean_us']:10.2f}"
+            )
+        for player, times in snapshot["players"].items():
+            lines.append(f"{player}: action {times['action']:.4f} s, learn {times['learn']:.4f} s")
+        counters = ", ".join(f"{name} {value}" for name, value in snapshot["counters"].items())
+        lines.append(
+            f"{counters} ({snapshot['throws_per_round']:.2f} throws/round, "
+            f"{snapshot['rounds_per_game']:.1f} rounds/game)"
+        )
+        return "\n".join(lines)
+
+
+def profile_run(env, player1, player2, n_games=1, sort="cumulative", limit=25, **run_kwargs):
+    """Plays `n_games` games with `Dice421Env.run` under `cProfile`.
+
+    Returns:
+        tuple(list, str): Results of the games and the statistics of the profile (`limit` functions sorted by `sort`).
+    """
+    profile = cProfile.Profile()
+    profile.enable()
+    results = [env.run(player1, player2, **run_kwargs) for _ in range(n_games)]
+    profile.disable()
+    stream = io.StringIO()
+    pstats.Stats(profile, stream=stream).sort_stats(sort).print_stats(limit)
+    return results, stream.getvalue()
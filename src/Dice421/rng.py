@@ -0,0 +1,51 @@
+import numpy as np
+
+# Number of faces drawn at once
+BLOCK_SIZE = 4096
+
+
+class DiceStream:
+    """Stream of dice faces drawn by blocks from one random generator.
+
+    Drawing a block of integers from a generator gives the same values as drawing them one at a time, so the stream
+    only depends on the seed, whatever the block size. The seed can be an integer, None (random) or a
+    `np.random.SeedSequence`, and `spawn` gives independent streams (e.g. one per worker).
+    """
+
+    def __init__(self, seed=None, block_size=BLOCK_SIZE):
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.gen = np.random.default_rng(self.seed_sequence)
+        self.block_size = block_size
+        self.block = []
+        self.position = 0
+
+    def refill(self):
+        # Python integers are faster to index and to compute with than numpy scalars
+        self.block = self.gen.integers(low=1, high=7, size=self.block_size).tolist()
+        self.position = 0
+
+    def face(self):
+        """Returns the face of a die."""
+        if self.position == len(self.block):
+            self.refill()
+        value = self.block[self.position]
+        self.position += 1
+        return value
+
+    def coin(self):
+        """Returns 0 or 1 with equal probability (drawn from one face)."""
+        return (self.face() - 1) // 3
+
+    def get_state(self):
+        """Returns the state of the stream (state of the generator and remaining faces of the current block)."""
+        return {"gen": self.gen.bit_generator.state, "block": list(self.block), "position": self.position}
+
+    def set_state(self, state):
+        """Restores a state returned by `get_state`: the stream then draws the same faces."""
+        self.gen.bit_generator.state = state["gen"]
+        self.block = list(state["block"])
+        self.position = state["position"]
+
+    def spawn(self, n_children):
+        """Returns `n_children` independent streams."""
+        return [DiceStream(seed, block_size=self.block_size) for seed in self.seed_sequence.spawn(n_children)]
@@ -0,0 +1,136 @@
+"""Exact optimal play of 421 by backward induction.
+
+A round is a finite game: the first player throws up to three times and chooses when to stop, the second player
+throws at most as many times as the first one and knows the combination to beat. Given the value (for the first
+player) of each pair of final combinations, the optimal policies of both players are computed by backward induction
+over the states `(combination, throws left, combination of the opponent)` with the exact probabilities of
+`transitions.keep_transitions`.
+
+The whole game is solved by value iteration over the score difference. Two simplifications are made: the limit of
+`MAX_ROUNDS` rounds is ignored, and the score difference is clipped to the values where the game is not over.
+"""
+
+from .Combination import POINTS_TABLE, N_COMBINATIONS
+from .transitions import keep_transitions, N_ACTIONS, THROW_ALL_IDX
+from functools import lru_cache
+import numpy as np
+
+# Score difference ending the game
+WINNING_DIFFERENCE = 21
+# Score differences of a game in progress
+DIFFERENCES = np.arange(-WINNING_DIFFERENCE + 1, WINNING_DIFFERENCE)
+
+
+def solve_round(payoffs, transitions=None):
+    """Computes the optimal policies of a round.
+
+    The first player maximizes their expected payoff and the second player minimizes it. Ties between actions are
+    broken in favour of passing.
+
+    Args:
+        payoffs (np.ndarray): Array of shape `(..., N_COMBINATIONS, N_COMBINATIONS)` of the payoff of the first player
+            for each pair (rank of the first player's combination, rank of the second player's combination).
+        transitions (np.ndarray, optional): Output of `keep_transitions`.
+
+    Returns:
+        dict: `value` (shape `(...)`): expected payoff of the first player before the round,
+            `first_actions` (shape `(..., 2, N_COMBINATIONS)`): best action of the first player on throw `i + 1`
+            given their combination, `second_actions` (shape `(..., 2, N_COMBINATIONS, N_COMBINATIONS)`): best action
+            of the second player with `n + 1` throws left given their combination and the first player's combination.
+    """
+    P = keep_transitions() if transitions is None else transitions
+    P_flat = P.reshape(N_COMBINATIONS * N_ACTIONS, N_COMBINATIONS)
+    P_all = P[0, THROW_ALL_IDX]
+    batch = payoffs.shape[:-2]
+
+    def expected(values):
+        # Expectation of `values` (indexed by the next combination on axis -2) for each combination and action
+        out = np.matmul(P_flat, values).reshape(*values.shape[:-2], N_COMBINATIONS, N_ACTIONS, values.shape[-1])
+        return out
+
+    # Second player: values indexed by (second combination, first combination) and number of throws left
+    terminal = np.swapaxes(payoffs, -1, -2)
+    values_second = [terminal]
+    second_actions = []
+    for _ in range(2):
+        q = expected(values_second[-1])
+        # Passing ends the turn
+        q[..., 0, :] = terminal
+        values_second.append(q.min(axis=-2))
+        second_actions.append(q.argmin(axis=-2))
+    # Value for the first player when the second player starts with a number of throws (indexed from 1)
+    start_second = [None] + [np.tensordot(values, P_all, axes=([-2], [0])) for values in values_second]
+
+    # First player: values indexed by their combination, on throws 2 and 3
+    q = expected(start_second[3][..., None]).squeeze(-1)
+    q[..., 0] = start_second[2]
+    values_first_2, first_actions_2 = q.max(axis=-1), q.argmax(axis=-1)
+    q = expected(values_first_2[..., None]).squeeze(-1)
+    q[..., 0] = start_second[1]
+    values_first_1, first_actions_1 = q.max(axis=-1), q.argmax(axis=-1)
+
+    return {
+        "value": values_first_1 @ P_all,
+        "first_actions": np.stack([first_actions_1, first_actions_2], axis=len(batch)).astype(np.uint8),
+        "second_actions": np.stack(second_actions, axis=len(batch)).astype(np.uint8),
+    }
+
+
+def round_points_payoffs():
+    """Payoffs of the first player in points: points of the winning combination, negative if the round is lost."""
+    first, second = np.meshgrid(np.arange(N_COMBINATIONS), np.arange(N_COMBINATIONS), indexing="ij")
+    return np.where(
+        first > second, POINTS_TABLE[first], np.where(first < second, -POINTS_TABLE[second], 0)
+    ).astype(float)
+
+
+def game_payoffs(win_first):
+    """Payoffs of the first player in probability of winning the game, for each score difference of `DIFFERENCES`.
+
+    Args:
+        win_first (np.ndarray): Probability of winning the game of the first player of a round for each score
+            difference of `DIFFERENCES`.
+    """
+
+    def win(first, difference):
+        # Probability of winning for a player starting (or not) the next round with a given score difference
+        clipped = np.clip(difference, DIFFERENCES[0], DIFFERENCES[-1]) - DIFFERENCES[0]
+        value = win_first[clipped] if first else 1 - win_first[::-1][clipped]
+        return np.where(difference >= WINNING_DIFFERENCE, 1.0, np.where(difference <= -WINNING_DIFFERENCE, 0.0, value))
+
+    difference = DIFFERENCES[:, None, None]
+    first, second = np.meshgrid(np.arange(N_COMBINATIONS), np.arange(N_COMBINATIONS), indexing="ij")
+    return np.where(
+        first > second,
+        win(True, difference + POINTS_TABLE[first]),
+        np.where(
+            first < second,
+            win(False, difference - POINTS_TABLE[second]),
+            0.5 * (win(True, difference) + win(False, difference)),
+        ),
+    )
+
+
+@lru_cache(maxsize=None)
+def solve_game(tol=1e-10, max_iter=10_000):
+    """Computes the optimal policies maximizing the probability of winning the game by value iteration.
+
+    Returns:
+        dict: Output of `solve_round` for each score difference of `DIFFERENCES` (from the first player's point of
+            view), `value` being the probability of winning the game of the first player of the round.
+    """
+    P = keep_transitions()
+    win_first = np.full(len(DIFFERENCES), 0.5)
+    for _ in range(max_iter):
+        solution = solve_round(game_payoffs(win_first), transitions=P)
+        delta = np.abs(solution["value"] - win_first).max()
+        win_first = solution["value"]
+        if delta < tol:
+            break
+    return solution
+
+
+@lru_cache(maxsize=None)
+def solve_round_points():
+    """Optimal policies maximizing the expected points won in the round."""
+    return solve_round(round_points_payoffs())
@@ -0,0 +1,115 @@
+"""Exact probabilities of the combinations obtained by throwing again some of the dice.
+
+The tables are indexed by the rank of the current combination and by the action (which dice to throw, see
+`ACTIONS`). They are built once per process, in a few milliseconds, and can be persisted with `np.save`.
+"""
+
+from .Combination import Combination, RANK_TABLE, SORTED_TRIPLES, N_COMBINATIONS, POINTS_TABLE
+from functools import lru_cache
+import itertools as it
+import os
+import numpy as np
+
+# Which dice are thrown for each action index (see `QTable.action_index`): index `4 * a[0] + 2 * a[1] + a[2]`
+ACTIONS = [tuple(int(x) for x in action) for action in it.product((0, 1), repeat=3)]
+N_ACTIONS = len(ACTIONS)
+# Index of the action throwing all dice
+THROW_ALL_IDX = N_ACTIONS - 1
+
+
+def _read_only(array):
+    array.flags.writeable = False
+    return array
+
+
+def build_keep_transitions():
+    """Computes the transition probabilities (see `keep_transitions`)."""
+    # All the outcomes of three dice: the dice which are not thrown are ignored, which leaves a uniform distribution
+    # over the outcomes of the thrown dice
+    outcomes = np.array(list(it.product(range(1, 7), repeat=3)))
+    masks = np.array(ACTIONS, dtype=bool)
+    dice = np.where(masks[None, :, None, :], outcomes[None, None, :, :], SORTED_TRIPLES[:, None, None, :])
+    ranks = RANK_TABLE[dice[..., 0] - 1, dice[..., 1] - 1, dice[..., 2] - 1]
+    idx = (np.arange(N_COMBINATIONS * N_ACTIONS).reshape(N_COMBINATIONS, N_ACTIONS, 1) * N_COMBINATIONS + ranks).ravel()
+    counts = np.bincount(idx, minlength=N_COMBINATIONS * N_ACTIONS * N_COMBINATIONS)
+    return counts.reshape(N_COMBINATIONS, N_ACTIONS, N_COMBINATIONS) / len(outcomes)
+
+
+@lru_cache(maxsize=None)
+def keep_transitions(path=None):
+    """Probabilities of the combinations obtained by throwing some of the dice of a combination.
+
+    Args:
+        path (str, optional): `.npy` file where the table is persisted: loaded if it exists, written otherwise.
+
+    Returns:
+        np.ndarray: Read-only array `P` of shape `(N_COMBINATIONS, N_ACTIONS, N_COMBINATIONS)` such that `P[c, a, c2]`
+            is the probability to get the combination of rank `c2` from the combination of rank `c` with the action
+            `a`.
+    """
+    if path is not None and os.path.exists(path):
+        return _read_only(np.load(path))
+    transitions = build_keep_transitions()
+    if path is not None:
+        np.save(path, transitions)
+    return _read_only(transitions)
+
+
+@lru_cache(maxsize=None)
+def expected_points_table():
+    """Expected points of the resulting combination, of shape `(N_COMBINATIONS, N_ACTIONS)`."""
+    return _read_only(keep_transitions() @ POINTS_TABLE)
+
+
+@lru_cache(maxsize=None)
+def expected_rank_table():
+    """Expected rank of the resulting combination, of shape `(N_COMBINATIONS, N_ACTIONS)`."""
+    return _read_only(keep_transitions() @ np.arange(N_COMBINATIONS))
+
+
+@lru_cache(maxsize=None)
+def beat_table():
+    """Probability that the resulting combination beats (strictly) the combination of each rank, of shape
+    `(N_COMBINATIONS, N_ACTIONS, N_COMBINATIONS)`."""
+    transitions = keep_transitions()
+    # Sum of the probabilities of the ranks strictly above each rank
+    above = np.cumsum(transitions[..., ::-1], axis=-1)[..., ::-1]
+    return _read_only(np.concatenate([above[..., 1:], np.zeros(above.shape[:-1] + (1,))], axis=-1))
+
+
+def _rank(combination):
+    """Rank of a combination given as a `Combination`, as dice values or as a rank."""
+    if isinstance(combination, Combination):
+        return combination.rank
+    if isinstance(combination, (int, np.integer)):
+        return int(combination)
+    return Combination(combination).rank
+
+
+def _action(dices_to_throw):
+    return 4 * dices_to_throw[0] + 2 * dices_to_throw[1] + dices_to_throw[2]
+
+
+def outcome_distribution(combination, dices_to_throw):
+    """Probabilities of the resulting combinations (indexed by rank) when throwing some dice of a combination.
+
+    Args:
+        combination (Combination, list(int) or int): Current combination, as an object, dice values or rank.
+        dices_to_throw (list(bool)): Which dice to throw, as the actions of `Dice421Env`.
+    """
+    return keep_transitions()[_rank(combination), _action(dices_to_throw)]
+
+
+def expected_points(combination, dices_to_throw):
+    """Expected points of the resulting combination."""
+    return float(expected_points_table()[_rank(combination), _action(dices_to_throw)])
+
+
+def expected_rank(combination, dices_to_throw):
+    """Expected rank of the resulting combination."""
+    return float(expected_rank_table()[_rank(combination), _action(dices_to_throw)])
+
+
+def beat_probability(combination, dices_to_throw, opponent):
+    """Probability that the resulting combination beats the combination of the opponent."""
+    return float(beat_table()[_rank(combination), _action(dices_to_throw), _rank(opponent)])
@@ -1,6 +1,43 @@
-from gymnasium.envs.registration import register
+import sys
 
-register(
-    id="Dice421-v0",
-    entry_point="src.Dice421:Dice421Env",
-)
+ENV_ID = "Dice421-v0"
+
+
+def register_env():
+    """Registers the environment with gymnasium as `Dice421-v0` (once)."""
+    from gymnasium.envs.registration import register, registry
+
+    if ENV_ID not in registry:
+        register(id=ENV_ID, entry_point="src.Dice421.Game:Dice421Env")
+
+
+class GymnasiumImportHook:
+    """Import hook registering the environment as soon as gymnasium is imported, by any module (it removes itself from
+    `sys.meta_path` on the first import of gymnasium)."""
+
+    def find_spec(self, name, path=None, target=None):
+        if name != "gymnasium":
+            return None
+        sys.meta_path.remove(self)
+        # Spec of the next finders (as `importlib.util.find_spec`, whose import is longer than the rest of the package)
+        spec = next(filter(None, (finder.find_spec(name, path, target) for finder in sys.meta_path)), None)
+        if spec is not None and spec.loader is not None:
+            exec_module = spec.loader.exec_module
+
+            def exec_and_register(module):
+                exec_module(module)
+                register_env()
+
+            spec.loader.exec_module = exec_and_register
+        return spec
+
+
+# Importing gymnasium takes longer than everything else but `numpy`: the environment is registered now if gymnasium is
+# already imported, otherwise when it is imported (e.g. `import src; import gymnasium; gymnasium.make("Dice421-v0")`)
+# or when the environment module is imported (`src.Dice421.Game` registers it), so that the modules which do not need
+# it (e.g. combinations, results, Q-tables and agents, which take the rules of the game from `src.Dice421.constants`)
+# do not pay for it
+if "gymnasium" in sys.modules:
+    register_env()
+else:
+    sys.meta_path.insert(0, GymnasiumImportHook())